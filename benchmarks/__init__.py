@@ -0,0 +1,25 @@
+"""
+Benchmarks for python-gssapi. Run them from the root of the source tree with::
+
+    python -m benchmarks run -o results.json
+
+Benchmarks which need credentials or security contexts start a temporary MIT Kerberos KDC on the
+loopback interface (see :mod:`benchmarks.kdc`), so the MIT ``krb5kdc``, ``kdb5_util``,
+``kadmin.local`` and ``kinit`` programs must be installed; pass ``--no-kdc`` to skip them.
+Alternatively, pass ``--null`` to build the null mechanism in ``benchmarks/nullgss`` and link the
+bindings against it instead of the system GSSAPI library. This needs only the GSSAPI headers, and
+measures the overhead of the Python bindings without any Kerberos cryptography or KDC traffic.
+
+To measure throughput under concurrent load instead, run the :mod:`gssapi.bench` load generator
+against a temporary KDC (any further arguments are passed on to it)::
+
+    python -m benchmarks load --clients 50 --duration 10
+
+Check that memory use and the number of live C handles stay bounded over many handshakes with::
+
+    python -m benchmarks soak --cycles 1000000
+
+Compare the results from two commits with::
+
+    python -m benchmarks compare before.json after.json
+"""
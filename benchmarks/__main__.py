@@ -0,0 +1,150 @@
+from __future__ import absolute_import, print_function
+
+import argparse
+import fnmatch
+import os
+import subprocess
+import sys
+
+from . import runner
+from .kdc import TemporaryKDC
+
+BENCHMARK_MODULES = ('bench_names', 'bench_oids', 'bench_creds', 'bench_ctx')
+
+NULLGSS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nullgss')
+
+
+def _use_nullgss():
+    # Must be called before gssapi is first imported, as the bindings are built on import
+    if not os.path.exists(os.path.join(NULLGSS_DIR, 'libnullgss.so')):
+        subprocess.check_call(['make', '-C', NULLGSS_DIR])
+    os.environ['GSSAPI_LINKER_ARGS'] = '-L{0} -Wl,-rpath,{0} -lnullgss'.format(NULLGSS_DIR)
+
+
+def _load_benchmarks():
+    for module in BENCHMARK_MODULES:
+        __import__('benchmarks.' + module)
+    return runner._BENCHMARKS
+
+
+def run(args):
+    if args.null:
+        _use_nullgss()
+    benchmarks = [
+        bench for bench in _load_benchmarks()
+        if (not args.filter or any(fnmatch.fnmatch(bench.name, pattern) for pattern in args.filter)) and
+        not (args.no_kdc and bench.requires_kdc and not args.null)
+    ]
+    if not benchmarks:
+        print("No benchmarks selected", file=sys.stderr)
+        return 1
+    if args.list:
+        for bench in benchmarks:
+            print(bench.name)
+        return 0
+
+    kdc = TemporaryKDC()
+    if not args.null and any(bench.requires_kdc for bench in benchmarks):
+        kdc.start()
+    try:
+        results = runner.run(benchmarks, repeat=args.repeat, library='null' if args.null else 'system')
+    finally:
+        kdc.stop()
+    if args.output:
+        runner.save(results, args.output)
+    return 0
+
+
+def load(args):
+    if args.null:
+        _use_nullgss()
+    kdc = TemporaryKDC()
+    if not args.null:
+        kdc.start()
+    try:
+        from gssapi import bench
+        return bench.main(['load'] + args.load_args)
+    finally:
+        kdc.stop()
+
+
+def soak(args):
+    if args.null:
+        _use_nullgss()
+    from . import soak as soak_test
+    kdc = TemporaryKDC()
+    if not args.null:
+        kdc.start()
+    try:
+        failures = soak_test.soak(args.cycles, args.interval)
+    finally:
+        kdc.stop()
+    for failure in failures:
+        print(failure)
+    return 1 if failures else 0
+
+
+def compare(args):
+    regressions = runner.compare(runner.load(args.old), runner.load(args.new), args.threshold)
+    if regressions:
+        print("{0} benchmark(s) slower by more than {1:.0%}".format(len(regressions), args.threshold))
+        return 1
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description="python-gssapi benchmarks")
+    subparsers = parser.add_subparsers(dest='command')
+
+    run_parser = subparsers.add_parser('run', help="run benchmarks")
+    run_parser.add_argument('-o', '--output', help="write the results to this JSON file")
+    run_parser.add_argument('-f', '--filter', action='append',
+                            help="only run benchmarks matching this glob, e.g. 'ctx.wrap*'")
+    run_parser.add_argument('--no-kdc', action='store_true',
+                            help="skip benchmarks which need a KDC")
+    run_parser.add_argument('--null', action='store_true',
+                            help="link against the null mechanism in benchmarks/nullgss instead of the "
+                                 "system GSSAPI library, to measure only the overhead of the bindings")
+    run_parser.add_argument('--repeat', type=int, default=5, help="number of samples per benchmark")
+    run_parser.add_argument('--list', action='store_true', help="list the selected benchmarks and exit")
+    run_parser.set_defaults(func=run)
+
+    load_parser = subparsers.add_parser(
+        'load', help="run the gssapi.bench load generator against a temporary KDC",
+        description="Runs python -m gssapi.bench load, with any further arguments, against an "
+                    "acceptor in this process using a temporary KDC."
+    )
+    load_parser.add_argument('--null', action='store_true',
+                             help="link against the null mechanism instead of using a KDC")
+    load_parser.set_defaults(func=load)
+
+    soak_parser = subparsers.add_parser(
+        'soak', help="check for memory and handle leaks over many handshakes"
+    )
+    soak_parser.add_argument('--null', action='store_true',
+                             help="link against the null mechanism instead of using a KDC")
+    soak_parser.add_argument('--cycles', type=int, default=1000000,
+                             help="handshake and wrap cycles to run (default 1000000)")
+    soak_parser.add_argument('--interval', type=int, default=50000,
+                             help="cycles between samples (default 50000)")
+    soak_parser.set_defaults(func=soak)
+
+    compare_parser = subparsers.add_parser('compare', help="compare two JSON result files")
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.05,
+                                help="fractional slowdown to report as a regression (default 0.05)")
+    compare_parser.set_defaults(func=compare)
+
+    args, extra = parser.parse_known_args(argv)
+    if extra and args.command != 'load':
+        parser.error("unrecognized arguments: {0}".format(' '.join(extra)))
+    args.load_args = extra
+    if args.command is None:
+        parser.print_help()
+        return 2
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
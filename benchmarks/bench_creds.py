@@ -0,0 +1,30 @@
+"""Credential acquisition from the benchmark KDC's credential cache and keytab."""
+from __future__ import absolute_import
+
+from gssapi import Credential, Name, C_ACCEPT, C_INITIATE, C_NT_HOSTBASED_SERVICE, C_NT_USER_NAME
+
+from .kdc import REALM, USER
+from .runner import benchmark
+
+
+@benchmark('creds.acquire_initiate_default', requires_kdc=True)
+def bench_acquire_initiate_default():
+    return lambda: Credential(usage=C_INITIATE)
+
+
+@benchmark('creds.acquire_initiate_named', requires_kdc=True)
+def bench_acquire_initiate_named():
+    name = Name('{0}@{1}'.format(USER, REALM), C_NT_USER_NAME)
+    return lambda: Credential(name, usage=C_INITIATE)
+
+
+@benchmark('creds.acquire_accept', requires_kdc=True)
+def bench_acquire_accept():
+    name = Name('host@localhost', C_NT_HOSTBASED_SERVICE)
+    return lambda: Credential(name, usage=C_ACCEPT)
+
+
+@benchmark('creds.inquire_lifetime', requires_kdc=True)
+def bench_inquire_lifetime():
+    cred = Credential(usage=C_INITIATE)
+    return lambda: cred.lifetime
@@ -0,0 +1,69 @@
+"""Security context establishment and per-message operations."""
+from __future__ import absolute_import
+
+import os
+
+from gssapi import (
+    AcceptContext, Credential, InitContext, Name, C_ACCEPT, C_CONF_FLAG, C_INITIATE, C_INTEG_FLAG,
+    C_MUTUAL_FLAG, C_NT_HOSTBASED_SERVICE
+)
+
+from .runner import benchmark
+
+
+PAYLOAD_SIZES = (64, 1024, 16384, 1 << 20)
+
+# No replay or sequence detection, so the same token can be unwrapped or verified repeatedly
+_FLAGS = (C_MUTUAL_FLAG, C_CONF_FLAG, C_INTEG_FLAG)
+
+
+def _credentials():
+    target = Name('host@localhost', C_NT_HOSTBASED_SERVICE)
+    return target, Credential(usage=C_INITIATE), Credential(target, usage=C_ACCEPT)
+
+
+def _handshake(target, client_cred, server_cred):
+    client = InitContext(target, client_cred, req_flags=_FLAGS)
+    server = AcceptContext(server_cred)
+    token = client.step()
+    while not client.established:
+        token = server.step(token)
+        if client.established:
+            break
+        token = client.step(token)
+    return client, server
+
+
+@benchmark('ctx.handshake', requires_kdc=True)
+def bench_handshake():
+    credentials = _credentials()
+    return lambda: _handshake(*credentials)
+
+
+@benchmark('ctx.wrap', requires_kdc=True, params=PAYLOAD_SIZES, payload=True)
+def bench_wrap(size):
+    client, _ = _handshake(*_credentials())
+    message = os.urandom(size)
+    return lambda: client.wrap(message)
+
+
+@benchmark('ctx.unwrap', requires_kdc=True, params=PAYLOAD_SIZES, payload=True)
+def bench_unwrap(size):
+    client, server = _handshake(*_credentials())
+    token = client.wrap(os.urandom(size))
+    return lambda: server.unwrap(token)
+
+
+@benchmark('ctx.get_mic', requires_kdc=True, params=PAYLOAD_SIZES, payload=True)
+def bench_get_mic(size):
+    client, _ = _handshake(*_credentials())
+    message = os.urandom(size)
+    return lambda: client.get_mic(message)
+
+
+@benchmark('ctx.verify_mic', requires_kdc=True, params=PAYLOAD_SIZES, payload=True)
+def bench_verify_mic(size):
+    client, server = _handshake(*_credentials())
+    message = os.urandom(size)
+    mic = client.get_mic(message)
+    return lambda: server.verify_mic(message, mic)
@@ -0,0 +1,56 @@
+"""Name import, display, canonicalization and export."""
+from __future__ import absolute_import
+
+from gssapi import Name, OID, C_NT_HOSTBASED_SERVICE, C_NT_USER_NAME
+
+from .runner import benchmark
+
+
+_PRINCIPAL = 'alice@EXAMPLE.COM'
+
+
+def _krb5():
+    return OID.mech_from_string('krb5')
+
+
+@benchmark('names.import')
+def bench_import():
+    return lambda: Name(_PRINCIPAL, C_NT_USER_NAME)
+
+
+@benchmark('names.import_hostbased')
+def bench_import_hostbased():
+    return lambda: Name('HTTP@www.example.com', C_NT_HOSTBASED_SERVICE)
+
+
+@benchmark('names.import_many', params=(1000,))
+def bench_import_many(count):
+    principals = ['user{0}@EXAMPLE.COM'.format(i) for i in range(count)]
+    krb5 = _krb5()
+    return lambda: Name.import_many(principals, C_NT_USER_NAME, mech=krb5, export=True)
+
+
+@benchmark('names.canonicalize')
+def bench_canonicalize():
+    krb5 = _krb5()
+    return lambda: Name(_PRINCIPAL, C_NT_USER_NAME).canonicalize(krb5)
+
+
+@benchmark('names.export')
+def bench_export():
+    krb5 = _krb5()
+    return lambda: Name(_PRINCIPAL, C_NT_USER_NAME).canonicalize(krb5).export()
+
+
+@benchmark('names.str_peer_name')
+def bench_str_peer_name():
+    # The peer name of an accepted context is a MechName, and is typically displayed several times
+    # per request for logging and authorization.
+    peer_name = Name(_PRINCIPAL, C_NT_USER_NAME).canonicalize(_krb5())
+    return lambda: str(peer_name)
+
+
+@benchmark('names.str_peer_name_first')
+def bench_str_peer_name_first():
+    krb5 = _krb5()
+    return lambda: str(Name(_PRINCIPAL, C_NT_USER_NAME).canonicalize(krb5))
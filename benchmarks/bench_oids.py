@@ -0,0 +1,43 @@
+"""OID lookups and OID set operations."""
+from __future__ import absolute_import
+
+from gssapi import OID, OIDSet, get_all_mechs
+
+from .runner import benchmark
+
+
+_KRB5 = '1.2.840.113554.1.2.2'
+
+
+@benchmark('oids.mech_from_string')
+def bench_mech_from_string():
+    return lambda: OID.mech_from_string(_KRB5)
+
+
+@benchmark('oids.from_dotted')
+def bench_from_dotted():
+    return lambda: OID.from_dotted(_KRB5)
+
+
+@benchmark('oids.str')
+def bench_str():
+    oid = OID.mech_from_string(_KRB5)
+    return lambda: str(oid)
+
+
+@benchmark('oids.get_all_mechs')
+def bench_get_all_mechs():
+    return get_all_mechs
+
+
+@benchmark('oids.oidset_contains')
+def bench_oidset_contains():
+    mechs = get_all_mechs()
+    krb5 = OID.mech_from_string(_KRB5)
+    return lambda: krb5 in mechs
+
+
+@benchmark('oids.singleton_set')
+def bench_singleton_set():
+    krb5 = OID.mech_from_string(_KRB5)
+    return lambda: OIDSet.singleton_set(krb5)
@@ -0,0 +1,191 @@
+"""
+A throwaway MIT Kerberos KDC for benchmarks, running on the loopback interface with a generated
+realm, database, keytabs and credential cache in a temporary directory.
+"""
+from __future__ import absolute_import
+
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+
+try:
+    from shutil import which
+except ImportError:  # Python 2
+    from distutils.spawn import find_executable as which
+
+
+REALM = 'BENCH.PYTHONGSSAPI.TEST'
+SERVICE = 'host/localhost'
+USER = 'bench'
+
+_SBIN_DIRS = ('/usr/sbin', '/usr/local/sbin', '/usr/lib/mit/sbin', '/usr/local/opt/krb5/sbin')
+
+_KRB5_CONF = """\
+[libdefaults]
+    default_realm = {realm}
+    dns_lookup_kdc = false
+    dns_lookup_realm = false
+    dns_canonicalize_hostname = false
+    rdns = false
+    udp_preference_limit = 1
+
+[realms]
+    {realm} = {{
+        kdc = 127.0.0.1:{port}
+    }}
+
+[domain_realm]
+    localhost = {realm}
+"""
+
+_KDC_CONF = """\
+[kdcdefaults]
+    kdc_ports = {port}
+    kdc_tcp_ports = {port}
+
+[realms]
+    {realm} = {{
+        database_name = {dir}/principal
+        key_stash_file = {dir}/stash
+        acl_file = {dir}/kadm5.acl
+        kdc_ports = {port}
+        kdc_tcp_ports = {port}
+        max_life = 1d
+        max_renewable_life = 1d
+    }}
+
+[logging]
+    kdc = FILE:{dir}/kdc.log
+"""
+
+
+def _find_program(name):
+    path = which(name)
+    if path is None:
+        path = which(name, path=os.pathsep.join(_SBIN_DIRS))
+    if path is None:
+        raise RuntimeError(
+            "Can't find the MIT Kerberos program {0}; install the KDC package (e.g. krb5-kdc and "
+            "krb5-admin-server, or krb5-server) to run benchmarks which need a KDC".format(name)
+        )
+    return path
+
+
+def _free_port():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+    finally:
+        sock.close()
+
+
+class TemporaryKDC(object):
+    """
+    Creates a realm with a service principal (``host/localhost``) and a user principal
+    (``bench``), starts ``krb5kdc`` for it, and points the Kerberos library in this process at it
+    through environment variables:
+
+    * ``KRB5_CONFIG`` and ``KRB5_KDC_PROFILE`` name the generated configuration,
+    * ``KRB5_KTNAME`` names the service keytab, so acceptor credentials can be acquired,
+    * ``KRB5_CLIENT_KTNAME`` names the user keytab, and
+    * ``KRB5CCNAME`` names a credential cache already holding a TGT for the user.
+
+    The environment is restored and everything is deleted on :meth:`stop`. This must be started
+    before the Kerberos library is first used in the process, as MIT Kerberos only reads its
+    configuration once per library context.
+    """
+
+    def __init__(self):
+        super(TemporaryKDC, self).__init__()
+        self.dir = None
+        self.port = None
+        self._process = None
+        self._saved_environ = None
+
+    @property
+    def user_principal(self):
+        return '{0}@{1}'.format(USER, REALM)
+
+    @property
+    def service_principal(self):
+        return '{0}@{1}'.format(SERVICE, REALM)
+
+    def _run(self, *args):
+        with open(os.devnull, 'w') as devnull:
+            subprocess.check_call(args, env=self._env, stdout=devnull)
+
+    def start(self):
+        self.dir = tempfile.mkdtemp(prefix='python-gssapi-bench-')
+        self.port = _free_port()
+        paths = {
+            'KRB5_CONFIG': os.path.join(self.dir, 'krb5.conf'),
+            'KRB5_KDC_PROFILE': os.path.join(self.dir, 'kdc.conf'),
+            'KRB5_KTNAME': 'FILE:' + os.path.join(self.dir, 'service.keytab'),
+            'KRB5_CLIENT_KTNAME': 'FILE:' + os.path.join(self.dir, 'user.keytab'),
+            'KRB5CCNAME': 'FILE:' + os.path.join(self.dir, 'ccache'),
+        }
+        with open(paths['KRB5_CONFIG'], 'w') as conf:
+            conf.write(_KRB5_CONF.format(realm=REALM, port=self.port))
+        with open(paths['KRB5_KDC_PROFILE'], 'w') as conf:
+            conf.write(_KDC_CONF.format(realm=REALM, port=self.port, dir=self.dir))
+        with open(os.path.join(self.dir, 'kadm5.acl'), 'w') as acl:
+            acl.write('')
+
+        self._env = dict(os.environ)
+        self._env.update(paths)
+        try:
+            self._run(_find_program('kdb5_util'), '-r', REALM, 'create', '-s', '-P', 'bench-master-key')
+            kadmin = _find_program('kadmin.local')
+            for principal, keytab in ((SERVICE, paths['KRB5_KTNAME']),
+                                      (USER, paths['KRB5_CLIENT_KTNAME'])):
+                self._run(kadmin, '-r', REALM, '-q', 'addprinc -randkey {0}'.format(principal))
+                self._run(kadmin, '-r', REALM, '-q', 'ktadd -k {0} {1}'.format(keytab, principal))
+
+            self._process = subprocess.Popen([_find_program('krb5kdc'), '-n', '-r', REALM], env=self._env)
+            self._wait_for_kdc()
+            self._run(_find_program('kinit'), '-k', '-t', paths['KRB5_CLIENT_KTNAME'], self.user_principal)
+        except:
+            self.stop()
+            raise
+
+        self._saved_environ = dict((key, os.environ.get(key)) for key in paths)
+        os.environ.update(paths)
+        return self
+
+    def _wait_for_kdc(self, timeout=10.0):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self._process.poll() is not None:
+                raise RuntimeError("krb5kdc exited with status {0}".format(self._process.returncode))
+            try:
+                socket.create_connection(('127.0.0.1', self.port), 0.5).close()
+                return
+            except socket.error:
+                time.sleep(0.05)
+        raise RuntimeError("krb5kdc did not start listening on port {0}".format(self.port))
+
+    def stop(self):
+        if self._saved_environ is not None:
+            for key, value in self._saved_environ.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+            self._saved_environ = None
+        if self._process is not None:
+            self._process.terminate()
+            self._process.wait()
+            self._process = None
+        if self.dir is not None:
+            shutil.rmtree(self.dir, ignore_errors=True)
+            self.dir = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,1250 @@
+/*
+ * A null GSSAPI mechanism, for measuring the overhead of the Python bindings.
+ *
+ * This library implements the GSSAPI functions in gssapi/bindings/cffi_gssapi.cdef with no
+ * network access, no KDC and no real cryptography:
+ *
+ * - names are byte strings, canonicalized to Kerberos-like "user@NULL" and "service/host@NULL"
+ *   principals, and exported in the RFC 2743 exported name token format;
+ * - credentials are a name and a usage, and can be acquired for any name;
+ * - security contexts are established in one round trip (or one message without mutual
+ *   authentication), and per-message tokens are "protected" with a keyed FNV-1a checksum and an
+ *   XOR keystream, which is deterministic and detects corruption but is NOT secure.
+ *
+ * The mechanism identifies itself with the Kerberos 5 OID, so code which asks for Kerberos works
+ * unchanged. It must never be used outside tests and benchmarks.
+ *
+ * Build it with the Makefile in this directory, against MIT Kerberos GSSAPI headers.
+ */
+#include <pwd.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/types.h>
+
+#include <gssapi/gssapi.h>
+
+#define NULLGSS_REALM "NULL"
+#define NULLGSS_DEFAULT_PRINCIPAL "user@" NULLGSS_REALM
+/* The name reported for default acceptor credentials, which accept contexts for any target */
+#define NULLGSS_DEFAULT_ACCEPTOR "host/localhost@" NULLGSS_REALM
+
+/* Minor status codes */
+#define NULLGSS_E_NOMEM 1
+#define NULLGSS_E_BAD_TOKEN 2
+#define NULLGSS_E_WRONG_PRINCIPAL 3
+#define NULLGSS_E_BAD_CHECKSUM 4
+#define NULLGSS_E_BINDINGS 5
+
+static const char *minor_messages[] = {
+    "Success",
+    "Out of memory",
+    "Malformed or unexpected null mechanism token",
+    "Acceptor credential does not match the target name",
+    "Message checksum does not match",
+    "Channel bindings do not match",
+};
+
+static gss_OID_desc nullgss_oids[] = {
+    /* 0: 1.2.840.113554.1.2.1.1 */
+    {10, "\x2a\x86\x48\x86\xf7\x12\x01\x02\x01\x01"},
+    /* 1: 1.2.840.113554.1.2.1.2 */
+    {10, "\x2a\x86\x48\x86\xf7\x12\x01\x02\x01\x02"},
+    /* 2: 1.2.840.113554.1.2.1.3 */
+    {10, "\x2a\x86\x48\x86\xf7\x12\x01\x02\x01\x03"},
+    /* 3: 1.3.6.1.5.6.2 */
+    {6, "\x2b\x06\x01\x05\x06\x02"},
+    /* 4: 1.2.840.113554.1.2.1.4 */
+    {10, "\x2a\x86\x48\x86\xf7\x12\x01\x02\x01\x04"},
+    /* 5: 1.3.6.1.5.6.3 */
+    {6, "\x2b\x06\x01\x05\x06\x03"},
+    /* 6: 1.3.6.1.5.6.4 */
+    {6, "\x2b\x06\x01\x05\x06\x04"},
+    /* 7: 1.2.840.113554.1.2.2 (Kerberos 5) */
+    {9, "\x2a\x86\x48\x86\xf7\x12\x01\x02\x02"},
+    /* 8: 1.2.840.113554.1.2.2.1 (Kerberos 5 principal name) */
+    {10, "\x2a\x86\x48\x86\xf7\x12\x01\x02\x02\x01"},
+};
+
+gss_OID GSS_C_NT_USER_NAME = &nullgss_oids[0];
+gss_OID GSS_C_NT_MACHINE_UID_NAME = &nullgss_oids[1];
+gss_OID GSS_C_NT_STRING_UID_NAME = &nullgss_oids[2];
+gss_OID GSS_C_NT_HOSTBASED_SERVICE_X = &nullgss_oids[3];
+gss_OID GSS_C_NT_HOSTBASED_SERVICE = &nullgss_oids[4];
+gss_OID GSS_C_NT_ANONYMOUS = &nullgss_oids[5];
+gss_OID GSS_C_NT_EXPORT_NAME = &nullgss_oids[6];
+
+static gss_OID const nullgss_mech = &nullgss_oids[7];
+static gss_OID const nullgss_nt_principal = &nullgss_oids[8];
+
+struct nullgss_name {
+    char *value;
+    size_t length;
+    gss_OID type;   /* always one of nullgss_oids */
+    int is_mech;
+};
+
+struct nullgss_cred {
+    struct nullgss_name *name;  /* NULL for a default acceptor credential */
+    gss_cred_usage_t usage;
+};
+
+struct nullgss_ctx {
+    struct nullgss_name *initiator;
+    struct nullgss_name *target;
+    OM_uint32 flags;
+    uint32_t key;
+    int locally_initiated;
+    int open;
+};
+
+#define SUPPORTED_FLAGS (GSS_C_DELEG_FLAG | GSS_C_MUTUAL_FLAG | GSS_C_REPLAY_FLAG | \
+                         GSS_C_SEQUENCE_FLAG | GSS_C_CONF_FLAG | GSS_C_INTEG_FLAG)
+#define ESTABLISHED_FLAGS (GSS_C_PROT_READY_FLAG | GSS_C_TRANS_FLAG)
+
+/* Token layouts; all integers are 32 bit big-endian */
+#define INIT_TOKEN_ID "NGS1"    /* id, flags, bindings checksum, initiator, target */
+#define ACCEPT_TOKEN_ID "NGS2"  /* id, flags */
+#define MIC_TOKEN_ID "NGSM"     /* id, checksum */
+#define WRAP_TOKEN_ID "NGSW"    /* id, conf byte, checksum, payload */
+#define CONTEXT_TOKEN_ID "NGSC" /* id, flags, key, locally initiated, open, initiator, target */
+#define MIC_TOKEN_LEN 8
+#define WRAP_HEADER_LEN 9
+
+/* Helpers */
+
+static uint32_t fnv1a(uint32_t hash, const void *data, size_t length)
+{
+    const unsigned char *bytes = data;
+    size_t i;
+
+    for (i = 0; i < length; i++) {
+        hash ^= bytes[i];
+        hash *= 16777619u;
+    }
+    return hash;
+}
+
+static void put_uint32(unsigned char *p, uint32_t value)
+{
+    p[0] = (unsigned char)(value >> 24);
+    p[1] = (unsigned char)(value >> 16);
+    p[2] = (unsigned char)(value >> 8);
+    p[3] = (unsigned char)value;
+}
+
+static uint32_t get_uint32(const unsigned char *p)
+{
+    return ((uint32_t)p[0] << 24) | ((uint32_t)p[1] << 16) | ((uint32_t)p[2] << 8) | p[3];
+}
+
+static void keystream_xor(uint32_t key, unsigned char *data, size_t length)
+{
+    size_t i;
+
+    for (i = 0; i < length; i++)
+        data[i] ^= (unsigned char)((key >> (8 * (i & 3))) + i * 131);
+}
+
+static int oid_equal(const gss_OID a, const gss_OID b)
+{
+    return a->length == b->length && memcmp(a->elements, b->elements, a->length) == 0;
+}
+
+static int is_null_mech(const gss_OID mech)
+{
+    return mech == GSS_C_NO_OID || oid_equal(mech, nullgss_mech);
+}
+
+static gss_OID static_oid(const gss_OID oid)
+{
+    size_t i;
+
+    for (i = 0; i < sizeof(nullgss_oids) / sizeof(nullgss_oids[0]); i++) {
+        if (oid_equal(oid, &nullgss_oids[i]))
+            return &nullgss_oids[i];
+    }
+    return GSS_C_NO_OID;
+}
+
+static OM_uint32 set_buffer(OM_uint32 *minor_status, gss_buffer_t buffer, size_t length)
+{
+    buffer->value = malloc(length ? length : 1);
+    if (buffer->value == NULL) {
+        buffer->length = 0;
+        *minor_status = NULLGSS_E_NOMEM;
+        return GSS_S_FAILURE;
+    }
+    buffer->length = length;
+    return GSS_S_COMPLETE;
+}
+
+static void empty_buffer(gss_buffer_t buffer)
+{
+    if (buffer != GSS_C_NO_BUFFER) {
+        buffer->length = 0;
+        buffer->value = NULL;
+    }
+}
+
+static struct nullgss_name *new_name(const void *value, size_t length, gss_OID type, int is_mech)
+{
+    struct nullgss_name *name = malloc(sizeof(*name));
+
+    if (name == NULL)
+        return NULL;
+    name->value = malloc(length + 1);
+    if (name->value == NULL) {
+        free(name);
+        return NULL;
+    }
+    memcpy(name->value, value, length);
+    name->value[length] = '\0';
+    name->length = length;
+    name->type = type;
+    name->is_mech = is_mech;
+    return name;
+}
+
+static void free_name(struct nullgss_name *name)
+{
+    if (name != NULL) {
+        free(name->value);
+        free(name);
+    }
+}
+
+static struct nullgss_name *copy_name(const struct nullgss_name *name)
+{
+    return new_name(name->value, name->length, name->type, name->is_mech);
+}
+
+/* Converts a local user ID name to the principal of that user, like MIT Kerberos */
+static struct nullgss_name *uid_name(const struct nullgss_name *name)
+{
+    char value[256];
+    struct passwd *pw;
+    uid_t uid;
+    int length;
+
+    if (name->type == GSS_C_NT_MACHINE_UID_NAME) {
+        memcpy(&uid, name->value, sizeof(uid));
+    } else {
+        uid = (uid_t)strtoul(name->value, NULL, 10);
+    }
+    pw = getpwuid(uid);
+    if (pw != NULL)
+        length = snprintf(value, sizeof(value), "%s@%s", pw->pw_name, NULLGSS_REALM);
+    else
+        length = snprintf(value, sizeof(value), "%lu@%s", (unsigned long)uid, NULLGSS_REALM);
+    if (length < 0 || (size_t)length >= sizeof(value))
+        return NULL;
+    return new_name(value, length, nullgss_nt_principal, 1);
+}
+
+static struct nullgss_name *canonical_name(const struct nullgss_name *name)
+{
+    struct nullgss_name *result;
+    const char *at;
+    size_t length;
+    char *value;
+
+    if (name->is_mech)
+        return copy_name(name);
+
+    if (name->type == GSS_C_NT_STRING_UID_NAME || name->type == GSS_C_NT_MACHINE_UID_NAME)
+        return uid_name(name);
+
+    at = memchr(name->value, '@', name->length);
+    if (name->type == GSS_C_NT_HOSTBASED_SERVICE || name->type == GSS_C_NT_HOSTBASED_SERVICE_X) {
+        /* service@host -> service/host@NULL */
+        length = name->length + sizeof("/localhost@" NULLGSS_REALM);
+        value = malloc(length);
+        if (value == NULL)
+            return NULL;
+        if (at != NULL)
+            length = snprintf(value, length, "%.*s/%.*s@%s", (int)(at - name->value), name->value,
+                              (int)(name->length - (at - name->value) - 1), at + 1, NULLGSS_REALM);
+        else
+            length = snprintf(value, length, "%.*s/localhost@%s", (int)name->length, name->value,
+                              NULLGSS_REALM);
+    } else if (name->type == GSS_C_NT_ANONYMOUS) {
+        return new_name("WELLKNOWN/ANONYMOUS@WELLKNOWN:ANONYMOUS",
+                        sizeof("WELLKNOWN/ANONYMOUS@WELLKNOWN:ANONYMOUS") - 1, nullgss_nt_principal, 1);
+    } else if (at == NULL) {
+        /* user -> user@NULL */
+        length = name->length + sizeof("@" NULLGSS_REALM);
+        value = malloc(length);
+        if (value == NULL)
+            return NULL;
+        length = snprintf(value, length, "%.*s@%s", (int)name->length, name->value, NULLGSS_REALM);
+    } else {
+        return new_name(name->value, name->length, nullgss_nt_principal, 1);
+    }
+
+    result = new_name(value, length, nullgss_nt_principal, 1);
+    free(value);
+    return result;
+}
+
+static int names_equal(const struct nullgss_name *a, const struct nullgss_name *b)
+{
+    return a->length == b->length && memcmp(a->value, b->value, a->length) == 0;
+}
+
+static uint32_t bindings_checksum(const gss_channel_bindings_t bindings)
+{
+    uint32_t hash = 2166136261u;
+    unsigned char addrtype[4];
+
+    if (bindings == GSS_C_NO_CHANNEL_BINDINGS)
+        return 0;
+    put_uint32(addrtype, bindings->initiator_addrtype);
+    hash = fnv1a(hash, addrtype, 4);
+    hash = fnv1a(hash, bindings->initiator_address.value, bindings->initiator_address.length);
+    put_uint32(addrtype, bindings->acceptor_addrtype);
+    hash = fnv1a(hash, addrtype, 4);
+    hash = fnv1a(hash, bindings->acceptor_address.value, bindings->acceptor_address.length);
+    hash = fnv1a(hash, bindings->application_data.value, bindings->application_data.length);
+    return hash | 1;
+}
+
+static uint32_t context_key(const struct nullgss_name *initiator, const struct nullgss_name *target)
+{
+    uint32_t hash = fnv1a(2166136261u, initiator->value, initiator->length);
+
+    hash = fnv1a(hash, "\0", 1);
+    return fnv1a(hash, target->value, target->length);
+}
+
+static void free_context(struct nullgss_ctx *ctx)
+{
+    if (ctx != NULL) {
+        free_name(ctx->initiator);
+        free_name(ctx->target);
+        free(ctx);
+    }
+}
+
+/* Appends a 32 bit length and the name to p, and returns the end */
+static unsigned char *put_name(unsigned char *p, const struct nullgss_name *name)
+{
+    put_uint32(p, (uint32_t)name->length);
+    memcpy(p + 4, name->value, name->length);
+    return p + 4 + name->length;
+}
+
+/* Reads a name written by put_name, and returns NULL if it doesn't fit in end - *p bytes */
+static struct nullgss_name *get_name(const unsigned char **p, const unsigned char *end)
+{
+    struct nullgss_name *name;
+    uint32_t length;
+
+    if (end - *p < 4)
+        return NULL;
+    length = get_uint32(*p);
+    if ((size_t)(end - *p - 4) < length)
+        return NULL;
+    name = new_name(*p + 4, length, nullgss_nt_principal, 1);
+    *p += 4 + length;
+    return name;
+}
+
+static struct nullgss_cred *new_cred(struct nullgss_name *name, gss_cred_usage_t usage)
+{
+    struct nullgss_cred *cred = malloc(sizeof(*cred));
+
+    if (cred != NULL) {
+        cred->name = name;
+        cred->usage = usage;
+    }
+    return cred;
+}
+
+static struct nullgss_name *default_initiator(void)
+{
+    return new_name(NULLGSS_DEFAULT_PRINCIPAL, sizeof(NULLGSS_DEFAULT_PRINCIPAL) - 1,
+                    nullgss_nt_principal, 1);
+}
+
+/* OID sets */
+
+OM_uint32 gss_create_empty_oid_set(OM_uint32 *minor_status, gss_OID_set *oid_set)
+{
+    *minor_status = 0;
+    *oid_set = calloc(1, sizeof(**oid_set));
+    if (*oid_set == NULL) {
+        *minor_status = NULLGSS_E_NOMEM;
+        return GSS_S_FAILURE;
+    }
+    return GSS_S_COMPLETE;
+}
+
+OM_uint32 gss_test_oid_set_member(OM_uint32 *minor_status, const gss_OID member,
+                                  const gss_OID_set set, int *present)
+{
+    size_t i;
+
+    *minor_status = 0;
+    *present = 0;
+    if (member == GSS_C_NO_OID || set == GSS_C_NO_OID_SET)
+        return GSS_S_CALL_INACCESSIBLE_READ;
+    for (i = 0; i < set->count; i++) {
+        if (oid_equal(member, &set->elements[i])) {
+            *present = 1;
+            break;
+        }
+    }
+    return GSS_S_COMPLETE;
+}
+
+OM_uint32 gss_add_oid_set_member(OM_uint32 *minor_status, const gss_OID member_oid,
+                                 gss_OID_set *oid_set)
+{
+    gss_OID elements;
+    void *copy;
+    int present;
+
+    *minor_status = 0;
+    if (member_oid == GSS_C_NO_OID || oid_set == NULL || *oid_set == GSS_C_NO_OID_SET)
+        return GSS_S_CALL_INACCESSIBLE_READ;
+    gss_test_oid_set_member(minor_status, member_oid, *oid_set, &present);
+    if (present)
+        return GSS_S_COMPLETE;
+
+    copy = malloc(member_oid->length ? member_oid->length : 1);
+    elements = realloc((*oid_set)->elements, ((*oid_set)->count + 1) * sizeof(gss_OID_desc));
+    if (copy == NULL || elements == NULL) {
+        free(copy);
+        if (elements != NULL)
+            (*oid_set)->elements = elements;
+        *minor_status = NULLGSS_E_NOMEM;
+        return GSS_S_FAILURE;
+    }
+    memcpy(copy, member_oid->elements, member_oid->length);
+    elements[(*oid_set)->count].length = member_oid->length;
+    elements[(*oid_set)->count].elements = copy;
+    (*oid_set)->elements = elements;
+    (*oid_set)->count++;
+    return GSS_S_COMPLETE;
+}
+
+OM_uint32 gss_release_oid_set(OM_uint32 *minor_status, gss_OID_set *set)
+{
+    size_t i;
+
+    *minor_status = 0;
+    if (set == NULL || *set == GSS_C_NO_OID_SET)
+        return GSS_S_COMPLETE;
+    for (i = 0; i < (*set)->count; i++)
+        free((*set)->elements[i].elements);
+    free((*set)->elements);
+    free(*set);
+    *set = GSS_C_NO_OID_SET;
+    return GSS_S_COMPLETE;
+}
+
+static OM_uint32 oid_set_of(OM_uint32 *minor_status, gss_OID_set *set, const gss_OID *oids,
+                            size_t count)
+{
+    OM_uint32 major;
+    size_t i;
+
+    major = gss_create_empty_oid_set(minor_status, set);
+    for (i = 0; i < count && !GSS_ERROR(major); i++)
+        major = gss_add_oid_set_member(minor_status, oids[i], set);
+    if (GSS_ERROR(major)) {
+        OM_uint32 tmp;
+        gss_release_oid_set(&tmp, set);
+    }
+    return major;
+}
+
+OM_uint32 gss_indicate_mechs(OM_uint32 *minor_status, gss_OID_set *mech_set)
+{
+    return oid_set_of(minor_status, mech_set, &nullgss_mech, 1);
+}
+
+OM_uint32 gss_inquire_names_for_mech(OM_uint32 *minor_status, const gss_OID mechanism,
+                                     gss_OID_set *name_types)
+{
+    gss_OID types[5];
+
+    *minor_status = 0;
+    if (!is_null_mech(mechanism))
+        return GSS_S_BAD_MECH;
+    types[0] = GSS_C_NT_USER_NAME;
+    types[1] = GSS_C_NT_HOSTBASED_SERVICE;
+    types[2] = GSS_C_NT_ANONYMOUS;
+    types[3] = GSS_C_NT_EXPORT_NAME;
+    types[4] = nullgss_nt_principal;
+    return oid_set_of(minor_status, name_types, types, 5);
+}
+
+OM_uint32 gss_inquire_mechs_for_name(OM_uint32 *minor_status, const gss_name_t input_name,
+                                     gss_OID_set *mech_types)
+{
+    if (input_name == GSS_C_NO_NAME) {
+        *minor_status = 0;
+        return GSS_S_BAD_NAME;
+    }
+    return oid_set_of(minor_status, mech_types, &nullgss_mech, 1);
+}
+
+/* Buffers and status */
+
+OM_uint32 gss_release_buffer(OM_uint32 *minor_status, gss_buffer_t buffer)
+{
+    *minor_status = 0;
+    if (buffer != GSS_C_NO_BUFFER) {
+        free(buffer->value);
+        empty_buffer(buffer);
+    }
+    return GSS_S_COMPLETE;
+}
+
+OM_uint32 gss_display_status(OM_uint32 *minor_status, OM_uint32 status_value, int status_type,
+                             const gss_OID mech_type, OM_uint32 *message_context,
+                             gss_buffer_t status_string)
+{
+    char message[128];
+    int length;
+
+    (void)mech_type;
+    *minor_status = 0;
+    *message_context = 0;
+    if (status_type == GSS_C_MECH_CODE) {
+        if (status_value < sizeof(minor_messages) / sizeof(minor_messages[0]))
+            length = snprintf(message, sizeof(message), "%s", minor_messages[status_value]);
+        else
+            length = snprintf(message, sizeof(message), "Unknown null mechanism code %u",
+                              status_value);
+    } else if (status_type == GSS_C_GSS_CODE) {
+        length = snprintf(message, sizeof(message), "Null mechanism major status 0x%08x",
+                          status_value);
+    } else {
+        return GSS_S_BAD_STATUS;
+    }
+    if (set_buffer(minor_status, status_string, length) != GSS_S_COMPLETE)
+        return GSS_S_FAILURE;
+    memcpy(status_string->value, message, length);
+    return GSS_S_COMPLETE;
+}
+
+/* Names */
+
+static OM_uint32 import_export_token(OM_uint32 *minor_status, const gss_buffer_t token,
+                                     struct nullgss_name **name)
+{
+    const unsigned char *p = token->value;
+    size_t oid_len;
+    uint32_t name_len;
+
+    /* 04 01, 2 byte OID length, 06 <len> <mech OID>, 4 byte name length, name */
+    if (token->length < 8 || p[0] != 0x04 || p[1] != 0x01)
+        return GSS_S_DEFECTIVE_TOKEN;
+    oid_len = ((size_t)p[2] << 8) | p[3];
+    if (oid_len != nullgss_mech->length + 2 || token->length < 4 + oid_len + 4 || p[4] != 0x06 ||
+        p[5] != nullgss_mech->length || memcmp(p + 6, nullgss_mech->elements, p[5]) != 0)
+        return GSS_S_BAD_MECH;
+    name_len = get_uint32(p + 4 + oid_len);
+    if (token->length != 4 + oid_len + 4 + name_len)
+        return GSS_S_DEFECTIVE_TOKEN;
+    *name = new_name(p + 4 + oid_len + 4, name_len, nullgss_nt_principal, 1);
+    if (*name == NULL) {
+        *minor_status = NULLGSS_E_NOMEM;
+        return GSS_S_FAILURE;
+    }
+    return GSS_S_COMPLETE;
+}
+
+OM_uint32 gss_import_name(OM_uint32 *minor_status, const gss_buffer_t input_name_buffer,
+                          const gss_OID input_name_type, gss_name_t *output_name)
+{
+    struct nullgss_name *name = NULL;
+    gss_OID type = GSS_C_NT_USER_NAME;
+    OM_uint32 major;
+
+    *minor_status = 0;
+    *output_name = GSS_C_NO_NAME;
+    if (input_name_buffer == GSS_C_NO_BUFFER)
+        return GSS_S_CALL_INACCESSIBLE_READ;
+    if (input_name_type != GSS_C_NO_OID) {
+        type = static_oid(input_name_type);
+        if (type == GSS_C_NO_OID || type == nullgss_mech)
+            return GSS_S_BAD_NAMETYPE;
+        if (type == GSS_C_NT_MACHINE_UID_NAME && input_name_buffer->length != sizeof(uid_t))
+            return GSS_S_BAD_NAME;
+    }
+
+    if (type == GSS_C_NT_EXPORT_NAME) {
+        major = import_export_token(minor_status, input_name_buffer, &name);
+        if (GSS_ERROR(major))
+            return major;
+    } else {
+        name = new_name(input_name_buffer->value, input_name_buffer->length, type, 0);
+        if (name == NULL) {
+            *minor_status = NULLGSS_E_NOMEM;
+            return GSS_S_FAILURE;
+        }
+    }
+    *output_name = (gss_name_t)name;
+    return GSS_S_COMPLETE;
+}
+
+OM_uint32 gss_display_name(OM_uint32 *minor_status, const gss_name_t input_name,
+                           gss_buffer_t output_name_buffer, gss_OID *output_name_type)
+{
+    const struct nullgss_name *name = (const struct nullgss_name *)input_name;
+
+    *minor_status = 0;
+    if (name == NULL)
+        return GSS_S_BAD_NAME;
+    if (set_buffer(minor_status, output_name_buffer, name->length) != GSS_S_COMPLETE)
+        return GSS_S_FAILURE;
+    memcpy(output_name_buffer->value, name->value, name->length);
+    if (output_name_type != NULL)
+        *output_name_type = name->type;
+    return GSS_S_COMPLETE;
+}
+
+OM_uint32 gss_compare_name(OM_uint32 *minor_status, const gss_name_t name1, const gss_name_t name2,
+                           int *name_equal)
+{
+    const struct nullgss_name *a = (const struct nullgss_name *)name1;
+    const struct nullgss_name *b = (const struct nullgss_name *)name2;
+
+    struct nullgss_name *canon_a, *canon_b;
+
+    *minor_status = 0;
+    if (a == NULL || b == NULL)
+        return GSS_S_BAD_NAME;
+    if (a->type == b->type && a->is_mech == b->is_mech) {
+        *name_equal = names_equal(a, b);
+        return GSS_S_COMPLETE;
+    }
+    /* Names of different types are compared as mechanism names */
+    canon_a = canonical_name(a);
+    canon_b = canonical_name(b);
+    *name_equal = canon_a != NULL && canon_b != NULL && names_equal(canon_a, canon_b);
+    free_name(canon_a);
+    free_name(canon_b);
+    return GSS_S_COMPLETE;
+}
+
+OM_uint32 gss_duplicate_name(OM_uint32 *minor_status, const gss_name_t src_name,
+                             gss_name_t *dest_name)
+{
+    *minor_status = 0;
+    if (src_name == GSS_C_NO_NAME)
+        return GSS_S_BAD_NAME;
+    *dest_name = (gss_name_t)copy_name((const struct nullgss_name *)src_name);
+    if (*dest_name == GSS_C_NO_NAME) {
+        *minor_status = NULLGSS_E_NOMEM;
+        return GSS_S_FAILURE;
+    }
+    return GSS_S_COMPLETE;
+}
+
+OM_uint32 gss_canonicalize_name(OM_uint32 *minor_status, const gss_name_t input_name,
+                                const gss_OID mech_type, gss_name_t *output_name)
+{
+    *minor_status = 0;
+    if (input_name == GSS_C_NO_NAME)
+        return GSS_S_BAD_NAME;
+    if (mech_type == GSS_C_NO_OID || !is_null_mech(mech_type))
+        return GSS_S_BAD_MECH;
+    *output_name = (gss_name_t)canonical_name((const struct nullgss_name *)input_name);
+    if (*output_name == GSS_C_NO_NAME) {
+        *minor_status = NULLGSS_E_NOMEM;
+        return GSS_S_FAILURE;
+    }
+    return GSS_S_COMPLETE;
+}
+
+OM_uint32 gss_export_name(OM_uint32 *minor_status, const gss_name_t input_name,
+                          gss_buffer_t exported_name)
+{
+    const struct nullgss_name *name = (const struct nullgss_name *)input_name;
+    unsigned char *p;
+
+    *minor_status = 0;
+    if (name == NULL)
+        return GSS_S_BAD_NAME;
+    if (!name->is_mech)
+        return GSS_S_NAME_NOT_MN;
+    if (set_buffer(minor_status, exported_name, 4 + 2 + nullgss_mech->length + 4 + name->length))
+        return GSS_S_FAILURE;
+    p = exported_name->value;
+    p[0] = 0x04;
+    p[1] = 0x01;
+    p[2] = 0;
+    p[3] = (unsigned char)(nullgss_mech->length + 2);
+    p[4] = 0x06;
+    p[5] = (unsigned char)nullgss_mech->length;
+    memcpy(p + 6, nullgss_mech->elements, nullgss_mech->length);
+    put_name(p + 6 + nullgss_mech->length, name);
+    return GSS_S_COMPLETE;
+}
+
+OM_uint32 gss_release_name(OM_uint32 *minor_status, gss_name_t *name)
+{
+    *minor_status = 0;
+    if (name != NULL && *name != GSS_C_NO_NAME) {
+        free_name((struct nullgss_name *)*name);
+        *name = GSS_C_NO_NAME;
+    }
+    return GSS_S_COMPLETE;
+}
+
+/* Credentials */
+
+OM_uint32 gss_acquire_cred(OM_uint32 *minor_status, const gss_name_t desired_name,
+                           OM_uint32 time_req, const gss_OID_set desired_mechs,
+                           gss_cred_usage_t cred_usage, gss_cred_id_t *output_cred_handle,
+                           gss_OID_set *actual_mechs, OM_uint32 *time_rec)
+{
+    struct nullgss_name *name = NULL;
+    struct nullgss_cred *cred;
+    int present = 1;
+
+    (void)time_req;
+    *minor_status = 0;
+    *output_cred_handle = GSS_C_NO_CREDENTIAL;
+    if (cred_usage != GSS_C_INITIATE && cred_usage != GSS_C_ACCEPT && cred_usage != GSS_C_BOTH)
+        return GSS_S_FAILURE;
+    if (desired_mechs != GSS_C_NO_OID_SET)
+        gss_test_oid_set_member(minor_status, nullgss_mech, desired_mechs, &present);
+    if (!present)
+        return GSS_S_BAD_MECH;
+
+    if (desired_name != GSS_C_NO_NAME)
+        name = canonical_name((const struct nullgss_name *)desired_name);
+    else if (cred_usage != GSS_C_ACCEPT)
+        name = default_initiator();
+    if ((desired_name != GSS_C_NO_NAME || cred_usage != GSS_C_ACCEPT) && name == NULL) {
+        *minor_status = NULLGSS_E_NOMEM;
+        return GSS_S_FAILURE;
+    }
+    cred = new_cred(name, cred_usage);
+    if (cred == NULL) {
+        free_name(name);
+        *minor_status = NULLGSS_E_NOMEM;
+        return GSS_S_FAILURE;
+    }
+
+    if (actual_mechs != NULL && GSS_ERROR(gss_indicate_mechs(minor_status, actual_mechs))) {
+        free_name(name);
+        free(cred);
+        return GSS_S_FAILURE;
+    }
+    if (time_rec != NULL)
+        *time_rec = GSS_C_INDEFINITE;
+    *output_cred_handle = (gss_cred_id_t)cred;
+    return GSS_S_COMPLETE;
+}
+
+OM_uint32 gss_add_cred(OM_uint32 *minor_status, const gss_cred_id_t input_cred_handle,
+                       const gss_name_t desired_name, const gss_OID desired_mech,
+                       gss_cred_usage_t cred_usage, OM_uint32 initiator_time_req,
+                       OM_uint32 acceptor_time_req, gss_cred_id_t *output_cred_handle,
+                       gss_OID_set *actual_mechs, OM_uint32 *initiator_time_rec,
+                       OM_uint32 *acceptor_time_rec)
+{
+    (void)input_cred_handle;
+    (void)acceptor_time_req;
+    *minor_status = 0;
+    if (!is_null_mech(desired_mech))
+        return GSS_S_BAD_MECH;
+    if (output_cred_handle == NULL)
+        return GSS_S_DUPLICATE_ELEMENT;  /* there is only one mechanism */
+    if (initiator_time_rec != NULL)
+        *initiator_time_rec = GSS_C_INDEFINITE;
+    if (acceptor_time_rec != NULL)
+        *acceptor_time_rec = GSS_C_INDEFINITE;
+    return gss_acquire_cred(minor_status, desired_name, initiator_time_req, GSS_C_NO_OID_SET,
+                            cred_usage, output_cred_handle, actual_mechs, NULL);
+}
+
+OM_uint32 gss_inquire_cred(OM_uint32 *minor_status, const gss_cred_id_t cred_handle,
+                           gss_name_t *name, OM_uint32 *lifetime, gss_cred_usage_t *cred_usage,
+                           gss_OID_set *mechanisms)
+{
+    const struct nullgss_cred *cred = (const struct nullgss_cred *)cred_handle;
+    struct nullgss_name *cred_name;
+
+    *minor_status = 0;
+    if (name != NULL) {
+        if (cred == NULL)
+            cred_name = default_initiator();
+        else if (cred->name == NULL)
+            cred_name = new_name(NULLGSS_DEFAULT_ACCEPTOR, sizeof(NULLGSS_DEFAULT_ACCEPTOR) - 1,
+                                 nullgss_nt_principal, 1);
+        else
+            cred_name = copy_name(cred->name);
+        if (cred_name == NULL) {
+            *minor_status = NULLGSS_E_NOMEM;
+            return GSS_S_FAILURE;
+        }
+        *name = (gss_name_t)cred_name;
+    }
+    if (lifetime != NULL)
+        *lifetime = GSS_C_INDEFINITE;
+    if (cred_usage != NULL)
+        *cred_usage = cred != NULL ? cred->usage : GSS_C_INITIATE;
+    if (mechanisms != NULL && GSS_ERROR(gss_indicate_mechs(minor_status, mechanisms))) {
+        if (name != NULL)
+            gss_release_name(minor_status, name);
+        *minor_status = NULLGSS_E_NOMEM;
+        return GSS_S_FAILURE;
+    }
+    return GSS_S_COMPLETE;
+}
+
+OM_uint32 gss_inquire_cred_by_mech(OM_uint32 *minor_status, const gss_cred_id_t cred_handle,
+                                   const gss_OID mech_type, gss_name_t *name,
+                                   OM_uint32 *initiator_lifetime, OM_uint32 *acceptor_lifetime,
+                                   gss_cred_usage_t *cred_usage)
+{
+    OM_uint32 major;
+
+    *minor_status = 0;
+    if (!is_null_mech(mech_type))
+        return GSS_S_BAD_MECH;
+    major = gss_inquire_cred(minor_status, cred_handle, name, initiator_lifetime, cred_usage, NULL);
+    if (acceptor_lifetime != NULL)
+        *acceptor_lifetime = GSS_C_INDEFINITE;
+    return major;
+}
+
+OM_uint32 gss_release_cred(OM_uint32 *minor_status, gss_cred_id_t *cred_handle)
+{
+    struct nullgss_cred *cred;
+
+    *minor_status = 0;
+    if (cred_handle != NULL && *cred_handle != GSS_C_NO_CREDENTIAL) {
+        cred = (struct nullgss_cred *)*cred_handle;
+        free_name(cred->name);
+        free(cred);
+        *cred_handle = GSS_C_NO_CREDENTIAL;
+    }
+    return GSS_S_COMPLETE;
+}
+
+/* Security contexts */
+
+OM_uint32 gss_init_sec_context(OM_uint32 *minor_status, const gss_cred_id_t initiator_cred_handle,
+                               gss_ctx_id_t *context_handle, const gss_name_t target_name,
+                               const gss_OID mech_type, OM_uint32 req_flags, OM_uint32 time_req,
+                               const gss_channel_bindings_t input_chan_bindings,
+                               const gss_buffer_t input_token, gss_OID *actual_mech_type,
+                               gss_buffer_t output_token, OM_uint32 *ret_flags,
+                               OM_uint32 *time_rec)
+{
+    const struct nullgss_cred *cred = (const struct nullgss_cred *)initiator_cred_handle;
+    struct nullgss_ctx *ctx = (struct nullgss_ctx *)*context_handle;
+    unsigned char *p;
+
+    (void)time_req;
+    *minor_status = 0;
+    empty_buffer(output_token);
+    if (actual_mech_type != NULL)
+        *actual_mech_type = nullgss_mech;
+
+    if (ctx != NULL) {
+        /* Second call, with the acceptor's reply for mutual authentication */
+        p = input_token != GSS_C_NO_BUFFER ? input_token->value : NULL;
+        if (ctx->open || !ctx->locally_initiated || p == NULL || input_token->length != 8 ||
+            memcmp(p, ACCEPT_TOKEN_ID, 4) != 0 || get_uint32(p + 4) != ctx->flags) {
+            *minor_status = NULLGSS_E_BAD_TOKEN;
+            return GSS_S_DEFECTIVE_TOKEN;
+        }
+        ctx->open = 1;
+    } else {
+        if (target_name == GSS_C_NO_NAME)
+            return GSS_S_BAD_NAME;
+        if (!is_null_mech(mech_type))
+            return GSS_S_BAD_MECH;
+        if (cred != NULL && (cred->usage == GSS_C_ACCEPT || cred->name == NULL))
+            return GSS_S_NO_CRED;
+
+        ctx = calloc(1, sizeof(*ctx));
+        if (ctx == NULL) {
+            *minor_status = NULLGSS_E_NOMEM;
+            return GSS_S_FAILURE;
+        }
+        ctx->initiator = cred != NULL ? copy_name(cred->name) : default_initiator();
+        ctx->target = canonical_name((const struct nullgss_name *)target_name);
+        ctx->flags = (req_flags & SUPPORTED_FLAGS) | ESTABLISHED_FLAGS;
+        ctx->locally_initiated = 1;
+        ctx->open = !(req_flags & GSS_C_MUTUAL_FLAG);
+        if (ctx->initiator == NULL || ctx->target == NULL ||
+            set_buffer(minor_status, output_token,
+                       12 + 4 + ctx->initiator->length + 4 + ctx->target->length)) {
+            free_context(ctx);
+            *minor_status = NULLGSS_E_NOMEM;
+            return GSS_S_FAILURE;
+        }
+        ctx->key = context_key(ctx->initiator, ctx->target);
+
+        p = output_token->value;
+        memcpy(p, INIT_TOKEN_ID, 4);
+        put_uint32(p + 4, ctx->flags);
+        put_uint32(p + 8, bindings_checksum(input_chan_bindings));
+        put_name(put_name(p + 12, ctx->initiator), ctx->target);
+        *context_handle = (gss_ctx_id_t)ctx;
+    }
+
+    if (ret_flags != NULL)
+        *ret_flags = ctx->flags;
+    if (time_rec != NULL)
+        *time_rec = GSS_C_INDEFINITE;
+    return ctx->open ? GSS_S_COMPLETE : GSS_S_CONTINUE_NEEDED;
+}
+
+OM_uint32 gss_accept_sec_context(OM_uint32 *minor_status, gss_ctx_id_t *context_handle,
+                                 const gss_cred_id_t acceptor_cred_handle,
+                                 const gss_buffer_t input_token_buffer,
+                                 const gss_channel_bindings_t input_chan_bindings,
+                                 gss_name_t *src_name, gss_OID *mech_type,
+                                 gss_buffer_t output_token, OM_uint32 *ret_flags,
+                                 OM_uint32 *time_rec, gss_cred_id_t *delegated_cred_handle)
+{
+    const struct nullgss_cred *cred = (const struct nullgss_cred *)acceptor_cred_handle;
+    const unsigned char *p, *end;
+    struct nullgss_ctx *ctx;
+    struct nullgss_name *delegated_name;
+    uint32_t checksum;
+
+    *minor_status = 0;
+    empty_buffer(output_token);
+    if (delegated_cred_handle != NULL)
+        *delegated_cred_handle = GSS_C_NO_CREDENTIAL;
+    if (mech_type != NULL)
+        *mech_type = nullgss_mech;
+    if (*context_handle != GSS_C_NO_CONTEXT) {
+        *minor_status = NULLGSS_E_BAD_TOKEN;
+        return GSS_S_FAILURE;  /* contexts are established in one step */
+    }
+    if (cred != NULL && cred->usage == GSS_C_INITIATE)
+        return GSS_S_NO_CRED;
+    if (input_token_buffer == GSS_C_NO_BUFFER || input_token_buffer->length < 12 ||
+        memcmp(input_token_buffer->value, INIT_TOKEN_ID, 4) != 0) {
+        *minor_status = NULLGSS_E_BAD_TOKEN;
+        return GSS_S_DEFECTIVE_TOKEN;
+    }
+
+    ctx = calloc(1, sizeof(*ctx));
+    if (ctx == NULL) {
+        *minor_status = NULLGSS_E_NOMEM;
+        return GSS_S_FAILURE;
+    }
+    p = input_token_buffer->value;
+    end = p + input_token_buffer->length;
+    ctx->flags = get_uint32(p + 4);
+    checksum = get_uint32(p + 8);
+    p += 12;
+    ctx->initiator = get_name(&p, end);
+    ctx->target = ctx->initiator != NULL ? get_name(&p, end) : NULL;
+    if (ctx->target == NULL || p != end) {
+        free_context(ctx);
+        *minor_status = NULLGSS_E_BAD_TOKEN;
+        return GSS_S_DEFECTIVE_TOKEN;
+    }
+    if (cred != NULL && cred->name != NULL && !names_equal(cred->name, ctx->target)) {
+        free_context(ctx);
+        *minor_status = NULLGSS_E_WRONG_PRINCIPAL;
+        return GSS_S_NO_CRED;
+    }
+    if (input_chan_bindings != GSS_C_NO_CHANNEL_BINDINGS &&
+        checksum != bindings_checksum(input_chan_bindings)) {
+        free_context(ctx);
+        *minor_status = NULLGSS_E_BINDINGS;
+        return GSS_S_BAD_BINDINGS;
+    }
+    ctx->key = context_key(ctx->initiator, ctx->target);
+    ctx->open = 1;
+
+    if ((ctx->flags & GSS_C_MUTUAL_FLAG) && set_buffer(minor_status, output_token, 8)) {
+        free_context(ctx);
+        return GSS_S_FAILURE;
+    }
+    if (ctx->flags & GSS_C_MUTUAL_FLAG) {
+        memcpy(output_token->value, ACCEPT_TOKEN_ID, 4);
+        put_uint32((unsigned char *)output_token->value + 4, ctx->flags);
+    }
+    if (src_name != NULL)
+        *src_name = (gss_name_t)copy_name(ctx->initiator);
+    if (delegated_cred_handle != NULL && (ctx->flags & GSS_C_DELEG_FLAG)) {
+        delegated_name = copy_name(ctx->initiator);
+        *delegated_cred_handle = (gss_cred_id_t)new_cred(delegated_name, GSS_C_INITIATE);
+        if (*delegated_cred_handle == GSS_C_NO_CREDENTIAL)
+            free_name(delegated_name);
+    }
+    if (ret_flags != NULL)
+        *ret_flags = ctx->flags;
+    if (time_rec != NULL)
+        *time_rec = GSS_C_INDEFINITE;
+    *context_handle = (gss_ctx_id_t)ctx;
+    return GSS_S_COMPLETE;
+}
+
+OM_uint32 gss_delete_sec_context(OM_uint32 *minor_status, gss_ctx_id_t *context_handle,
+                                 gss_buffer_t output_token)
+{
+    *minor_status = 0;
+    empty_buffer(output_token);
+    if (context_handle == NULL || *context_handle == GSS_C_NO_CONTEXT)
+        return GSS_S_NO_CONTEXT;
+    free_context((struct nullgss_ctx *)*context_handle);
+    *context_handle = GSS_C_NO_CONTEXT;
+    return GSS_S_COMPLETE;
+}
+
+OM_uint32 gss_process_context_token(OM_uint32 *minor_status, const gss_ctx_id_t context_handle,
+                                    const gss_buffer_t token_buffer)
+{
+    (void)token_buffer;
+    *minor_status = 0;
+    return context_handle == GSS_C_NO_CONTEXT ? GSS_S_NO_CONTEXT : GSS_S_COMPLETE;
+}
+
+OM_uint32 gss_context_time(OM_uint32 *minor_status, const gss_ctx_id_t context_handle,
+                           OM_uint32 *time_rec)
+{
+    *minor_status = 0;
+    if (context_handle == GSS_C_NO_CONTEXT)
+        return GSS_S_NO_CONTEXT;
+    *time_rec = GSS_C_INDEFINITE;
+    return GSS_S_COMPLETE;
+}
+
+OM_uint32 gss_inquire_context(OM_uint32 *minor_status, const gss_ctx_id_t context_handle,
+                              gss_name_t *src_name, gss_name_t *targ_name, OM_uint32 *lifetime_rec,
+                              gss_OID *mech_type, OM_uint32 *ctx_flags, int *locally_initiated,
+                              int *open)
+{
+    const struct nullgss_ctx *ctx = (const struct nullgss_ctx *)context_handle;
+
+    *minor_status = 0;
+    if (ctx == NULL)
+        return GSS_S_NO_CONTEXT;
+    if (src_name != NULL)
+        *src_name = (gss_name_t)copy_name(ctx->initiator);
+    if (targ_name != NULL)
+        *targ_name = (gss_name_t)copy_name(ctx->target);
+    if ((src_name != NULL && *src_name == GSS_C_NO_NAME) ||
+        (targ_name != NULL && *targ_name == GSS_C_NO_NAME)) {
+        if (src_name != NULL)
+            gss_release_name(minor_status, src_name);
+        if (targ_name != NULL)
+            gss_release_name(minor_status, targ_name);
+        *minor_status = NULLGSS_E_NOMEM;
+        return GSS_S_FAILURE;
+    }
+    if (lifetime_rec != NULL)
+        *lifetime_rec = GSS_C_INDEFINITE;
+    if (mech_type != NULL)
+        *mech_type = nullgss_mech;
+    if (ctx_flags != NULL)
+        *ctx_flags = ctx->flags;
+    if (locally_initiated != NULL)
+        *locally_initiated = ctx->locally_initiated;
+    if (open != NULL)
+        *open = ctx->open;
+    return GSS_S_COMPLETE;
+}
+
+OM_uint32 gss_export_sec_context(OM_uint32 *minor_status, gss_ctx_id_t *context_handle,
+                                 gss_buffer_t interprocess_token)
+{
+    struct nullgss_ctx *ctx = (struct nullgss_ctx *)*context_handle;
+    unsigned char *p;
+
+    *minor_status = 0;
+    if (ctx == NULL)
+        return GSS_S_NO_CONTEXT;
+    if (!ctx->open)
+        return GSS_S_UNAVAILABLE;
+    if (set_buffer(minor_status, interprocess_token,
+                   14 + 4 + ctx->initiator->length + 4 + ctx->target->length))
+        return GSS_S_FAILURE;
+    p = interprocess_token->value;
+    memcpy(p, CONTEXT_TOKEN_ID, 4);
+    put_uint32(p + 4, ctx->flags);
+    put_uint32(p + 8, ctx->key);
+    p[12] = (unsigned char)ctx->locally_initiated;
+    p[13] = (unsigned char)ctx->open;
+    put_name(put_name(p + 14, ctx->initiator), ctx->target);
+    free_context(ctx);
+    *context_handle = GSS_C_NO_CONTEXT;
+    return GSS_S_COMPLETE;
+}
+
+OM_uint32 gss_import_sec_context(OM_uint32 *minor_status, const gss_buffer_t interprocess_token,
+                                 gss_ctx_id_t *context_handle)
+{
+    const unsigned char *p, *end;
+    struct nullgss_ctx *ctx;
+
+    *minor_status = 0;
+    *context_handle = GSS_C_NO_CONTEXT;
+    if (interprocess_token == GSS_C_NO_BUFFER || interprocess_token->length < 14 ||
+        memcmp(interprocess_token->value, CONTEXT_TOKEN_ID, 4) != 0) {
+        *minor_status = NULLGSS_E_BAD_TOKEN;
+        return GSS_S_DEFECTIVE_TOKEN;
+    }
+    ctx = calloc(1, sizeof(*ctx));
+    if (ctx == NULL) {
+        *minor_status = NULLGSS_E_NOMEM;
+        return GSS_S_FAILURE;
+    }
+    p = interprocess_token->value;
+    end = p + interprocess_token->length;
+    ctx->flags = get_uint32(p + 4);
+    ctx->key = get_uint32(p + 8);
+    ctx->locally_initiated = p[12];
+    ctx->open = p[13];
+    p += 14;
+    ctx->initiator = get_name(&p, end);
+    ctx->target = ctx->initiator != NULL ? get_name(&p, end) : NULL;
+    if (ctx->target == NULL || p != end) {
+        free_context(ctx);
+        *minor_status = NULLGSS_E_BAD_TOKEN;
+        return GSS_S_DEFECTIVE_TOKEN;
+    }
+    *context_handle = (gss_ctx_id_t)ctx;
+    return GSS_S_COMPLETE;
+}
+
+/* Per-message operations */
+
+static OM_uint32 check_open(OM_uint32 *minor_status, const struct nullgss_ctx *ctx)
+{
+    *minor_status = 0;
+    if (ctx == NULL)
+        return GSS_S_NO_CONTEXT;
+    if (!ctx->open)
+        return GSS_S_UNAVAILABLE;
+    return GSS_S_COMPLETE;
+}
+
+OM_uint32 gss_get_mic(OM_uint32 *minor_status, const gss_ctx_id_t context_handle,
+                      gss_qop_t qop_req, const gss_buffer_t message_buffer, gss_buffer_t msg_token)
+{
+    const struct nullgss_ctx *ctx = (const struct nullgss_ctx *)context_handle;
+    OM_uint32 major = check_open(minor_status, ctx);
+
+    if (GSS_ERROR(major))
+        return major;
+    if (qop_req != GSS_C_QOP_DEFAULT)
+        return GSS_S_BAD_QOP;
+    if (set_buffer(minor_status, msg_token, MIC_TOKEN_LEN))
+        return GSS_S_FAILURE;
+    memcpy(msg_token->value, MIC_TOKEN_ID, 4);
+    put_uint32((unsigned char *)msg_token->value + 4,
+               fnv1a(ctx->key, message_buffer->value, message_buffer->length));
+    return GSS_S_COMPLETE;
+}
+
+OM_uint32 gss_verify_mic(OM_uint32 *minor_status, const gss_ctx_id_t context_handle,
+                         const gss_buffer_t message_buffer, const gss_buffer_t token_buffer,
+                         gss_qop_t *qop_state)
+{
+    const struct nullgss_ctx *ctx = (const struct nullgss_ctx *)context_handle;
+    OM_uint32 major = check_open(minor_status, ctx);
+    const unsigned char *p = token_buffer->value;
+
+    if (GSS_ERROR(major))
+        return major;
+    if (qop_state != NULL)
+        *qop_state = GSS_C_QOP_DEFAULT;
+    if (token_buffer->length != MIC_TOKEN_LEN || memcmp(p, MIC_TOKEN_ID, 4) != 0) {
+        *minor_status = NULLGSS_E_BAD_TOKEN;
+        return GSS_S_DEFECTIVE_TOKEN;
+    }
+    if (get_uint32(p + 4) != fnv1a(ctx->key, message_buffer->value, message_buffer->length)) {
+        *minor_status = NULLGSS_E_BAD_CHECKSUM;
+        return GSS_S_BAD_SIG;
+    }
+    return GSS_S_COMPLETE;
+}
+
+OM_uint32 gss_wrap(OM_uint32 *minor_status, const gss_ctx_id_t context_handle, int conf_req_flag,
+                   gss_qop_t qop_req, const gss_buffer_t input_message_buffer, int *conf_state,
+                   gss_buffer_t output_message_buffer)
+{
+    const struct nullgss_ctx *ctx = (const struct nullgss_ctx *)context_handle;
+    OM_uint32 major = check_open(minor_status, ctx);
+    unsigned char *p;
+    int conf;
+
+    if (GSS_ERROR(major))
+        return major;
+    if (qop_req != GSS_C_QOP_DEFAULT)
+        return GSS_S_BAD_QOP;
+    if (set_buffer(minor_status, output_message_buffer,
+                   WRAP_HEADER_LEN + input_message_buffer->length))
+        return GSS_S_FAILURE;
+    conf = conf_req_flag && (ctx->flags & GSS_C_CONF_FLAG);
+    p = output_message_buffer->value;
+    memcpy(p, WRAP_TOKEN_ID, 4);
+    p[4] = (unsigned char)conf;
+    put_uint32(p + 5, fnv1a(ctx->key, input_message_buffer->value, input_message_buffer->length));
+    memcpy(p + WRAP_HEADER_LEN, input_message_buffer->value, input_message_buffer->length);
+    if (conf)
+        keystream_xor(ctx->key, p + WRAP_HEADER_LEN, input_message_buffer->length);
+    if (conf_state != NULL)
+        *conf_state = conf;
+    return GSS_S_COMPLETE;
+}
+
+OM_uint32 gss_unwrap(OM_uint32 *minor_status, const gss_ctx_id_t context_handle,
+                     const gss_buffer_t input_message_buffer, gss_buffer_t output_message_buffer,
+                     int *conf_state, gss_qop_t *qop_state)
+{
+    const struct nullgss_ctx *ctx = (const struct nullgss_ctx *)context_handle;
+    OM_uint32 major = check_open(minor_status, ctx);
+    const unsigned char *p = input_message_buffer->value;
+    size_t length;
+
+    if (GSS_ERROR(major))
+        return major;
+    if (input_message_buffer->length < WRAP_HEADER_LEN || memcmp(p, WRAP_TOKEN_ID, 4) != 0 ||
+        p[4] > 1) {
+        *minor_status = NULLGSS_E_BAD_TOKEN;
+        return GSS_S_DEFECTIVE_TOKEN;
+    }
+    length = input_message_buffer->length - WRAP_HEADER_LEN;
+    if (set_buffer(minor_status, output_message_buffer, length))
+        return GSS_S_FAILURE;
+    memcpy(output_message_buffer->value, p + WRAP_HEADER_LEN, length);
+    if (p[4])
+        keystream_xor(ctx->key, output_message_buffer->value, length);
+    if (get_uint32(p + 5) != fnv1a(ctx->key, output_message_buffer->value, length)) {
+        gss_release_buffer(minor_status, output_message_buffer);
+        *minor_status = NULLGSS_E_BAD_CHECKSUM;
+        return GSS_S_BAD_SIG;
+    }
+    if (conf_state != NULL)
+        *conf_state = p[4];
+    if (qop_state != NULL)
+        *qop_state = GSS_C_QOP_DEFAULT;
+    return GSS_S_COMPLETE;
+}
+
+OM_uint32 gss_wrap_size_limit(OM_uint32 *minor_status, const gss_ctx_id_t context_handle,
+                              int conf_req_flag, gss_qop_t qop_req, OM_uint32 req_output_size,
+                              OM_uint32 *max_input_size)
+{
+    OM_uint32 major = check_open(minor_status, (const struct nullgss_ctx *)context_handle);
+
+    (void)conf_req_flag;
+    if (GSS_ERROR(major))
+        return major;
+    if (qop_req != GSS_C_QOP_DEFAULT)
+        return GSS_S_BAD_QOP;
+    *max_input_size = req_output_size > WRAP_HEADER_LEN ? req_output_size - WRAP_HEADER_LEN : 0;
+    return GSS_S_COMPLETE;
+}
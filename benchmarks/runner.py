@@ -0,0 +1,179 @@
+"""
+Registers, times and compares benchmarks.
+
+A benchmark is a setup function decorated with :func:`benchmark`, which does any expensive
+preparation (acquiring credentials, establishing contexts) and returns a function taking no
+arguments which performs one operation. The operation is called in a loop which is calibrated to
+run for at least :data:`MIN_SAMPLE_TIME` seconds, and the time per call is sampled several times.
+"""
+from __future__ import absolute_import, division, print_function
+
+import datetime
+import functools
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import timeit
+
+
+MIN_SAMPLE_TIME = 0.1
+
+_BENCHMARKS = []
+
+
+class Benchmark(object):
+
+    def __init__(self, name, setup, requires_kdc=False, payload_size=None):
+        super(Benchmark, self).__init__()
+        self.name = name
+        self.setup = setup
+        self.requires_kdc = requires_kdc
+        self.payload_size = payload_size
+
+
+def benchmark(name, requires_kdc=False, params=None, payload=False):
+    """
+    Registers the decorated setup function as a benchmark called `name`. If `params` is given, one
+    benchmark called ``name[param]`` is registered for each param, and the setup function is called
+    with that param. If `payload` is True, the params are payload sizes in bytes and the results
+    include the throughput.
+    """
+    def decorator(setup):
+        if params is None:
+            _BENCHMARKS.append(Benchmark(name, setup, requires_kdc))
+        else:
+            for param in params:
+                _BENCHMARKS.append(Benchmark(
+                    '{0}[{1}]'.format(name, param), functools.partial(setup, param), requires_kdc,
+                    param if payload else None
+                ))
+        return setup
+    return decorator
+
+
+def _calibrate(func, timer):
+    loops = 1
+    while True:
+        start = timer()
+        for _ in range(loops):
+            func()
+        elapsed = timer() - start
+        if elapsed >= MIN_SAMPLE_TIME:
+            return loops
+        loops *= 2 if elapsed <= 0 else max(2, min(10, int(MIN_SAMPLE_TIME / elapsed * 1.2)))
+
+
+def time_benchmark(bench, repeat=5, timer=timeit.default_timer):
+    """Times `bench` and returns a dict of its results, with times in seconds per call."""
+    func = bench.setup()
+    loops = _calibrate(func, timer)
+    samples = []
+    for _ in range(repeat):
+        start = timer()
+        for _ in range(loops):
+            func()
+        samples.append((timer() - start) / loops)
+    mean = sum(samples) / len(samples)
+    result = {
+        'mean': mean,
+        'stdev': math.sqrt(sum((s - mean) ** 2 for s in samples) / (len(samples) - 1)) if repeat > 1 else 0.0,
+        'min': min(samples),
+        'loops': loops,
+        'samples': samples,
+    }
+    if bench.payload_size is not None:
+        result['bytes_per_second'] = bench.payload_size / mean
+    return result
+
+
+def _git_commit():
+    try:
+        with open(os.devnull, 'w') as devnull:
+            output = subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=devnull)
+        return output.decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(library='system'):
+    return {
+        'library': library,
+        'commit': _git_commit(),
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'date': datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+    }
+
+
+def format_time(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e3), ('us', 1e6)):
+        if seconds * scale >= 1:
+            return '{0:.3f} {1}'.format(seconds * scale, unit)
+    return '{0:.1f} ns'.format(seconds * 1e9)
+
+
+def run(benchmarks, repeat=5, library='system', out=sys.stdout):
+    """
+    Runs `benchmarks`, printing a line per benchmark to `out`, and returns the results. `library`
+    records which GSSAPI library the bindings were linked against.
+    """
+    results = {}
+    for bench in benchmarks:
+        result = results[bench.name] = time_benchmark(bench, repeat)
+        line = '{0:<40} {1:>12} +- {2:<12} {3:>12.0f} ops/s'.format(
+            bench.name, format_time(result['mean']), format_time(result['stdev']), 1 / result['mean']
+        )
+        if 'bytes_per_second' in result:
+            line += ' {0:>10.1f} MiB/s'.format(result['bytes_per_second'] / (1 << 20))
+        print(line, file=out)
+    return {'metadata': metadata(library), 'benchmarks': results}
+
+
+def save(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(old, new, threshold=0.05, out=sys.stdout):
+    """
+    Prints the change in mean time per call of each benchmark in both `old` and `new` results, and
+    returns the names of the benchmarks which are slower by more than `threshold` (a fraction).
+    Changes smaller than the sum of the standard deviations of the two results are not counted.
+    """
+    regressions = []
+    print('old: {0}  new: {1}'.format(
+        old['metadata'].get('commit') or old['metadata']['date'],
+        new['metadata'].get('commit') or new['metadata']['date']
+    ), file=out)
+    if old['metadata'].get('library') != new['metadata'].get('library'):
+        print('warning: comparing results from different GSSAPI libraries ({0} and {1})'.format(
+            old['metadata'].get('library'), new['metadata'].get('library')
+        ), file=out)
+    for name in sorted(set(old['benchmarks']) & set(new['benchmarks'])):
+        before, after = old['benchmarks'][name], new['benchmarks'][name]
+        change = after['mean'] / before['mean'] - 1
+        significant = (abs(change) > threshold and
+                       abs(after['mean'] - before['mean']) > before['stdev'] + after['stdev'])
+        if significant and change > 0:
+            verdict = 'slower'
+            regressions.append(name)
+        elif significant:
+            verdict = 'faster'
+        else:
+            verdict = ''
+        print('{0:<40} {1:>12} -> {2:<12} {3:>+7.1%} {4}'.format(
+            name, format_time(before['mean']), format_time(after['mean']), change, verdict
+        ), file=out)
+    for name in sorted(set(old['benchmarks']) ^ set(new['benchmarks'])):
+        print('{0:<40} only in {1} results'.format(name, 'old' if name in old['benchmarks'] else 'new'),
+              file=out)
+    return regressions
@@ -0,0 +1,117 @@
+"""
+A soak test for leaks in long-running processes. It repeatedly establishes a security context,
+wraps and unwraps a message and drops everything, and every so many cycles records:
+
+* the resident set size of the process,
+* the memory allocated by Python, as traced by :mod:`tracemalloc`, and
+* the number of live C handles of each type, as counted by :func:`gssapi.trace.live_handles`.
+
+The first sample is taken after one interval, once caches and allocator pools have warmed up, and
+the test fails if by the end any of these has grown by more than a fixed allowance over it. Live
+handles are allowed no growth at all.
+"""
+from __future__ import absolute_import, division, print_function
+
+import gc
+import os
+import sys
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+import gssapi
+from gssapi import trace
+
+MAX_RSS_GROWTH = 32 << 20
+MAX_TRACED_GROWTH = 1 << 20
+
+PAYLOAD = b'\x00' * 1024
+
+
+def _rss():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError):
+        # Peak rather than current, but growth in it still shows a leak
+        import resource
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+
+def _cycle(target):
+    initiator = gssapi.InitContext(target, req_flags=(
+        gssapi.C_MUTUAL_FLAG, gssapi.C_CONF_FLAG, gssapi.C_INTEG_FLAG
+    ))
+    acceptor = gssapi.AcceptContext()
+    token = initiator.step()
+    while not (initiator.established and acceptor.established):
+        token = acceptor.step(token)
+        if token:
+            token = initiator.step(token)
+    acceptor.unwrap(initiator.wrap(PAYLOAD))
+    initiator.unwrap(acceptor.wrap(PAYLOAD))
+
+
+def _sample(cycles):
+    gc.collect()
+    return {
+        'cycles': cycles,
+        'rss': _rss(),
+        'traced': tracemalloc.get_traced_memory()[0] if tracemalloc else None,
+        'handles': trace.live_handles(),
+    }
+
+
+def _format_sample(sample):
+    return '{0:>10} cycles  rss {1:>8.1f} MiB  traced {2}  handles {3}'.format(
+        sample['cycles'], sample['rss'] / (1 << 20),
+        '-' if sample['traced'] is None else '{0:.1f} KiB'.format(sample['traced'] / 1024),
+        ' '.join('{0}={1}'.format(k, v) for k, v in sorted(sample['handles'].items()))
+    )
+
+
+def check(baseline, sample):
+    """Returns a list of descriptions of the growth from `baseline` to `sample` which is too much."""
+    failures = []
+    if sample['rss'] - baseline['rss'] > MAX_RSS_GROWTH:
+        failures.append('RSS grew by {0:.1f} MiB'.format((sample['rss'] - baseline['rss']) / (1 << 20)))
+    if sample['traced'] is not None and sample['traced'] - baseline['traced'] > MAX_TRACED_GROWTH:
+        failures.append('Python allocations grew by {0:.1f} KiB'.format(
+            (sample['traced'] - baseline['traced']) / 1024
+        ))
+    for handle_type, count in sorted(sample['handles'].items()):
+        if count > baseline['handles'][handle_type]:
+            failures.append('{0} {1} handles leaked'.format(
+                count - baseline['handles'][handle_type], handle_type
+            ))
+    return failures
+
+
+def soak(cycles=1000000, interval=50000, service='host@localhost', out=sys.stdout):
+    """
+    Runs `cycles` handshake and wrap cycles against `service`, printing a sample every `interval`
+    cycles, and returns a list of descriptions of any unbounded growth found.
+    """
+    trace.enable()
+    if tracemalloc:
+        tracemalloc.start()
+    try:
+        target = gssapi.Name(service, gssapi.C_NT_HOSTBASED_SERVICE)
+        baseline = None
+        done = 0
+        while done < cycles:
+            for _ in range(min(interval, cycles - done)):
+                _cycle(target)
+            done += min(interval, cycles - done)
+            sample = _sample(done)
+            print(_format_sample(sample), file=out)
+            if baseline is None:
+                baseline = sample
+        return check(baseline, sample)
+    finally:
+        if tracemalloc:
+            tracemalloc.stop()
+        trace.disable()
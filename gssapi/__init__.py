@@ -81,7 +81,8 @@ try:
     C_DELEG_POLICY_FLAG = bindings.C.GSS_C_DELEG_POLICY_FLAG
 except AttributeError:
     pass
-from .creds import Credential
+from .acl import PrincipalACL
+from .creds import Credential, ImpersonationCache, MemoryCCachePool
 from .ctx import Context, InitContext, AcceptContext
 from .error import (
     GSSException, GSSCException, GSSMechException, GSSCallingError, GSSRoutineError,
@@ -90,9 +91,10 @@ from .error import (
     DefectiveCredential, CredentialsExpired, ContextExpired, Failure, BadQOP, Unauthorized,
     Unavailable, DuplicateElement, NameNotMechName
 )
-from .names import Name, MechName
-from .oids import OID, OIDSet, MutableOIDSet, get_all_mechs
-from .chanbind import ChannelBindings, IPv4ChannelBindings
+from .names import Name, MechName, NameCache, NameList
+from .keytab import KeytabWatcher
+from .oids import OID, OIDSet, MutableOIDSet, get_all_mechs, get_mech, refresh_mechs
+from .chanbind import ChannelBindings, FrozenChannelBindings, IPv4ChannelBindings
 try:
     from .chanbind import IPv6ChannelBindings
 except ImportError:
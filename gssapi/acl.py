@@ -0,0 +1,326 @@
+from __future__ import absolute_import
+
+from array import array
+import fnmatch
+import re
+import struct
+import sys
+
+import six
+
+from .exportname import build_exported_name, parse_exported_name
+from .names import MechName
+from .oids import OID
+
+
+# DER encoding (without tag and length) of the Kerberos 5 mechanism OID, 1.2.840.113554.1.2.2
+_KRB5_MECH_DER = b'\x2a\x86\x48\x86\xf7\x12\x01\x02\x02'
+
+_FILE_MAGIC = b'PYGSSACL'
+_FILE_VERSION = 1
+_FILE_HEADER = struct.Struct('<8sIIIQI')  # magic, version, mech length, entries, blob length, globs
+
+_GLOB_CHARS = re.compile(r'[*?\[]')
+
+# An array typecode for unsigned 32-bit offsets into the blob of exact entries
+_OFFSET_TYPECODE = 'I' if array('I').itemsize == 4 else 'L'
+
+
+def _offsets_from_bytes(data):
+    offsets = array(_OFFSET_TYPECODE)
+    if hasattr(offsets, 'frombytes'):
+        offsets.frombytes(data)
+    else:
+        offsets.fromstring(data)
+    if sys.byteorder == 'big':
+        offsets.byteswap()
+    return offsets
+
+
+def _offsets_to_bytes(offsets):
+    if sys.byteorder == 'big':
+        offsets = array(_OFFSET_TYPECODE, offsets)
+        offsets.byteswap()
+    if hasattr(offsets, 'tobytes'):
+        return offsets.tobytes()
+    else:
+        return offsets.tostring()
+
+
+def _split_realm(rule):
+    principal, sep, realm = rule.rpartition(b'@')
+    if not sep or not principal or not realm:
+        raise ValueError("ACL rule {0!r} has no realm".format(rule))
+    return principal, realm
+
+
+class PrincipalACL(object):
+    """
+    A compiled, read-only index of principals which are allowed access to some resource, for
+    checking the :attr:`~gssapi.ctx.AcceptContext.peer_name` of established security contexts
+    against large access control lists:
+
+    >>> acl = PrincipalACL.from_file('/etc/myservice/allowed_principals')
+    >>> ctx = AcceptContext()
+    >>> # ... step the context until it is established ...
+    >>> if ctx.peer_name not in acl:
+    ...     raise PermissionError(str(ctx.peer_name))
+
+    Each rule is a Kerberos principal string of one of the following forms:
+
+    * An exact principal, e.g. ``alice@EXAMPLE.COM`` or ``HTTP/www.example.com@EXAMPLE.COM``.
+      These are stored as exported mechanism names (see :meth:`~gssapi.names.MechName.export`) in
+      a single sorted blob with an array of offsets, and looked up by binary search.
+    * A realm wildcard, ``*@EXAMPLE.COM``, allowing every principal in the realm. These are kept in
+      a hash table.
+    * A service glob, e.g. ``HTTP/*.example.com@EXAMPLE.COM``, using :mod:`fnmatch` syntax for the
+      instance part. These are kept in a hash table keyed by realm and service, and the globs for
+      each realm and service are compiled into a single regular expression. If the service part
+      itself contains glob characters, the glob is matched against the whole principal name
+      (without the realm).
+
+    Names are matched in their exported form, so only names of the mechanism the ACL was compiled
+    for (Kerberos 5 by default) can be allowed. A compiled ACL can be written to a file with
+    :meth:`save` and loaded again quickly with :meth:`load`.
+
+    :param rules: The rules to compile.
+    :type rules: iterable of str or bytes
+    :param mech: The mechanism that names are matched for.
+    :type mech: :class:`~gssapi.oids.OID`
+    :raises: :exc:`ValueError` if a rule is not a valid principal or principal glob.
+    """
+
+    def __init__(self, rules=(), mech=None):
+        super(PrincipalACL, self).__init__()
+        if mech is None:
+            self._mech_der = _KRB5_MECH_DER
+        elif isinstance(mech, OID):
+            self._mech_der = mech._der
+        else:
+            raise TypeError("Expected an OID, got {0}".format(type(mech)))
+        self._realms = set()
+        self._globs = {}
+        self._glob_rules = []
+        self._compiled_globs = {}
+        exact = set()
+        for rule in rules:
+            if isinstance(rule, six.text_type):
+                rule = rule.encode('utf-8')
+            rule = rule.strip()
+            if not rule or rule.startswith(b'#'):
+                continue
+            if _GLOB_CHARS.search(rule.decode('utf-8')):
+                self._add_glob(rule)
+            else:
+                _split_realm(rule)
+                exact.add(build_exported_name(self._mech_der, rule))
+        self._set_exact(sorted(exact))
+        self.reset_stats()
+
+    def _set_exact(self, entries):
+        offsets = array(_OFFSET_TYPECODE, [0])
+        position = 0
+        for entry in entries:
+            position += len(entry)
+            offsets.append(position)
+        self._blob = b''.join(entries)
+        self._offsets = offsets
+
+    def _add_glob(self, rule):
+        principal, realm = _split_realm(rule)
+        if _GLOB_CHARS.search(realm.decode('utf-8')):
+            raise ValueError("ACL rule {0!r} has a glob in its realm".format(rule))
+        if principal == b'*':
+            if realm not in self._realms:
+                self._realms.add(realm)
+                self._glob_rules.append(rule)
+            return
+        self._glob_rules.append(rule)
+        service, sep, instance = principal.partition(b'/')
+        if _GLOB_CHARS.search(service.decode('utf-8')):
+            service, pattern = None, principal
+        else:
+            pattern = instance
+        self._globs.setdefault(realm, {}).setdefault(service, []).append(pattern)
+
+    def _glob_regex(self, realm, service):
+        key = (realm, service)
+        regex = self._compiled_globs.get(key)
+        if regex is None:
+            patterns = self._globs[realm][service]
+            regex = re.compile(b'|'.join(
+                b'(?:' + fnmatch.translate(p.decode('utf-8')).encode('utf-8') + b')' for p in patterns
+            ))
+            self._compiled_globs[key] = regex
+        return regex
+
+    @classmethod
+    def from_file(cls, path, mech=None):
+        """
+        Compiles an ACL from a text file containing one rule per line. Blank lines and lines
+        starting with ``#`` are ignored.
+
+        :param path: The path of the file to read.
+        :type path: str
+        :param mech: The mechanism that names are matched for.
+        :type mech: :class:`~gssapi.oids.OID`
+        :rtype: :class:`PrincipalACL`
+        """
+        with open(path, 'rb') as rules:
+            return cls(rules, mech)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads an ACL previously compiled and written to a file by :meth:`save`. This is much faster
+        than compiling the rules again, as the sorted blob of exact principals is read directly.
+
+        :param path: The path of the file to read.
+        :type path: str
+        :rtype: :class:`PrincipalACL`
+        :raises: :exc:`ValueError` if the file is not a compiled ACL.
+        """
+        with open(path, 'rb') as acl_file:
+            data = acl_file.read()
+        if len(data) < _FILE_HEADER.size:
+            raise ValueError("{0} is not a compiled ACL file".format(path))
+        magic, version, mech_len, entries, blob_len, globs_len = _FILE_HEADER.unpack_from(data)
+        if magic != _FILE_MAGIC or version != _FILE_VERSION:
+            raise ValueError("{0} is not a compiled ACL file".format(path))
+        position = _FILE_HEADER.size
+        offsets_len = 4 * (entries + 1)
+        if len(data) != position + mech_len + offsets_len + blob_len + globs_len:
+            raise ValueError("{0} is truncated".format(path))
+
+        acl = cls()
+        acl._mech_der = data[position:position + mech_len]
+        position += mech_len
+        acl._offsets = _offsets_from_bytes(data[position:position + offsets_len])
+        position += offsets_len
+        acl._blob = data[position:position + blob_len]
+        position += blob_len
+        for rule in data[position:].split(b'\n'):
+            if rule:
+                acl._add_glob(rule)
+        return acl
+
+    def save(self, path):
+        """
+        Writes this compiled ACL to a file, which can be loaded again with :meth:`load`.
+
+        :param path: The path of the file to write.
+        :type path: str
+        """
+        globs = b'\n'.join(self._glob_rules)
+        with open(path, 'wb') as acl_file:
+            acl_file.write(_FILE_HEADER.pack(
+                _FILE_MAGIC, _FILE_VERSION, len(self._mech_der), len(self._offsets) - 1,
+                len(self._blob), len(globs)
+            ))
+            acl_file.write(self._mech_der)
+            acl_file.write(_offsets_to_bytes(self._offsets))
+            acl_file.write(self._blob)
+            acl_file.write(globs)
+
+    def _find_exact(self, token):
+        blob, offsets = self._blob, self._offsets
+        low, high = 0, len(offsets) - 1
+        probes = 0
+        while low < high:
+            mid = (low + high) // 2
+            probes += 1
+            entry = blob[offsets[mid]:offsets[mid + 1]]
+            if entry == token:
+                self.probes += probes
+                return True
+            elif entry < token:
+                low = mid + 1
+            else:
+                high = mid
+        self.probes += probes
+        return False
+
+    def allows(self, name):
+        """
+        Checks whether a name is allowed by this ACL.
+
+        :param name: The name to check, usually the :attr:`~gssapi.ctx.AcceptContext.peer_name`
+            of an established :class:`~gssapi.ctx.AcceptContext`, or the bytes returned by
+            :meth:`~gssapi.names.MechName.export`.
+        :type name: :class:`~gssapi.names.MechName` or bytes
+        :returns: True if any rule allows the name, False otherwise.
+        :rtype: bool
+        """
+        if isinstance(name, MechName):
+            token = name.export()
+        elif isinstance(name, bytes):
+            token = name
+        else:
+            raise TypeError("Expected a MechName or exported name, got {0}".format(type(name)))
+
+        self.lookups += 1
+        if self._find_exact(token):
+            self.hits += 1
+            return True
+        if not self._realms and not self._globs:
+            return False
+
+        try:
+            mech_der, principal = parse_exported_name(token)
+        except ValueError:
+            return False
+        if mech_der != self._mech_der:
+            return False
+        principal, sep, realm = principal.rpartition(b'@')
+        if not sep:
+            return False
+        if realm in self._realms:
+            self.hits += 1
+            return True
+        services = self._globs.get(realm)
+        if services is None:
+            return False
+        service, sep, instance = principal.partition(b'/')
+        for key, subject in ((service, instance), (None, principal)):
+            if key in services:
+                self.glob_tests += 1
+                if self._glob_regex(realm, key).match(subject):
+                    self.hits += 1
+                    return True
+        return False
+
+    def __contains__(self, name):
+        return self.allows(name)
+
+    def __len__(self):
+        return len(self._offsets) - 1 + len(self._glob_rules)
+
+    def stats(self):
+        """
+        Returns statistics about the size of this ACL and the cost of lookups made against it.
+        ``probes`` is the total number of entries compared during binary searches of the exact
+        principals, and ``glob_tests`` is the number of service glob regular expressions evaluated.
+
+        :returns: a dict with the keys ``exact``, ``realms``, ``globs``, ``index_bytes``,
+            ``lookups``, ``hits``, ``probes`` and ``glob_tests``.
+        :rtype: dict
+        """
+        return {
+            'exact': len(self._offsets) - 1,
+            'realms': len(self._realms),
+            'globs': len(self._glob_rules) - len(self._realms),
+            'index_bytes': len(self._blob) + len(self._offsets) * self._offsets.itemsize,
+            'lookups': self.lookups,
+            'hits': self.hits,
+            'probes': self.probes,
+            'glob_tests': self.glob_tests,
+        }
+
+    def reset_stats(self):
+        """
+        Resets the lookup statistics returned by :meth:`stats` to zero.
+        """
+        self.lookups = 0
+        self.hits = 0
+        self.probes = 0
+        self.glob_tests = 0
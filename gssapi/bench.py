@@ -0,0 +1,403 @@
+"""
+A reference acceptor and a load generator, for measuring how python-gssapi performs with many
+concurrent security contexts. Start the acceptor with::
+
+    python -m gssapi.bench serve --port 10100
+
+It needs acceptor credentials, e.g. a keytab named by ``KRB5_KTNAME``. Then run clients against it
+with credentials for a user (e.g. from ``kinit``)::
+
+    python -m gssapi.bench load --connect server.example.com:10100 --service host@server.example.com
+
+The load generator opens a number of concurrent connections, each of which establishes a security
+context and then exchanges a number of wrapped messages, reconnecting until the time is up. It
+reports the handshake latency percentiles and the number of messages per second. If ``--connect``
+isn't given, an acceptor is started in the same process; this is convenient, but the clients and
+the acceptor then compete for the same interpreter.
+
+The acceptor speaks the same ``!WRAPTEST`` and ``!MICTEST`` commands as the integration test
+server, but every token and message is sent as a frame: a 4-byte big-endian length followed by
+that many bytes. The initiator sends context tokens until the acceptor replies with ``!OK``, and
+then sends any number of commands:
+
+* ``!WRAPTEST`` followed by a wrapped message. The acceptor replies with ``!OK`` and the message
+  wrapped again.
+* ``!MICTEST`` followed by a message and its MIC. The acceptor replies with ``!OK``, the message
+  and its own MIC for it.
+* ``!MYNAME``. The acceptor replies with the initiator's name.
+
+Any error is reported with ``!ERROR``, and the acceptor closes the connection.
+
+The acceptor needs the :mod:`asyncio` module.
+"""
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import math
+import socket
+import struct
+import sys
+import threading
+import time
+
+import six
+
+from . import C_NT_HOSTBASED_SERVICE
+from .bindings import C
+from .ctx import AcceptContext, InitContext
+from .error import GSSException
+from .names import Name
+
+_LENGTH = struct.Struct('>I')
+MAX_FRAME_SIZE = 16 << 20
+
+_FLAGS = (C.GSS_C_MUTUAL_FLAG, C.GSS_C_CONF_FLAG, C.GSS_C_INTEG_FLAG)
+
+_monotonic = getattr(time, 'monotonic', time.time)
+
+
+def _import_asyncio():
+    try:
+        import asyncio
+    except ImportError:
+        raise NotImplementedError("The reference acceptor requires the asyncio module")
+    return asyncio
+
+
+def frame(payload):
+    """Returns `payload` with its length prepended, ready to be sent."""
+    return _LENGTH.pack(len(payload)) + payload
+
+
+def _recv_exactly(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise EOFError("Connection closed by peer")
+        data.extend(chunk)
+    return bytes(data)
+
+
+def recv_frame(sock):
+    """Reads one frame from a blocking socket and returns its payload."""
+    length, = _LENGTH.unpack(_recv_exactly(sock, _LENGTH.size))
+    if length > MAX_FRAME_SIZE:
+        raise ValueError("Frame of {0} bytes is too large".format(length))
+    return _recv_exactly(sock, length)
+
+
+class AcceptorProtocol(object):
+    """
+    An :mod:`asyncio` protocol which serves one connection from an initiator. Pass a factory for it
+    to :meth:`asyncio.AbstractEventLoop.create_server`.
+
+    :param cred: The credential to accept contexts with. If not provided, the default acceptor
+        credential will be used.
+    :type cred: :class:`~gssapi.creds.Credential`
+    """
+
+    def __init__(self, cred=C.GSS_C_NO_CREDENTIAL):
+        super(AcceptorProtocol, self).__init__()
+        self._cred = cred
+        self._buffer = bytearray()
+        self._conversation = None
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self._conversation = self._converse()
+        next(self._conversation)
+
+    def data_received(self, data):
+        self._buffer.extend(data)
+        while self._conversation is not None and len(self._buffer) >= _LENGTH.size:
+            length, = _LENGTH.unpack_from(self._buffer)
+            if length > MAX_FRAME_SIZE:
+                self._close()
+                return
+            end = _LENGTH.size + length
+            if len(self._buffer) < end:
+                return
+            payload = bytes(self._buffer[_LENGTH.size:end])
+            del self._buffer[:end]
+            try:
+                self._conversation.send(payload)
+            except StopIteration:
+                self._close()
+            except GSSException:
+                self._send(b'!ERROR')
+                self._close()
+
+    def eof_received(self):
+        return False
+
+    def connection_lost(self, exc):
+        self._end_conversation()
+
+    def _send(self, payload):
+        self.transport.write(frame(payload))
+
+    def _end_conversation(self):
+        # Closing the generator closes its security context
+        if self._conversation is not None:
+            self._conversation.close()
+            self._conversation = None
+
+    def _close(self):
+        self._end_conversation()
+        self.transport.close()
+
+    def _converse(self):
+        # A generator which is sent each frame received, so the conversation can be written in order
+        with AcceptContext(self._cred) as ctx:
+            while not ctx.established:
+                out_token = ctx.step((yield))
+                if out_token:
+                    self._send(out_token)
+            self._send(b'!OK')
+
+            while True:
+                command = yield
+                if command == b'!WRAPTEST':
+                    message = ctx.unwrap((yield))
+                    self._send(b'!OK')
+                    self._send(ctx.wrap(message))
+                elif command == b'!MICTEST':
+                    message = yield
+                    ctx.verify_mic(message, (yield))
+                    self._send(b'!OK')
+                    self._send(message)
+                    self._send(ctx.get_mic(message))
+                elif command == b'!MYNAME':
+                    self._send(six.text_type(ctx.peer_name).encode('utf-8'))
+                else:
+                    self._send(b'!ERROR')
+                    return
+
+
+def serve(host='', port=10100, cred=C.GSS_C_NO_CREDENTIAL):
+    """Runs the reference acceptor until interrupted."""
+    asyncio = _import_asyncio()
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(loop.create_server(lambda: AcceptorProtocol(cred), host, port))
+    print("Listening on {0}".format(', '.join(str(s.getsockname()[:2]) for s in server.sockets)))
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        loop.run_until_complete(server.wait_closed())
+        loop.close()
+
+
+def _start_background_server(cred=C.GSS_C_NO_CREDENTIAL):
+    # Returns the address of an acceptor running in a new thread, and a function to stop it
+    asyncio = _import_asyncio()
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(
+        loop.create_server(lambda: AcceptorProtocol(cred), '127.0.0.1', 0)
+    )
+    thread = threading.Thread(target=loop.run_forever, name='gssapi-bench-acceptor')
+    thread.daemon = True
+    thread.start()
+
+    def stop():
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        server.close()
+        loop.run_until_complete(server.wait_closed())
+        loop.close()
+    return server.sockets[0].getsockname()[:2], stop
+
+
+def _expect_ok(sock):
+    reply = recv_frame(sock)
+    if reply != b'!OK':
+        raise RuntimeError("Acceptor replied {0!r}".format(reply))
+
+
+def _handshake(sock, ctx):
+    in_token = None
+    while True:
+        out_token = ctx.step(in_token)
+        if out_token:
+            sock.sendall(frame(out_token))
+        if ctx.established:
+            _expect_ok(sock)
+            return
+        in_token = recv_frame(sock)
+        if in_token == b'!ERROR':
+            raise RuntimeError("Acceptor failed to establish the context")
+
+
+def _wrap_test(sock, ctx, payload):
+    sock.sendall(frame(b'!WRAPTEST') + frame(ctx.wrap(payload)))
+    _expect_ok(sock)
+    if ctx.unwrap(recv_frame(sock)) != payload:
+        raise RuntimeError("Acceptor returned the wrong message")
+
+
+def _mic_test(sock, ctx, payload):
+    sock.sendall(frame(b'!MICTEST') + frame(payload) + frame(ctx.get_mic(payload)))
+    _expect_ok(sock)
+    message = recv_frame(sock)
+    ctx.verify_mic(message, recv_frame(sock))
+    if message != payload:
+        raise RuntimeError("Acceptor returned the wrong message")
+
+
+_COMMANDS = {'wrap': _wrap_test, 'mic': _mic_test}
+
+
+class _ClientResult(object):
+
+    def __init__(self):
+        super(_ClientResult, self).__init__()
+        self.handshakes = []
+        self.messages = 0
+        self.errors = 0
+        self.last_error = None
+
+
+def _run_client(address, target, test, payload, messages, deadline, result):
+    while _monotonic() < deadline:
+        try:
+            sock = socket.create_connection(address)
+            try:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                start = _monotonic()
+                with InitContext(target, req_flags=_FLAGS) as ctx:
+                    _handshake(sock, ctx)
+                    result.handshakes.append(_monotonic() - start)
+                    for _ in range(messages):
+                        test(sock, ctx, payload)
+                        result.messages += 1
+                        if _monotonic() >= deadline:
+                            break
+            finally:
+                sock.close()
+        except (GSSException, RuntimeError, EOFError, ValueError, socket.error) as exc:
+            result.errors += 1
+            result.last_error = exc
+
+
+def percentile(samples, percent):
+    """Returns the `percent` percentile of a sorted list of samples, by the nearest-rank method."""
+    if not samples:
+        return None
+    return samples[max(0, int(math.ceil(len(samples) * percent / 100)) - 1)]
+
+
+def load(address, service, clients=10, duration=10.0, messages=100, payload_size=1024,
+         command='wrap'):
+    """
+    Runs `clients` concurrent initiators against the acceptor at `address` for `duration` seconds.
+    Each establishes a security context with the hostbased service `service`, sends `messages`
+    commands of `payload_size` bytes, then reconnects.
+
+    :returns: a dict with the sorted ``handshake_latencies`` in seconds, and the numbers of
+        ``handshakes``, ``messages`` and ``errors``.
+    """
+    target = Name(service, C_NT_HOSTBASED_SERVICE)
+    payload = b'\x00' * payload_size
+    results = [_ClientResult() for _ in range(clients)]
+    started = _monotonic()
+    threads = [
+        threading.Thread(target=_run_client, args=(
+            address, target, _COMMANDS[command], payload, messages, started + duration, result
+        ))
+        for result in results
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = _monotonic() - started
+
+    latencies = sorted(latency for result in results for latency in result.handshakes)
+    errors = [result.last_error for result in results if result.last_error is not None]
+    return {
+        'elapsed': elapsed,
+        'handshakes': len(latencies),
+        'handshake_latencies': latencies,
+        'messages': sum(result.messages for result in results),
+        'errors': sum(result.errors for result in results),
+        'last_error': errors[-1] if errors else None,
+    }
+
+
+def _format_ms(seconds):
+    return '-' if seconds is None else '{0:.3f} ms'.format(seconds * 1e3)
+
+
+def report(results, out=sys.stdout):
+    elapsed = results['elapsed']
+    latencies = results['handshake_latencies']
+    print("handshakes: {0} ({1:.1f}/s)".format(results['handshakes'], results['handshakes'] / elapsed),
+          file=out)
+    print("handshake latency: " + '  '.join(
+        '{0} {1}'.format(label, _format_ms(value)) for label, value in (
+            ('p50', percentile(latencies, 50)),
+            ('p90', percentile(latencies, 90)),
+            ('p99', percentile(latencies, 99)),
+            ('max', latencies[-1] if latencies else None),
+        )
+    ), file=out)
+    print("messages: {0} ({1:.1f}/s)".format(results['messages'], results['messages'] / elapsed),
+          file=out)
+    if results['errors']:
+        print("errors: {0} (last: {1})".format(results['errors'], results['last_error']), file=out)
+
+
+def _address(value):
+    host, _, port = value.rpartition(':')
+    return host.strip('[]'), int(port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m gssapi.bench',
+                                     description="python-gssapi reference acceptor and load generator")
+    subparsers = parser.add_subparsers(dest='command')
+
+    serve_parser = subparsers.add_parser('serve', help="run the reference acceptor")
+    serve_parser.add_argument('--host', default='', help="address to listen on (default: all)")
+    serve_parser.add_argument('--port', type=int, default=10100, help="port to listen on")
+
+    load_parser = subparsers.add_parser('load', help="run concurrent clients against an acceptor")
+    load_parser.add_argument('--connect', type=_address, metavar='HOST:PORT',
+                             help="acceptor to connect to (default: start one in this process)")
+    load_parser.add_argument('--service', default='host@localhost',
+                             help="hostbased service name of the acceptor (default: host@localhost)")
+    load_parser.add_argument('-c', '--clients', type=int, default=10, help="concurrent clients")
+    load_parser.add_argument('-d', '--duration', type=float, default=10.0, help="seconds to run for")
+    load_parser.add_argument('-m', '--messages', type=int, default=100,
+                             help="messages to send on each connection before reconnecting")
+    load_parser.add_argument('-p', '--payload', type=int, default=1024, help="message size in bytes")
+    load_parser.add_argument('--mic', dest='test', action='store_const', const='mic', default='wrap',
+                             help="send !MICTEST instead of !WRAPTEST commands")
+
+    args = parser.parse_args(argv)
+    if args.command == 'serve':
+        serve(args.host, args.port)
+        return 0
+    elif args.command == 'load':
+        stop = None
+        address = args.connect
+        if address is None:
+            address, stop = _start_background_server()
+        try:
+            results = load(address, args.service, args.clients, args.duration, args.messages,
+                           args.payload, args.test)
+        finally:
+            if stop is not None:
+                stop()
+        report(results)
+        return 1 if results['errors'] else 0
+    parser.print_help()
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,6 +4,7 @@ import base64
 from collections import defaultdict
 import json
 import os.path
+import shlex
 import subprocess
 
 from cffi import CDefError, FFI, VerificationError
@@ -25,6 +26,11 @@ typedef struct gss_key_value_set_struct {
   ...;
 } gss_key_value_set_desc, *gss_const_key_value_set_t;
 ''',
+'''
+typedef int krb5_error_code;
+typedef struct _krb5_context *krb5_context;
+typedef struct _krb5_ccache *krb5_ccache;
+''',
 )
 _OPTIONAL_FUNCTIONS = (
 '''
@@ -101,9 +107,35 @@ OM_uint32 gss_store_cred_into(
   gss_OID_set *elements_stored,
   gss_cred_usage_t *cred_usage_stored);
 ''',
+'''
+OM_uint32 gss_acquire_cred_impersonate_name(
+  OM_uint32 *minor_status,
+  const gss_cred_id_t impersonator_cred_handle,
+  const gss_name_t desired_name,
+  OM_uint32 time_req,
+  const gss_OID_set desired_mechs,
+  gss_cred_usage_t cred_usage,
+  gss_cred_id_t *output_cred_handle,
+  gss_OID_set *actual_mechs,
+  OM_uint32 *time_rec);
+''',
+'''
+krb5_error_code krb5_init_context(krb5_context *context);
+void krb5_free_context(krb5_context context);
+krb5_error_code krb5_cc_resolve(krb5_context context, const char *name, krb5_ccache *cache);
+krb5_error_code krb5_cc_destroy(krb5_context context, krb5_ccache cache);
+''',
 )
 _OPTIONAL_DEFINES = ('GSS_C_DELEG_POLICY_FLAG', 'GSS_C_AF_INET6')
 
+# Environment variables which override the detected compiler and linker arguments, e.g. to link
+# against a different GSSAPI library
+_OVERRIDE_VARIABLES = ('GSSAPI_COMPILER_ARGS', 'GSSAPI_LINKER_ARGS')
+
+
+def _build_overrides():
+    return dict((var, os.environ[var]) for var in _OVERRIDE_VARIABLES if os.environ.get(var))
+
 
 def _detect_verify_args():
     source = '#include <gssapi/gssapi.h>'
@@ -143,6 +175,13 @@ def _detect_verify_args():
             # This is just guessing...
             kwargs['libraries'].append('gss')
 
+    overrides = _build_overrides()
+    if 'GSSAPI_COMPILER_ARGS' in overrides:
+        kwargs['extra_compile_args'] = shlex.split(overrides['GSSAPI_COMPILER_ARGS'])
+    if 'GSSAPI_LINKER_ARGS' in overrides:
+        kwargs['extra_link_args'] = shlex.split(overrides['GSSAPI_LINKER_ARGS'])
+        kwargs.pop('libraries', None)
+
     final_kwargs = dict(kwargs)
     final_kwargs['ext_package'] = 'gssapi.bindings'
 
@@ -151,6 +190,11 @@ def _detect_verify_args():
     if check_gssapi_ext and _is_verifiable('', [with_gssapi_ext], final_kwargs):
         source = with_gssapi_ext
 
+    # Check if gssapi/gssapi_krb5.h is available, for the few krb5 functions we use
+    with_gssapi_krb5 = '\n'.join([source, '#include <gssapi/gssapi_krb5.h>'])
+    if check_gssapi_ext and _is_verifiable('', [with_gssapi_krb5], final_kwargs):
+        source = with_gssapi_krb5
+
     return source, final_kwargs
 
 
@@ -257,14 +301,23 @@ def _kwargs_decode(input):
         return input
 
 
+def _read_cached_header():
+    if not resource_exists(__name__, 'autogenerated.cdef'):
+        return None
+    generated_cdefs = resource_string(__name__, 'autogenerated.cdef').decode('utf-8')
+    # The first line (comment) is the verify settings, encoded
+    line = generated_cdefs.splitlines()[0]
+    settings = json.loads(base64.b64decode(line[3:-3].encode('ascii')).decode('utf-8'))
+    if _kwargs_decode(settings.get('overrides', {})) != _build_overrides():
+        # Generated for a different library, so detect everything again
+        return None
+    return generated_cdefs, settings['source'], _kwargs_decode(settings['kwargs'])
+
+
 def _read_header():
-    if resource_exists(__name__, 'autogenerated.cdef'):
-        generated_cdefs = resource_string(__name__, 'autogenerated.cdef').decode('utf-8')
-        # The first line (comment) is the verify settings, encoded
-        line = generated_cdefs.splitlines()[0]
-        settings = json.loads(base64.b64decode(line[3:-3].encode('ascii')).decode('utf-8'))
-        source = settings['source']
-        kwargs = _kwargs_decode(settings['kwargs'])
+    cached = _read_cached_header()
+    if cached is not None:
+        generated_cdefs, source, kwargs = cached
     else:
         cdefs = resource_string(__name__, 'cffi_gssapi.cdef').decode('utf-8')
         source, kwargs = _detect_verify_args()
@@ -274,7 +327,8 @@ def _read_header():
         generated_cdefs = '/* '
         generated_cdefs += base64.b64encode(json.dumps({
             'source': source,
-            'kwargs': kwargs
+            'kwargs': kwargs,
+            'overrides': _build_overrides()
         }).encode('utf-8')).decode('ascii')
         generated_cdefs += ' */\n'
         for define in _OPTIONAL_DEFINES:
@@ -1,8 +1,92 @@
 from __future__ import absolute_import
 
+from collections import OrderedDict
+import hashlib
 import socket
+import threading
+
+import six
 
 from .bindings import C, ffi, _buf_to_str
+from .oids import _dotted_to_der
+
+
+# Hash functions used for tls-server-end-point bindings (RFC 5929 section 4.1), by the DER encoding
+# of the certificate signature algorithm. MD5 and SHA-1 are replaced by SHA-256.
+_SIGNATURE_HASHES = dict((_dotted_to_der(dotted), hash_name) for dotted, hash_name in (
+    ('1.2.840.113549.1.1.4', 'sha256'),  # md5WithRSAEncryption
+    ('1.2.840.113549.1.1.5', 'sha256'),  # sha1WithRSAEncryption
+    ('1.2.840.113549.1.1.14', 'sha224'),  # sha224WithRSAEncryption
+    ('1.2.840.113549.1.1.11', 'sha256'),  # sha256WithRSAEncryption
+    ('1.2.840.113549.1.1.12', 'sha384'),  # sha384WithRSAEncryption
+    ('1.2.840.113549.1.1.13', 'sha512'),  # sha512WithRSAEncryption
+    ('1.2.840.10040.4.3', 'sha256'),  # dsa-with-sha1
+    ('2.16.840.1.101.3.4.3.1', 'sha224'),  # dsa-with-sha224
+    ('2.16.840.1.101.3.4.3.2', 'sha256'),  # dsa-with-sha256
+    ('1.2.840.10045.4.1', 'sha256'),  # ecdsa-with-SHA1
+    ('1.2.840.10045.4.3.1', 'sha224'),  # ecdsa-with-SHA224
+    ('1.2.840.10045.4.3.2', 'sha256'),  # ecdsa-with-SHA256
+    ('1.2.840.10045.4.3.3', 'sha384'),  # ecdsa-with-SHA384
+    ('1.2.840.10045.4.3.4', 'sha512'),  # ecdsa-with-SHA512
+))
+
+# Hash algorithms which may be given in RSASSA-PSS parameters
+_PSS_OID = _dotted_to_der('1.2.840.113549.1.1.10')
+_DIGEST_HASHES = dict((_dotted_to_der(dotted), hash_name) for dotted, hash_name in (
+    ('1.3.14.3.2.26', 'sha256'),  # sha1
+    ('2.16.840.1.101.3.4.2.4', 'sha224'),
+    ('2.16.840.1.101.3.4.2.1', 'sha256'),
+    ('2.16.840.1.101.3.4.2.2', 'sha384'),
+    ('2.16.840.1.101.3.4.2.3', 'sha512'),
+))
+
+# Recently computed tls-server-end-point application data, by certificate
+_END_POINT_CACHE_SIZE = 1024
+_end_point_cache = OrderedDict()
+_end_point_cache_lock = threading.Lock()
+
+
+def _der_tlv(data, offset):
+    # Returns the tag, the offset of the value and the offset after the value of the DER TLV at
+    # data[offset:]
+    if offset + 2 > len(data):
+        raise ValueError("Truncated DER value")
+    tag = six.indexbytes(data, offset)
+    length = six.indexbytes(data, offset + 1)
+    offset += 2
+    if length & 0x80:
+        num_bytes = length & 0x7f
+        if num_bytes == 0 or offset + num_bytes > len(data):
+            raise ValueError("Invalid DER length")
+        length = 0
+        for i in range(offset, offset + num_bytes):
+            length = (length << 8) | six.indexbytes(data, i)
+        offset += num_bytes
+    if offset + length > len(data):
+        raise ValueError("Truncated DER value")
+    return tag, offset, offset + length
+
+
+def _certificate_hash(certificate):
+    # Picks the hash function for tls-server-end-point from the certificate's signatureAlgorithm:
+    # Certificate ::= SEQUENCE { tbsCertificate, signatureAlgorithm AlgorithmIdentifier, ... }
+    _, cert_start, _ = _der_tlv(certificate, 0)
+    _, _, tbs_end = _der_tlv(certificate, cert_start)
+    _, alg_start, alg_end = _der_tlv(certificate, tbs_end)
+    tag, oid_start, oid_end = _der_tlv(certificate, alg_start)
+    if tag != 0x06:
+        raise ValueError("Invalid certificate signature algorithm")
+    algorithm = certificate[oid_start:oid_end]
+    if algorithm == _PSS_OID and oid_end < alg_end:
+        # RSASSA-PSS-params ::= SEQUENCE { hashAlgorithm [0] AlgorithmIdentifier DEFAULT sha1, ... }
+        _, params_start, params_end = _der_tlv(certificate, oid_end)
+        if params_start < params_end:
+            tag, hash_start, _ = _der_tlv(certificate, params_start)
+            if tag == 0xa0:
+                _, hash_alg_start, _ = _der_tlv(certificate, hash_start)
+                _, hash_oid_start, hash_oid_end = _der_tlv(certificate, hash_alg_start)
+                return _DIGEST_HASHES.get(certificate[hash_oid_start:hash_oid_end], 'sha256')
+    return _SIGNATURE_HASHES.get(algorithm, 'sha256')
 
 
 class ChannelBindings(object):
@@ -40,6 +124,95 @@ class ChannelBindings(object):
         self.acceptor_address = acceptor_address
         self.application_data = application_data
 
+    @classmethod
+    def tls_server_end_point(cls, source):
+        """
+        Creates ``tls-server-end-point`` channel bindings, as defined in RFC 5929 section 4, which
+        bind a security context to the TLS server certificate. The certificate is hashed with the
+        hash function used in its signature algorithm, or SHA-256 if that is MD5, SHA-1 or can't be
+        determined (e.g. for EdDSA certificates).
+
+        The computed bindings are cached per certificate, so servers which accept many connections
+        with the same certificate don't hash it each time.
+
+        :param source: On the client, the :class:`ssl.SSLSocket` or :class:`ssl.SSLObject`
+            connected to the server. On the server, which can't get its own certificate from the
+            :mod:`ssl` module, the DER-encoded server certificate.
+        :type source: :class:`ssl.SSLSocket`, :class:`ssl.SSLObject` or bytes
+        :rtype: :class:`ChannelBindings`
+        :raises: :exc:`ValueError` if there is no peer certificate, or the certificate can't be
+            parsed.
+        """
+        if isinstance(source, bytes):
+            certificate = source
+        else:
+            certificate = source.getpeercert(binary_form=True)
+            if not certificate:
+                raise ValueError("The TLS connection has no peer certificate")
+
+        with _end_point_cache_lock:
+            application_data = _end_point_cache.pop(certificate, None)
+            if application_data is not None:
+                _end_point_cache[certificate] = application_data
+        if application_data is None:
+            digest = hashlib.new(_certificate_hash(certificate), certificate).digest()
+            application_data = b'tls-server-end-point:' + digest
+            with _end_point_cache_lock:
+                _end_point_cache[certificate] = application_data
+                while len(_end_point_cache) > _END_POINT_CACHE_SIZE:
+                    _end_point_cache.popitem(last=False)
+        return cls(application_data=application_data)
+
+    @classmethod
+    def tls_unique(cls, ssl_socket):
+        """
+        Creates ``tls-unique`` channel bindings, as defined in RFC 5929 section 3, which bind a
+        security context to a specific TLS connection. These are not defined for TLS 1.3, for which
+        :meth:`tls_exporter` should be used instead.
+
+        :param ssl_socket: The TLS connection.
+        :type ssl_socket: :class:`ssl.SSLSocket` or :class:`ssl.SSLObject`
+        :rtype: :class:`ChannelBindings`
+        :raises: :exc:`ValueError` if the TLS connection has no ``tls-unique`` data, e.g. because
+            the handshake is not complete or TLS 1.3 was negotiated.
+        """
+        data = ssl_socket.get_channel_binding('tls-unique')
+        if not data:
+            raise ValueError("tls-unique channel binding data is not available for this connection")
+        return cls(application_data=b'tls-unique:' + data)
+
+    @classmethod
+    def tls_exporter(cls, connection):
+        """
+        Creates ``tls-exporter`` channel bindings, as defined in RFC 9266, which bind a security
+        context to a specific TLS 1.3 connection. The standard library :mod:`ssl` module can't
+        export keying material, so this needs a connection object with an
+        ``export_keying_material(label, length, context)`` method, like
+        :class:`OpenSSL.SSL.Connection` from pyOpenSSL.
+
+        :param connection: The TLS connection.
+        :rtype: :class:`ChannelBindings`
+        :raises: :exc:`NotImplementedError` if the connection can't export keying material.
+        """
+        if not hasattr(connection, 'export_keying_material'):
+            raise NotImplementedError(
+                "tls-exporter channel bindings need a TLS connection supporting "
+                "export_keying_material"
+            )
+        data = connection.export_keying_material(b'EXPORTER-Channel-Binding', 32, b'')
+        return cls(application_data=b'tls-exporter:' + data)
+
+    def freeze(self):
+        """
+        Creates an immutable copy of these channel bindings.
+
+        :rtype: :class:`FrozenChannelBindings`
+        """
+        return FrozenChannelBindings(
+            self.initiator_addrtype, self.initiator_address, self.acceptor_addrtype,
+            self.acceptor_address, self.application_data
+        )
+
     @property
     def initiator_addrtype(self):
         return self._cb.initiator_addrtype
@@ -102,6 +275,98 @@ class ChannelBindings(object):
             self._cb.application_data.value = ffi.NULL
 
 
+class FrozenChannelBindings(ChannelBindings):
+    """
+    Immutable, hashable channel bindings, which can be created once and shared between all the
+    security contexts created for e.g. a listening socket. The C structure passed to the GSSAPI is
+    built once when the object is created. Use :meth:`derive` to create bindings for a specific
+    connection when only some of the fields vary between connections; the derived bindings share
+    the copies of the fields which don't change.
+
+    The parameters are the same as for :class:`ChannelBindings`, but can't be changed after the
+    object is created.
+    """
+
+    # The names of the fields, in the order of _values
+    _FIELDS = ('initiator_addrtype', 'initiator_address', 'acceptor_addrtype', 'acceptor_address',
+               'application_data')
+    # The indexes in _values of the fields which are stored in buffers, in the order of _bufs
+    _BUFFER_FIELDS = (1, 3, 4)
+
+    def __init__(self, initiator_addrtype=C.GSS_C_AF_NULLADDR, initiator_address=None,
+                 acceptor_addrtype=C.GSS_C_AF_NULLADDR, acceptor_address=None,
+                 application_data=None):
+        # ChannelBindings.__init__ isn't called, as its setters make the bindings mutable
+        self._build((
+            initiator_addrtype, initiator_address or b'',
+            acceptor_addrtype, acceptor_address or b'',
+            application_data or b'',
+        ))
+
+    def _build(self, values, base=None, changed=()):
+        # Fills in the C structure for values. If base is given, the buffers of the fields whose
+        # indexes aren't in changed are shared with it rather than copied.
+        cb = ffi.new('gss_channel_bindings_t')
+        cb.initiator_addrtype = values[0]
+        cb.acceptor_addrtype = values[2]
+        bufs = []
+        for i, (index, field) in enumerate(zip(
+            self._BUFFER_FIELDS, (cb.initiator_address, cb.acceptor_address, cb.application_data)
+        )):
+            if base is not None and index not in changed:
+                buf = base._bufs[i]
+            else:
+                buf = ffi.new('char[]', values[index]) if values[index] else None
+            field.length = len(values[index])
+            field.value = ffi.NULL if buf is None else buf
+            bufs.append(buf)
+        object.__setattr__(self, '_values', values)
+        object.__setattr__(self, '_bufs', tuple(bufs))
+        object.__setattr__(self, '_cb', cb)
+        object.__setattr__(self, '_hash', hash(values))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("FrozenChannelBindings objects can't be modified")
+
+    def __eq__(self, other):
+        if isinstance(other, FrozenChannelBindings):
+            return self._values == other._values
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __hash__(self):
+        return self._hash
+
+    def derive(self, **changes):
+        """
+        Creates new bindings with some of the fields changed, e.g. the initiator address of a
+        connection accepted by a listener whose bindings were created with only the acceptor
+        address and application data. Only the changed fields are copied; the others are shared
+        with these bindings.
+
+        :param changes: The fields to change, with the same names as the parameters of
+            :class:`ChannelBindings`.
+        :rtype: :class:`FrozenChannelBindings`
+        """
+        values = list(self._values)
+        changed = set()
+        for name, value in changes.items():
+            try:
+                index = self._FIELDS.index(name)
+            except ValueError:
+                raise TypeError("Unknown channel bindings field {0}".format(name))
+            if index in self._BUFFER_FIELDS:
+                value = value or b''
+            values[index] = value
+            changed.add(index)
+        derived = object.__new__(type(self))
+        derived._build(tuple(values), self, changed)
+        return derived
+
+
 class IPv4ChannelBindings(ChannelBindings):
     """
     Represents channel bindings using IPv4 initiator and/or acceptor addresses.
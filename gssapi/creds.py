@@ -1,10 +1,20 @@
 from __future__ import absolute_import
 
+from collections import OrderedDict
+import contextlib
+import itertools
+import logging
+import os
+import threading
+import time
+import warnings
+
 import six
 
+from . import metrics
 from .bindings import C, ffi, GSS_ERROR, _buf_to_str
-from .error import _exception_for_status
-from .names import Name
+from .error import GSSException, _ClosedHandle, _exception_for_status
+from .names import MechName, Name, NameCache
 from .oids import OID, OIDSet
 
 
@@ -13,6 +23,12 @@ def _release_gss_cred_id_t(cred):
         C.gss_release_cred(ffi.new('OM_uint32[1]'), cred)
 
 
+_CLOSED_CREDENTIAL = _ClosedHandle("credential")
+
+# Guards the reference counts of credentials which are shared between callers
+_refs_lock = threading.Lock()
+
+
 def _make_kv_set(cred_store):
     if isinstance(cred_store, dict):
         cred_store = cred_store.items()
@@ -43,6 +59,148 @@ def _make_kv_set(cred_store):
     return c_strings, kv_array, cred_store_kv_set
 
 
+_log = logging.getLogger(__name__)
+
+_monotonic = getattr(time, 'monotonic', time.time)
+
+_krb5_context = None
+_krb5_context_lock = threading.Lock()
+
+
+def _can_destroy_ccaches():
+    return hasattr(C, 'krb5_cc_destroy')
+
+
+def _destroy_ccache(ccache_name):
+    """Destroys a krb5 credential cache by name. Requires the krb5 C API."""
+    global _krb5_context
+    # A krb5_context must not be used by more than one thread at a time
+    with _krb5_context_lock:
+        if _krb5_context is None:
+            context = ffi.new('krb5_context[1]')
+            code = C.krb5_init_context(context)
+            if code != 0:
+                raise GSSException("Couldn't create a krb5 context: error {0}".format(code))
+            _krb5_context = context
+        ccache = ffi.new('krb5_ccache[1]')
+        code = C.krb5_cc_resolve(_krb5_context[0], ccache_name.encode(), ccache)
+        if code != 0:
+            raise GSSException("Couldn't resolve credential cache {0}: error {1}".format(
+                ccache_name, code
+            ))
+        # krb5_cc_destroy() closes the handle whether or not it succeeds, so it mustn't be closed
+        # again here
+        code = C.krb5_cc_destroy(_krb5_context[0], ccache[0])
+        if code != 0:
+            raise GSSException("Couldn't destroy credential cache {0}: error {1}".format(
+                ccache_name, code
+            ))
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_ASYNC_MAX_WORKERS = 4
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _executor = ThreadPoolExecutor(max_workers=_ASYNC_MAX_WORKERS)
+        return _executor
+
+
+def _request_key(*args):
+    """Builds a key identifying a request from its arguments, or returns None if any of them
+    can't be used in a key (in which case the request won't be shared)."""
+    key = []
+    for arg in args:
+        try:
+            if isinstance(arg, Name) and not isinstance(arg, MechName):
+                # Plain names aren't hashable, but requests for names with the same display form
+                # and type are the same request
+                arg = (Name,) + arg._display(with_type=True)
+            elif isinstance(arg, dict):
+                # Sorting fails on keys which can't be compared, e.g. a mix of bytes and str
+                arg = tuple(sorted(arg.items()))
+            elif isinstance(arg, list):
+                arg = tuple(tuple(item) for item in arg)
+            hash(arg)
+        except (TypeError, GSSException):
+            return None
+        key.append(arg)
+    return tuple(key)
+
+
+def _acquire_shared(cls, *args):
+    cred = cls(*args)
+    # Each caller waiting for the same request takes a reference when it receives the credential
+    cred._refs = 0
+    return cred
+
+
+class _SharedCall(object):
+    """A call running in the executor, which may be awaited by more than one caller."""
+
+    def __init__(self, key, future, share):
+        self.key = key
+        self.future = future
+        self.share = share  # called with the result for each caller which receives it
+        self.waiters = 0
+
+    def _forget(self):
+        with _inflight_lock:
+            if _inflight.get(self.key) is self:
+                del _inflight[self.key]
+
+    def _waiter_done(self, waiter):
+        if waiter.cancelled():
+            with _inflight_lock:
+                self.waiters -= 1
+                abandoned = (self.waiters == 0)
+            if abandoned:
+                # Nobody is interested any more; this only has an effect if the call hasn't started
+                self.future.cancel()
+                self._forget()
+        elif self.share is not None and waiter.exception() is None:
+            self.share(waiter.result())
+
+    def wait(self, timeout):
+        import asyncio
+        waiter = asyncio.shield(asyncio.wrap_future(self.future))
+        waiter.add_done_callback(self._waiter_done)
+        if timeout is not None:
+            return asyncio.wait_for(waiter, timeout)
+        return waiter
+
+
+def _run_async(key, executor, func, *args, **kwargs):
+    try:
+        import asyncio
+    except ImportError:
+        raise NotImplementedError("Asynchronous operations require the asyncio module")
+    timeout = kwargs.pop('timeout', None)
+    share = kwargs.pop('share', None)
+    if executor is None:
+        executor = _get_executor()
+    shared = False
+    with _inflight_lock:
+        call = _inflight.get(key) if key is not None else None
+        if call is None or call.future.cancelled():
+            call = _SharedCall(key, executor.submit(func, *args, **kwargs), share)
+            if key is not None:
+                _inflight[key] = call
+                shared = True
+        call.waiters += 1
+    if shared:
+        # Outside the lock, as the callback runs immediately if the call has already finished
+        call.future.add_done_callback(lambda future: call._forget())
+    return call.wait(timeout)
+
+
 class Credential(object):
     """
     Acquire a reference to a credential. Use this to select a credential with a specific name to
@@ -88,8 +246,13 @@ class Credential(object):
         implementation does not support acquiring credentials with a password, or if the
         `cred_store` parameter is provided but the underlying GSSAPI implementation does not support
         the ``gss_acquire_cred_from`` C function.
+
+    A credential can be used as a context manager, which calls :meth:`close` on exit.
     """
 
+    _refs = 1  # references held by callers, each of which may close the credential once
+    _owned = False  # True while an ImpersonationCache also holds the credential
+
     def __init__(self, desired_name=C.GSS_C_NO_NAME, lifetime=C.GSS_C_INDEFINITE,
                  desired_mechs=C.GSS_C_NO_OID_SET, usage=C.GSS_C_BOTH, password=None, cred_store=None):
         super(Credential, self).__init__()
@@ -189,6 +352,90 @@ class Credential(object):
             raise _exception_for_status(retval, minor_status[0])
 
         self._mechs = OIDSet(actual_mechs)
+        metrics.inc(metrics.CREDENTIALS_ACQUIRED)
+
+    @classmethod
+    def acquire_async(cls, desired_name=C.GSS_C_NO_NAME, lifetime=C.GSS_C_INDEFINITE,
+                      desired_mechs=C.GSS_C_NO_OID_SET, usage=C.GSS_C_BOTH, password=None,
+                      cred_store=None, timeout=None, executor=None):
+        """
+        Acquires a credential without blocking the asyncio event loop. The parameters are the same
+        as for the :class:`Credential` constructor, which is run in a bounded pool of worker
+        threads. If an identical request is already in progress, its result is shared rather than
+        acquiring the credential again.
+
+        Cancelling the returned awaitable, or the request timing out, doesn't interrupt the C call
+        if it has already started, but it does stop the call from starting if no other caller is
+        waiting for it.
+
+        :param timeout: Optional time in seconds to wait for the credential.
+        :type timeout: float
+        :param executor: Optional :class:`concurrent.futures.Executor` to run the call in, instead
+            of the shared default thread pool.
+        :returns: an awaitable which resolves to a :class:`Credential`.
+        :raises: :exc:`asyncio.TimeoutError` (when awaited) if `timeout` expires.
+
+            :exc:`NotImplementedError` if the :mod:`asyncio` module is not available.
+        """
+        key = _request_key(
+            cls, 'acquire', desired_name, lifetime, desired_mechs, usage, password, cred_store
+        )
+        return _run_async(
+            key, executor, _acquire_shared, cls, desired_name, lifetime, desired_mechs, usage,
+            password, cred_store, timeout=timeout, share=cls._share
+        )
+
+    def close(self):
+        """
+        Releases the C credential immediately, rather than when this object is garbage collected.
+        After this, any use of this credential, including by a security context created with it,
+        raises :exc:`~gssapi.error.GSSException`. Calling this more than once has no effect.
+
+        Credentials returned by :meth:`acquire_async` to several callers, or by an
+        :class:`ImpersonationCache`, are shared: each caller gets a reference to the same object,
+        and closing it gives up one reference. The C credential is released once every reference
+        has been closed and the credential is no longer held by the cache. Closing a shared
+        credential more times than it was returned issues a :exc:`RuntimeWarning` and has no
+        effect.
+        """
+        if self._cred is _CLOSED_CREDENTIAL:
+            return
+        with _refs_lock:
+            over_closed = not self._refs
+            if not over_closed:
+                self._refs -= 1
+                if self._refs or self._owned:
+                    return
+        if over_closed:
+            warnings.warn("Shared credential closed more times than it was returned; it is still "
+                          "held by its cache", RuntimeWarning, stacklevel=2)
+            return
+        self._release()
+
+    def _share(self):
+        # Hands another reference to this credential to a caller
+        with _refs_lock:
+            self._refs += 1
+        return self
+
+    def _disown(self):
+        # Drops the reference held by an ImpersonationCache
+        with _refs_lock:
+            self._owned = False
+            if self._refs:
+                return
+        self._release()
+
+    def _release(self):
+        _release_gss_cred_id_t(self._cred)
+        self._cred = _CLOSED_CREDENTIAL
+        self._mechs = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     @property
     def name(self):
@@ -263,6 +510,83 @@ class Credential(object):
             mechsobj if get_mechs else None
         )
 
+    def impersonate(self, desired_name, lifetime=C.GSS_C_INDEFINITE,
+                    desired_mechs=C.GSS_C_NO_OID_SET, usage=C.GSS_C_INITIATE):
+        """
+        Acquires a credential for another principal, using this credential as the impersonator
+        credential. With the Kerberos mechanism this uses the S4U2Self protocol extension
+        ("protocol transition"), so this credential must belong to a service which is permitted by
+        the KDC to impersonate users. The resulting credential can then be used to initiate
+        contexts to services which the impersonator is permitted to delegate to.
+
+        This is an extension to the GSSAPI and may not be supported by the underlying
+        implementation (see :doc:`/compatibility`).
+
+        :param desired_name: The name of the principal to impersonate.
+        :type desired_name: :class:`~gssapi.names.Name`
+        :param lifetime: Optional lifetime for the acquired credential, in seconds.
+        :type lifetime: int
+        :param desired_mechs: Optional set of mechanisms to obtain credentials for.
+        :type desired_mechs: :class:`~gssapi.oids.OIDSet`
+        :param usage: The usage of the impersonated credential. Defaults to
+            :data:`~gssapi.C_INITIATE`.
+        :returns: a :class:`Credential` object for the impersonated principal.
+        :raises: :exc:`~gssapi.error.GSSException` if the credential can't be acquired.
+
+            :exc:`NotImplementedError` if the underlying GSSAPI implementation does not
+            support the ``gss_acquire_cred_impersonate_name`` C function.
+        """
+        return self._impersonate(desired_name, lifetime, desired_mechs, usage)[0]
+
+    def _impersonate(self, desired_name, lifetime=C.GSS_C_INDEFINITE,
+                     desired_mechs=C.GSS_C_NO_OID_SET, usage=C.GSS_C_INITIATE):
+        # As impersonate(), but also returns the lifetime of the new credential
+        if not hasattr(C, 'gss_acquire_cred_impersonate_name'):
+            raise NotImplementedError("The GSSAPI implementation does not support "
+                                      "gss_acquire_cred_impersonate_name")
+
+        if not isinstance(desired_name, Name):
+            raise TypeError("Expected a Name object, got {0}.".format(type(desired_name)))
+
+        if isinstance(desired_mechs, OIDSet):
+            desired_mechs = desired_mechs._oid_set[0]
+        elif desired_mechs == C.GSS_C_NO_OID_SET:
+            desired_mechs = ffi.cast('gss_OID_set', desired_mechs)
+        else:
+            raise TypeError(
+                "Expected an OIDSet object or C_NO_OID_SET, got {0}.".format(type(desired_mechs))
+            )
+
+        minor_status = ffi.new('OM_uint32[1]')
+        output_cred = ffi.new('gss_cred_id_t[1]')
+        actual_mechs = ffi.new('gss_OID_set[1]')
+        time_rec = ffi.new('OM_uint32[1]')
+
+        retval = C.gss_acquire_cred_impersonate_name(
+            minor_status,
+            self._cred[0],
+            desired_name._name[0],
+            ffi.cast('OM_uint32', lifetime),
+            desired_mechs,
+            ffi.cast('gss_cred_usage_t', usage),
+            output_cred,
+            actual_mechs,
+            time_rec
+        )
+        try:
+            if GSS_ERROR(retval):
+                raise _exception_for_status(retval, minor_status[0])
+        except:
+            _release_gss_cred_id_t(output_cred)
+            if actual_mechs[0]:
+                C.gss_release_oid_set(minor_status, actual_mechs)
+            raise
+
+        impersonated = type(self)(output_cred)
+        impersonated._mechs = OIDSet(actual_mechs)
+        metrics.inc(metrics.CREDENTIALS_ACQUIRED)
+        return impersonated, time_rec[0]
+
     def export(self):
         """
         Serializes this credential into a byte string, which can be passed to :meth:`imprt` in
@@ -424,3 +748,231 @@ class Credential(object):
             raise
 
         return (OIDSet(elements_stored), usage_stored[0])
+
+    def store_async(self, usage=None, mech=None, overwrite=False, default=False, cred_store=None,
+                    timeout=None, executor=None):
+        """
+        Stores this credential without blocking the asyncio event loop. The parameters are the same
+        as for :meth:`store`, which is run in a bounded pool of worker threads; identical requests
+        which are in progress at the same time are shared, as for :meth:`acquire_async`.
+
+        :param timeout: Optional time in seconds to wait for the credential to be stored.
+        :type timeout: float
+        :param executor: Optional :class:`concurrent.futures.Executor` to run the call in, instead
+            of the shared default thread pool.
+        :returns: an awaitable which resolves to the return value of :meth:`store`.
+        :raises: :exc:`asyncio.TimeoutError` (when awaited) if `timeout` expires.
+
+            :exc:`NotImplementedError` if the :mod:`asyncio` module is not available.
+        """
+        key = _request_key(self, 'store', usage, mech, overwrite, default, cred_store)
+        return _run_async(
+            key, executor, self.store, usage, mech, overwrite, default, cred_store, timeout=timeout
+        )
+
+
+class MemoryCCachePool(object):
+    """
+    Manages a bounded pool of in-memory (``MEMORY:``) Kerberos credential caches, which can be used
+    to hand a credential (e.g. the :attr:`~gssapi.ctx.AcceptContext.delegated_cred` of an acceptor
+    context) to another library that expects a credential cache name, without writing the
+    credential to disk.
+
+    >>> pool = MemoryCCachePool()
+    >>> with pool.store(ctx.delegated_cred) as ccache_name:
+    ...     backend.connect(ccache=ccache_name)
+
+    Each credential cache is destroyed as soon as it is released back to the pool, which requires
+    the ``krb5`` C API. Storing into a specific credential cache also requires support for the
+    ``gss_store_cred_into`` C function (see :doc:`/compatibility`).
+
+    :param max_size: The maximum number of credential caches which may be in use at once. Callers
+        of :meth:`store` will block until a cache is free when this many are in use.
+    :type max_size: int
+    :raises: :exc:`NotImplementedError` if the ``krb5`` C API isn't available, so credential caches
+        couldn't be destroyed.
+    """
+
+    def __init__(self, max_size=64):
+        if not _can_destroy_ccaches():
+            raise NotImplementedError(
+                "The GSSAPI implementation does not provide krb5_cc_destroy, so in-memory "
+                "credential caches can't be destroyed"
+            )
+        super(MemoryCCachePool, self).__init__()
+        self.max_size = max_size
+        self._semaphore = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self._free_names = []
+
+    def _allocate(self):
+        with self._lock:
+            if self._free_names:
+                return self._free_names.pop()
+            return 'MEMORY:python-gssapi-{0}-{1}-{2}'.format(
+                os.getpid(), id(self), next(self._counter)
+            )
+
+    def _release(self, ccache_name):
+        # If this raises, the name isn't reused, so the credential in it can't be handed out again
+        _destroy_ccache(ccache_name)
+        with self._lock:
+            self._free_names.append(ccache_name)
+
+    @contextlib.contextmanager
+    def store(self, cred, usage=None, mech=None):
+        """
+        Context manager which stores `cred` into an unused in-memory credential cache, yields the
+        name of that credential cache, then destroys the credential cache and returns it to the
+        pool when the ``with`` block exits.
+
+        :param cred: The credential to store.
+        :type cred: :class:`Credential`
+        :param usage: Optional parameter specifying whether to store the initiator, acceptor, or
+            both usages of the credential, as for :meth:`Credential.store`.
+        :param mech: Optional parameter specifying a single mechanism to store the credential
+            element for, as for :meth:`Credential.store`.
+        :type mech: :class:`~gssapi.oids.OID`
+        :returns: a context manager yielding a ``MEMORY:`` credential cache name.
+        :raises: :exc:`~gssapi.error.GSSException` if there is a problem storing the credential,
+            or destroying the credential cache afterwards.
+
+            :exc:`NotImplementedError` if the underlying GSSAPI implementation does not
+            support the ``gss_store_cred_into`` C function.
+        """
+        self._semaphore.acquire()
+        try:
+            ccache_name = self._allocate()
+            try:
+                cred.store(usage, mech, overwrite=True, cred_store={'ccache': ccache_name})
+                yield ccache_name
+            except BaseException:
+                # Don't let a failure to destroy the cache hide the original exception
+                try:
+                    self._release(ccache_name)
+                except GSSException:
+                    _log.exception("Couldn't destroy credential cache %s", ccache_name)
+                raise
+            self._release(ccache_name)
+        finally:
+            self._semaphore.release()
+
+
+class ImpersonationCache(object):
+    """
+    A bounded, least-recently-used cache of credentials acquired by
+    :meth:`Credential.impersonate`, so that repeated requests on behalf of the same user don't
+    need another round trip to the KDC. Cached credentials are discarded when they have less than
+    `min_lifetime` seconds of validity remaining. If several threads ask for the same user at once
+    and it isn't cached, only one of them impersonates the user, and the others wait for it.
+
+    The credentials returned by the cache are shared between all callers. Each caller may close
+    the credentials it gets once, and a credential is released when it has been closed by every
+    caller and is no longer in the cache (see :meth:`Credential.close`).
+
+    >>> cache = ImpersonationCache(Credential(Name('HTTP@proxy.example.com', C_NT_HOSTBASED_SERVICE)))
+    >>> ctx = InitContext(backend_name, cache.get('alice@EXAMPLE.COM'))
+
+    :param impersonator: The credential of the service performing the impersonation.
+    :type impersonator: :class:`Credential`
+    :param max_size: The maximum number of impersonated credentials to keep.
+    :type max_size: int
+    :param min_lifetime: Credentials with fewer than this many seconds of lifetime remaining are
+        not returned from the cache, but re-acquired.
+    :type min_lifetime: int
+    :param desired_mechs: Optional set of mechanisms to obtain credentials for.
+    :type desired_mechs: :class:`~gssapi.oids.OIDSet`
+    :param usage: The usage of the impersonated credentials. Defaults to
+        :data:`~gssapi.C_INITIATE`.
+    """
+
+    def __init__(self, impersonator, max_size=1024, min_lifetime=60,
+                 desired_mechs=C.GSS_C_NO_OID_SET, usage=C.GSS_C_INITIATE):
+        super(ImpersonationCache, self).__init__()
+        self.impersonator = impersonator
+        self.max_size = max_size
+        self.min_lifetime = min_lifetime
+        self._desired_mechs = desired_mechs
+        self._usage = usage
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._pending = {}  # key: event set when the thread impersonating that user is done
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user):
+        """
+        Returns a credential impersonating `user`, from the cache if a cached credential is still
+        valid for at least :attr:`min_lifetime` seconds, otherwise by calling
+        :meth:`Credential.impersonate`.
+
+        :param user: The principal to impersonate. A string is imported as a :class:`Name` with
+            the default name type. Users are cached by their display form and name type, so a
+            string and a :class:`~gssapi.names.Name` for the same user are cached separately.
+        :type user: :class:`~gssapi.names.Name` or str
+        :rtype: :class:`Credential`
+        :raises: :exc:`~gssapi.error.GSSException` if the credential can't be acquired.
+        """
+        if isinstance(user, Name):
+            key = NameCache._key(*user._display(with_type=True))
+        elif isinstance(user, six.string_types):
+            key = NameCache._key(user, C.GSS_C_NO_OID)
+        else:
+            raise TypeError("Expected a Name or string, got {0}".format(type(user)))
+
+        while True:
+            now = _monotonic()
+            with self._lock:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    if entry[1] - now > self.min_lifetime:
+                        self._entries[key] = entry
+                        self.hits += 1
+                        return entry[0]._share()
+                    entry[0]._disown()
+                pending = self._pending.get(key)
+                if pending is None:
+                    # Nobody else is impersonating this user, so this thread does it
+                    pending = self._pending[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # Wait for the other thread, then look again; if it failed, this thread tries instead
+            pending.wait()
+
+        try:
+            name = user if isinstance(user, Name) else Name(user)
+            cred, lifetime = self.impersonator._impersonate(
+                name, desired_mechs=self._desired_mechs, usage=self._usage
+            )
+            # The cache holds the credential until it is discarded, besides this caller
+            cred._owned = True
+            if lifetime == C.GSS_C_INDEFINITE:
+                expires = float('inf')
+            else:
+                expires = now + lifetime
+
+            with self._lock:
+                self._entries[key] = (cred, expires)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)[1][0]._disown()
+                    self.evictions += 1
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.set()
+        return cred
+
+    def clear(self):
+        """
+        Discards all cached credentials.
+        """
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for cred, _ in entries:
+            cred._disown()
+
+    def __len__(self):
+        return len(self._entries)
@@ -2,21 +2,41 @@ from __future__ import absolute_import
 
 import functools
 import operator
+import sys
 
+from . import metrics
 from .bindings import ffi, C, GSS_ERROR, GSS_SUPPLEMENTARY_INFO, _buf_to_str
-from .error import GSSException, _exception_for_status
+from .chanbind import ChannelBindings
+from .error import GSSException, _ClosedHandle, _exception_for_status
 from .names import MechName, Name
 from .oids import OID
 from .creds import Credential
 
 
+def _channel_bindings_ptr(input_chan_bindings):
+    if isinstance(input_chan_bindings, ChannelBindings):
+        return input_chan_bindings._cb
+    elif (
+        hasattr(input_chan_bindings, '_cb')
+        and isinstance(input_chan_bindings._cb, ffi.CData)
+        and ffi.typeof(input_chan_bindings._cb) == ffi.typeof('gss_channel_bindings_t')
+    ):
+        return input_chan_bindings._cb
+    else:
+        return ffi.cast('gss_channel_bindings_t', C.GSS_C_NO_CHANNEL_BINDINGS)
+
+
 def _release_gss_ctx_id_t(context):
     if context[0]:
         C.gss_delete_sec_context(
-            ffi.new('OM_unit32[1]'),
+            ffi.new('OM_uint32[1]'),
             context,
             ffi.cast('gss_buffer_t', C.GSS_C_NO_BUFFER)
         )
+        metrics.inc(metrics.CONTEXTS, -1)
+
+
+_CLOSED_CONTEXT = _ClosedHandle("security context")
 
 
 def _status_bits(retval):
@@ -40,6 +60,8 @@ class Context(object):
     of context. To use a context as the initiator or acceptor, create an :class:`InitContext` or
     :class:`AcceptContext`, respectively.
 
+    A context can be used as a context manager, which calls :meth:`close` on exit.
+
     .. py:attribute:: established
 
         If this context has been established (via the exchange of tokens with a peer), this will be
@@ -58,17 +80,62 @@ class Context(object):
         bitwise comparisons on this attribute.
     """
     def __init__(self):
-        self._ctx = ffi.new('gss_ctx_id_t[1]')
+        self._ctx = ffi.gc(ffi.new('gss_ctx_id_t[1]'), _release_gss_ctx_id_t)
         self._reset_flags()
 
     def _reset_flags(self):
         self.established = False
         self.flags = 0
         self.mech_type = None
+        self._steps = 0
 
     def step(self, input_token):
         raise NotImplementedError()
 
+    def close(self):
+        """
+        Deletes the C security context and its keys immediately, rather than when this object is
+        garbage collected. Unlike :meth:`delete`, no output token is returned to send to the peer.
+        After this, any use of this context raises :exc:`~gssapi.error.GSSException`. Calling this
+        more than once has no effect.
+        """
+        if self._ctx is not _CLOSED_CONTEXT:
+            _release_gss_ctx_id_t(self._ctx)
+            self._ctx = _CLOSED_CONTEXT
+            self._reset_flags()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _count_step(self):
+        if not self._steps:
+            metrics.inc(metrics.HANDSHAKES_STARTED)
+        self._steps += 1
+
+    def _count_step_result(self, had_context):
+        if self._ctx[0] and not had_context:
+            metrics.inc(metrics.CONTEXTS)
+        if self.established:
+            metrics.inc(metrics.HANDSHAKES_COMPLETED)
+            metrics.inc(metrics.HANDSHAKE_STEPS, self._steps)
+
+    def _fail_step(self, minor_status, had_context):
+        metrics.inc(metrics.HANDSHAKES_FAILED, label=type(sys.exc_info()[1]).__name__)
+        if self._ctx[0]:
+            C.gss_delete_sec_context(
+                minor_status,
+                self._ctx,
+                ffi.cast('gss_buffer_t', C.GSS_C_NO_BUFFER)
+            )
+        # A context allocated by the failed step was never counted; one from an earlier step was,
+        # whether it is deleted here or was already deleted by the C GSSAPI
+        if had_context:
+            metrics.inc(metrics.CONTEXTS, -1)
+        self._reset_flags()
+
     @property
     def integrity_negotiated(self):
         """
@@ -191,6 +258,7 @@ class Context(object):
                     raise _exception_for_status(retval, minor_status[0])
 
             output_token = _buf_to_str(output_token_buffer[0])
+            metrics.inc(metrics.MESSAGE_BYTES, len(message), 'get_mic')
             return output_token
         finally:
             if output_token_buffer[0].length != 0:
@@ -261,6 +329,7 @@ class Context(object):
                 raise _exception_for_status(retval, minor_status[0], self.mech_type)
             else:
                 raise _exception_for_status(retval, minor_status[0])
+        metrics.inc(metrics.MESSAGE_BYTES, len(message), 'verify_mic')
         supp_bits = _status_bits(retval)
         if supplementary:
             return qop_state[0], supp_bits
@@ -323,6 +392,7 @@ class Context(object):
             output_token = _buf_to_str(output_token_buffer[0])
             if conf_req and not conf_state[0]:
                 raise GSSException("No confidentiality protection.")
+            metrics.inc(metrics.MESSAGE_BYTES, len(message), 'wrap')
             return output_token
         finally:
             if output_token_buffer[0].length != 0:
@@ -403,6 +473,7 @@ class Context(object):
                 raise GSSException("No confidentiality protection.")
             if qop_req is not None and qop_req != qop_state[0]:
                 raise GSSException("QOP {0} does not match required value {1}.".format(qop_state[0], qop_req))
+            metrics.inc(metrics.MESSAGE_BYTES, len(output), 'unwrap')
             supp_bits = _status_bits(retval)
             if supplementary:
                 return output, supp_bits
@@ -497,7 +568,7 @@ class Context(object):
         """
         if not (self.flags & C.GSS_C_TRANS_FLAG):
             raise GSSException("Context is not transferable.")
-        if not self._ctx:
+        if not self._ctx[0]:
             raise GSSException("Can't export empty/invalid context.")
 
         minor_status = ffi.new('OM_uint32[1]')
@@ -516,7 +587,8 @@ class Context(object):
 
             exported_token = _buf_to_str(output_token_buffer[0])
             # Set our context to a 'blank' context
-            self._ctx = ffi.new('gss_ctx_id_t[1]')
+            self._ctx = ffi.gc(ffi.new('gss_ctx_id_t[1]'), _release_gss_ctx_id_t)
+            metrics.inc(metrics.CONTEXTS, -1)
             return exported_token
         finally:
             if output_token_buffer[0].length != 0:
@@ -582,6 +654,7 @@ class Context(object):
             new_context_obj.flags = flags[0]
             new_context_obj.established = bool(established[0])
             new_context_obj._ctx = ffi.gc(new_context, _release_gss_ctx_id_t)
+            metrics.inc(metrics.CONTEXTS)
             return new_context_obj
         except:
             if new_context[0]:
@@ -647,8 +720,9 @@ class Context(object):
             self._ctx,
             output_token_buffer
         )
-        self._ctx = ffi.new('gss_ctx_id_t[1]')
+        self._ctx = ffi.gc(ffi.new('gss_ctx_id_t[1]'), _release_gss_ctx_id_t)
         self._reset_flags()
+        metrics.inc(metrics.CONTEXTS, -1)
         try:
             if GSS_ERROR(retval):
                 if minor_status[0] and self.mech_type:
@@ -711,16 +785,8 @@ class InitContext(Context):
         self._req_flags = functools.reduce(operator.or_, req_flags, 0)
         self._time_req = time_req
 
-        if (
-            hasattr(input_chan_bindings, '_cb')
-            and isinstance(input_chan_bindings._cb, ffi.CData)
-            and ffi.typeof(input_chan_bindings._cb) == ffi.typeof('gss_channel_bindings_t')
-        ):
-            self._channel_bindings = input_chan_bindings._cb
-        else:
-            self._channel_bindings = ffi.cast(
-                'gss_channel_bindings_t', C.GSS_C_NO_CHANNEL_BINDINGS
-            )
+        self._channel_bindings = _channel_bindings_ptr(input_chan_bindings)
+        self._input_chan_bindings = input_chan_bindings  # keeps the bindings' buffers alive
 
     def step(self, input_token=None):
         """Performs a step to establish the context as an initiator.
@@ -762,6 +828,8 @@ class InitContext(Context):
         else:
             cred = ffi.cast('gss_cred_id_t', C.GSS_C_NO_CREDENTIAL)
 
+        had_context = bool(self._ctx[0])
+        self._count_step()
         retval = C.gss_init_sec_context(
             minor_status,
             cred,
@@ -795,15 +863,10 @@ class InitContext(Context):
             if actual_mech[0]:
                 self.mech_type = OID(actual_mech[0][0])
 
+            self._count_step_result(had_context)
             return out_token
         except:
-            if self._ctx[0]:
-                C.gss_delete_sec_context(
-                    minor_status,
-                    self._ctx,
-                    ffi.cast('gss_buffer_t', C.GSS_C_NO_BUFFER)
-                )
-                self._reset_flags()
+            self._fail_step(minor_status, had_context)
             raise
         finally:
             if output_token_buffer[0].length != 0:
@@ -853,14 +916,8 @@ class AcceptContext(Context):
         self.delegated_cred = None
         self.peer_name = None
 
-        if (
-            hasattr(input_chan_bindings, '_cb')
-            and isinstance(input_chan_bindings._cb, ffi.CData)
-            and ffi.typeof(input_chan_bindings._cb) == ffi.typeof('gss_channel_bindings_t')
-        ):
-            self._channel_bindings = input_chan_bindings._cb
-        else:
-            self._channel_bindings = ffi.cast('gss_channel_bindings_t', C.GSS_C_NO_CHANNEL_BINDINGS)
+        self._channel_bindings = _channel_bindings_ptr(input_chan_bindings)
+        self._input_chan_bindings = input_chan_bindings  # keeps the bindings' buffers alive
 
     def step(self, input_token):
         """Performs a step to establish the context as an acceptor.
@@ -893,6 +950,8 @@ class AcceptContext(Context):
         else:
             cred = ffi.cast('gss_cred_id_t', C.GSS_C_NO_CREDENTIAL)
 
+        had_context = bool(self._ctx[0])
+        self._count_step()
         retval = C.gss_accept_sec_context(
             minor_status,
             self._ctx,
@@ -933,15 +992,10 @@ class AcceptContext(Context):
                     src_name._mech_type = self.mech_type
                     self.peer_name = src_name
 
+            self._count_step_result(had_context)
             return out_token
         except:
-            if self._ctx:
-                C.gss_delete_sec_context(
-                    minor_status,
-                    self._ctx,
-                    ffi.cast('gss_buffer_t', C.GSS_C_NO_BUFFER)
-                )
-                self._reset_flags()
+            self._fail_step(minor_status, had_context)
             raise
         finally:
             if output_token_buffer[0].length != 0:
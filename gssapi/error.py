@@ -13,9 +13,18 @@ example an exception raised by :meth:`~gssapi.ctx.Context.verify_mic` may be an
 """
 from __future__ import absolute_import
 
+from collections import OrderedDict
+import threading
+
 from .bindings import ffi, C, _buf_to_str, GSS_CALLING_ERROR, GSS_ROUTINE_ERROR
 
 
+# The number of rendered major status messages to keep, for recently seen major statuses
+_MESSAGE_CACHE_SIZE = 256
+_message_cache = OrderedDict()
+_message_cache_lock = threading.Lock()
+
+
 def status_list(maj_status, min_status, status_type=C.GSS_C_GSS_CODE, mech_type=C.GSS_C_NO_OID):
     """
     Creates a "friendly" error message from a GSS status code. This is used to create the
@@ -88,6 +97,42 @@ def _status_to_str(maj_status, min_status, mech_type=C.GSS_C_NO_OID):
     return ' '.join(status_list(maj_status, min_status, mech_type=mech_type))
 
 
+def _minor_status_to_str(min_status, mech_type=C.GSS_C_NO_OID):
+    minor_status_msgs = status_list(min_status, 0, C.GSS_C_MECH_CODE, mech_type)
+    if not minor_status_msgs:
+        return ''
+    return ' '.join(["Minor code:"] + minor_status_msgs)
+
+
+def _cached_major_status_to_str(maj_status):
+    # Only the text for major statuses is cached: it doesn't depend on the mechanism or on the
+    # call which failed, unlike minor status text, which mechanisms like Kerberos extend with
+    # details of the failed call (e.g. the principal or keytab involved)
+    with _message_cache_lock:
+        message = _message_cache.pop(maj_status, None)
+        if message is not None:
+            _message_cache[maj_status] = message
+            return message
+
+    message = _status_to_str(maj_status, 0)
+
+    with _message_cache_lock:
+        _message_cache[maj_status] = message
+        while len(_message_cache) > _MESSAGE_CACHE_SIZE:
+            _message_cache.popitem(last=False)
+    return message
+
+
+def _mech_oid(mech_type):
+    # Copies a gss_OID returned by the C GSSAPI into an OID object, which can be kept after the
+    # memory it points to is released
+    from .oids import OID
+
+    if isinstance(mech_type, ffi.CData):
+        return OID(mech_type[0]) if mech_type != ffi.NULL else None
+    return mech_type
+
+
 class GSSException(Exception):
     """
     Represents a GSSAPI Exception.
@@ -120,17 +165,39 @@ class GSSCException(GSSException):
 
     .. py:attribute:: message
 
-        A string describing the error created by the C GSSAPI.
+        A string describing the error created by the C GSSAPI. The description of the major
+        status is only created when it is first used (e.g. when the exception is converted to a
+        string), and is cached for recently seen major statuses, so exceptions which are caught and
+        handled based on their type or :attr:`maj_status` don't need to call into the C GSSAPI
+        again. The description of the minor status is created when the exception is, since it can
+        include details of the call which failed that are only available at that time.
     """
 
     def __init__(self, maj_status, min_status, token=None):
         super(GSSCException, self).__init__(token=token)
         self.maj_status = maj_status
         self.min_status = min_status
-        self._create_message()
+        self._message = None
+        self._minor_message = self._create_minor_message() if min_status else ''
+
+    def _create_minor_message(self):
+        return _minor_status_to_str(self.min_status)
 
     def _create_message(self):
-        self.message = _status_to_str(self.maj_status, self.min_status)
+        return ' '.join(
+            part for part in (_cached_major_status_to_str(self.maj_status), self._minor_message)
+            if part
+        )
+
+    @property
+    def message(self):
+        if self._message is None:
+            self._message = self._create_message()
+        return self._message
+
+    @message.setter
+    def message(self, message):
+        self._message = message
 
     def __str__(self):
         return self.message
@@ -155,15 +222,18 @@ class GSSMechException(GSSCException):
 
     .. py:attribute:: mech_type
 
-        An :class:`~gssapi.oids.OID` representing the mechanism which caused this exception.
+        An :class:`~gssapi.oids.OID` representing the mechanism which caused this exception, or
+        None if it is unknown.
     """
 
     def __init__(self, maj_status, min_status, mech_type, token=None):
-        self.mech_type = mech_type
+        self.mech_type = _mech_oid(mech_type)
         super(GSSMechException, self).__init__(maj_status, min_status, token)
 
-    def _create_message(self):
-        self.message = _status_to_str(self.maj_status, self.min_status, self.mech_type)
+    def _create_minor_message(self):
+        if self.mech_type is None:
+            return _minor_status_to_str(self.min_status)
+        return _minor_status_to_str(self.min_status, self.mech_type)
 
 
 # Parent classes for types of error:
@@ -328,56 +398,84 @@ class NameNotMechName(GSSRoutineError):
     """
 
 
+_CALLING_ERRORS = {
+    C.GSS_S_CALL_INACCESSIBLE_READ: InaccessibleRead,
+    C.GSS_S_CALL_INACCESSIBLE_WRITE: InaccessibleWrite,
+    C.GSS_S_CALL_BAD_STRUCTURE: BadStructure,
+}
+
+_ROUTINE_ERRORS = {
+    C.GSS_S_BAD_MECH: BadMechanism,
+    C.GSS_S_BAD_NAME: BadName,
+    C.GSS_S_BAD_NAMETYPE: BadNameType,
+    C.GSS_S_BAD_BINDINGS: BadBindings,
+    C.GSS_S_BAD_STATUS: BadStatus,
+    C.GSS_S_BAD_SIG: BadSignature,
+    C.GSS_S_NO_CRED: NoCredential,
+    C.GSS_S_NO_CONTEXT: NoContext,
+    C.GSS_S_DEFECTIVE_TOKEN: DefectiveToken,
+    C.GSS_S_DEFECTIVE_CREDENTIAL: DefectiveCredential,
+    C.GSS_S_CREDENTIALS_EXPIRED: CredentialsExpired,
+    C.GSS_S_CONTEXT_EXPIRED: ContextExpired,
+    C.GSS_S_FAILURE: Failure,
+    C.GSS_S_BAD_QOP: BadQOP,
+    C.GSS_S_UNAUTHORIZED: Unauthorized,
+    C.GSS_S_UNAVAILABLE: Unavailable,
+    C.GSS_S_DUPLICATE_ELEMENT: DuplicateElement,
+    C.GSS_S_NAME_NOT_MN: NameNotMechName,
+}
+
+
+def _build_exception_classes():
+    # Maps (calling error, routine error, is mech error) to an exception class, creating the
+    # classes for errors of more than one type once, so they are the same class on every raise.
+    classes = {}
+    for calling, calling_class in [(0, None)] + list(_CALLING_ERRORS.items()):
+        for routine, routine_class in [(0, None)] + list(_ROUTINE_ERRORS.items()):
+            for is_mech in (False, True):
+                exc_types = [GSSMechException] if is_mech else []
+                exc_types.extend(cls for cls in (calling_class, routine_class) if cls is not None)
+                if len(exc_types) == 0:
+                    exc_class = GSSCException
+                elif len(exc_types) == 1:
+                    # It is a simple error
+                    exc_class = exc_types[0]
+                else:
+                    # It's an error of more than one of the above types
+                    exc_name = ('Mech' if is_mech else '') + ''.join(
+                        cls.__name__ for cls in exc_types if cls is not GSSMechException
+                    )
+                    exc_class = type(exc_name, tuple(exc_types), {})
+                classes[(calling, routine, is_mech)] = exc_class
+    return classes
+
+
+_EXCEPTION_CLASSES = _build_exception_classes()
+
+
 def _exception_for_status(maj_status, min_status, mech_type=None, token=None):
+    calling = GSS_CALLING_ERROR(maj_status)
+    if calling not in _CALLING_ERRORS:
+        calling = 0
+    routine = GSS_ROUTINE_ERROR(maj_status)
+    if routine not in _ROUTINE_ERRORS:
+        routine = 0
+
     if mech_type is not None:
-        exc_types = [GSSMechException]
-        exc_name = 'Mech'
-        exc_args = (maj_status, min_status, mech_type, token)
+        return _EXCEPTION_CLASSES[(calling, routine, True)](maj_status, min_status, mech_type, token)
     else:
-        exc_types = []
-        exc_name = ''
-        exc_args = (maj_status, min_status, token)
-
-    if GSS_CALLING_ERROR(maj_status):
-        for exc_class, status in (
-            (InaccessibleRead, C.GSS_S_CALL_INACCESSIBLE_READ),
-            (InaccessibleWrite, C.GSS_S_CALL_INACCESSIBLE_WRITE),
-            (BadStructure, C.GSS_S_CALL_BAD_STRUCTURE),
-        ):
-            if GSS_CALLING_ERROR(maj_status) == status:
-                exc_types.append(exc_class)
-                exc_name += exc_class.__name__
-                break
-    if GSS_ROUTINE_ERROR(maj_status):
-        for exc_class, status in (
-            (BadMechanism, C.GSS_S_BAD_MECH),
-            (BadName, C.GSS_S_BAD_NAME),
-            (BadNameType, C.GSS_S_BAD_NAMETYPE),
-            (BadBindings, C.GSS_S_BAD_BINDINGS),
-            (BadStatus, C.GSS_S_BAD_STATUS),
-            (BadSignature, C.GSS_S_BAD_SIG),
-            (NoCredential, C.GSS_S_NO_CRED),
-            (NoContext, C.GSS_S_NO_CONTEXT),
-            (DefectiveToken, C.GSS_S_DEFECTIVE_TOKEN),
-            (DefectiveCredential, C.GSS_S_DEFECTIVE_CREDENTIAL),
-            (CredentialsExpired, C.GSS_S_CREDENTIALS_EXPIRED),
-            (ContextExpired, C.GSS_S_CONTEXT_EXPIRED),
-            (Failure, C.GSS_S_FAILURE),
-            (BadQOP, C.GSS_S_BAD_QOP),
-            (Unauthorized, C.GSS_S_UNAUTHORIZED),
-            (Unavailable, C.GSS_S_UNAVAILABLE),
-            (DuplicateElement, C.GSS_S_DUPLICATE_ELEMENT),
-            (NameNotMechName, C.GSS_S_NAME_NOT_MN),
-        ):
-            if GSS_ROUTINE_ERROR(maj_status) == status:
-                exc_types.append(exc_class)
-                exc_name += exc_class.__name__
-                break
-    if len(exc_types) == 0:
-        return GSSCException(*exc_args)
-    elif len(exc_types) == 1:
-        # It is a simple error
-        return exc_types[0](*exc_args)
-    else:
-        # It's an error of more than one of the above types
-        return type(exc_name, tuple(exc_types), {})(*exc_args)
+        return _EXCEPTION_CLASSES[(calling, routine, False)](maj_status, min_status, token)
+
+
+class _ClosedHandle(object):
+    # Replaces the C handle of an object which has been closed, so that any further use of the
+    # object raises an exception rather than passing a released handle to the C GSSAPI
+
+    def __init__(self, description):
+        super(_ClosedHandle, self).__init__()
+        self._description = description
+
+    def __getitem__(self, index):
+        raise GSSException("This {0} has been closed.".format(self._description))
+
+    __add__ = __getitem__
@@ -0,0 +1,99 @@
+from __future__ import absolute_import
+
+import struct
+
+import six
+
+from .oids import OID
+
+
+_TOKEN_ID = b'\x04\x01'
+_OID_TAG = 0x06
+
+
+def _der_length(data, offset):
+    # Returns the value of the DER length at data[offset:] and the offset after it
+    first = six.indexbytes(data, offset)
+    if first < 0x80:
+        return first, offset + 1
+    num_bytes = first & 0x7f
+    if num_bytes == 0 or num_bytes > 4 or offset + 1 + num_bytes > len(data):
+        raise ValueError("Invalid DER length in exported name token")
+    length = 0
+    for i in range(offset + 1, offset + 1 + num_bytes):
+        length = (length << 8) | six.indexbytes(data, i)
+    return length, offset + 1 + num_bytes
+
+
+def _encode_der_length(length):
+    if length < 0x80:
+        return six.int2byte(length)
+    encoded = b''
+    while length:
+        encoded = six.int2byte(length & 0xff) + encoded
+        length >>= 8
+    return six.int2byte(0x80 | len(encoded)) + encoded
+
+
+def parse_exported_name(token):
+    """
+    Splits an exported mechanism name token, as returned by
+    :meth:`~gssapi.names.MechName.export`, into the mechanism OID and the mechanism-specific name,
+    without calling into the C GSSAPI. The token format is defined in RFC 2743 section 3.2.
+
+    This is useful for processing large numbers of exported names, e.g. in logs or access control
+    lists, in processes which have no credentials or security contexts. If `token` is a
+    :class:`memoryview`, the returned values are views into the same memory and nothing is copied.
+
+    >>> mech_der, principal = parse_exported_name(ctx.peer_name.export())
+    >>> principal
+    b'alice@EXAMPLE.COM'
+
+    :param token: An exported name token.
+    :type token: bytes, bytearray or memoryview
+    :returns: a tuple of the DER encoding of the mechanism OID (without the DER tag and length, as
+        in :attr:`~gssapi.oids.OID` objects) and the name in the mechanism's exported format (for
+        Kerberos 5, the principal name string).
+    :rtype: tuple(bytes, bytes)
+    :raises: :exc:`ValueError` if the token is not a well-formed exported name token.
+    """
+    token_len = len(token)
+    if token_len < 8 or token[:2] != _TOKEN_ID:
+        raise ValueError("Not an exported name token")
+    oid_len, = struct.unpack_from('>H', token, 2)
+    oid_end = 4 + oid_len
+    if oid_len < 2 or token_len < oid_end + 4 or six.indexbytes(token, 4) != _OID_TAG:
+        raise ValueError("Invalid mechanism OID in exported name token")
+    der_len, der_start = _der_length(token, 5)
+    if der_start + der_len != oid_end:
+        raise ValueError("Invalid mechanism OID in exported name token")
+    name_len, = struct.unpack_from('>I', token, oid_end)
+    if token_len != oid_end + 4 + name_len:
+        raise ValueError("Invalid name length in exported name token")
+    return token[der_start:oid_end], token[oid_end + 4:]
+
+
+def build_exported_name(mech, name):
+    """
+    Builds an exported mechanism name token from a mechanism OID and a mechanism-specific name,
+    without calling into the C GSSAPI. This is the inverse of :func:`parse_exported_name`, and for
+    Kerberos 5 names the result is equal to what :meth:`~gssapi.names.MechName.export` would return
+    for the canonicalized principal.
+
+    :param mech: The mechanism OID, as an :class:`~gssapi.oids.OID` or as the DER encoding
+        returned by :func:`parse_exported_name`.
+    :type mech: :class:`~gssapi.oids.OID` or bytes
+    :param name: The name in the mechanism's exported format, e.g. ``alice@EXAMPLE.COM``.
+    :type name: bytes or str
+    :returns: an exported name token, which can be imported as a :class:`~gssapi.names.MechName`
+        with the name type :const:`gssapi.C_NT_EXPORT_NAME`.
+    :rtype: bytes
+    """
+    if isinstance(mech, OID):
+        mech = mech._der
+    elif not isinstance(mech, bytes):
+        raise TypeError("Expected an OID or bytes, got {0}".format(type(mech)))
+    if isinstance(name, six.text_type):
+        name = name.encode('utf-8')
+    oid = six.int2byte(_OID_TAG) + _encode_der_length(len(mech)) + mech
+    return b''.join((_TOKEN_ID, struct.pack('>H', len(oid)), oid, struct.pack('>I', len(name)), name))
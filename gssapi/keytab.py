@@ -0,0 +1,164 @@
+from __future__ import absolute_import
+
+import os
+import threading
+
+from .bindings import C
+from .creds import Credential
+from .ctx import AcceptContext
+
+
+def _keytab_path(cred_store):
+    if isinstance(cred_store, dict):
+        items = cred_store.items()
+    else:
+        items = cred_store
+    for key, value in items:
+        if isinstance(key, bytes):
+            key = key.decode()
+        if key != 'keytab':
+            continue
+        if isinstance(value, bytes):
+            value = value.decode()
+        residual_type, sep, residual = value.partition(':')
+        if sep and residual_type in ('FILE', 'WRFILE'):
+            return residual
+        elif sep and '/' not in residual_type:
+            raise ValueError("Can't watch a keytab of type {0}".format(residual_type))
+        return value
+    raise ValueError("cred_store does not name a keytab")
+
+
+class KeytabWatcher(object):
+    """
+    Keeps an acceptor :class:`~gssapi.creds.Credential` up to date with the keytab named in a
+    credential store. The keytab file is polled with :func:`os.stat`, and when it is replaced or
+    modified (e.g. when the service keys are rotated), a new credential is acquired in the
+    background and swapped in for use by subsequently created :class:`~gssapi.ctx.AcceptContext`
+    objects. Contexts that have already been created keep a reference to the credential they were
+    created with, so they are not affected by the swap.
+
+    If acquiring the new credential fails (for example because the keytab was caught half-written),
+    the previous credential is kept and acquisition is retried on the next poll.
+
+    Acquiring a credential from a specific credential store is an extension to the GSSAPI which
+    may not be supported by the underlying implementation (see :doc:`/compatibility`).
+
+    :param cred_store: A dict or list of (key, value) pairs indicating the credential store to use.
+        It must contain a ``keytab`` key naming a ``FILE:`` keytab.
+    :type cred_store: dict, or list of (str, str)
+    :param desired_name: Optional Name to acquire the acceptor credential for.
+    :type desired_name: :class:`~gssapi.names.Name`
+    :param desired_mechs: Optional set of mechanisms to obtain credentials for.
+    :type desired_mechs: :class:`~gssapi.oids.OIDSet`
+    :param interval: How often, in seconds, to poll the keytab file for changes.
+    :type interval: float
+    :raises: :exc:`~gssapi.error.GSSException` if the initial credential can't be acquired.
+
+        :exc:`ValueError` if `cred_store` does not name a keytab file.
+    """
+
+    def __init__(self, cred_store, desired_name=C.GSS_C_NO_NAME, desired_mechs=C.GSS_C_NO_OID_SET,
+                 interval=5.0):
+        super(KeytabWatcher, self).__init__()
+        self.path = _keytab_path(cred_store)
+        self.interval = interval
+        self._cred_store = cred_store
+        self._desired_name = desired_name
+        self._desired_mechs = desired_mechs
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.last_error = None
+        self._stat = self._stat_keytab()
+        self._cred = self._acquire()
+
+    @property
+    def credential(self):
+        """
+        The most recently acquired acceptor credential.
+
+        :type: :class:`~gssapi.creds.Credential`
+        """
+        return self._cred
+
+    def accept_context(self, input_chan_bindings=C.GSS_C_NO_CHANNEL_BINDINGS):
+        """
+        Creates a new :class:`~gssapi.ctx.AcceptContext` using the current acceptor credential.
+
+        :param input_chan_bindings: Optional channel bindings object, to bind the security context
+            to an underlying communications channel.
+        :type input_chan_bindings: :class:`~gssapi.chanbind.ChannelBindings`
+        :rtype: :class:`~gssapi.ctx.AcceptContext`
+        """
+        return AcceptContext(self._cred, input_chan_bindings)
+
+    def _stat_keytab(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_dev, st.st_ino, st.st_size, st.st_mtime)
+
+    def _acquire(self):
+        return Credential(
+            self._desired_name,
+            desired_mechs=self._desired_mechs,
+            usage=C.GSS_C_ACCEPT,
+            cred_store=self._cred_store
+        )
+
+    def check(self):
+        """
+        Polls the keytab once, and re-acquires the credential if the keytab has changed since it
+        was last acquired. This is called periodically by the background thread started by
+        :meth:`start`, but can also be called directly, e.g. from an application's own timer.
+
+        :returns: True if a new credential was swapped in, False otherwise.
+        :rtype: bool
+        """
+        with self._lock:
+            current = self._stat_keytab()
+            if current is None or current == self._stat:
+                return False
+            try:
+                new_cred = self._acquire()
+            except Exception as exc:
+                # Leave self._stat alone so the acquisition is retried on the next poll
+                self.last_error = exc
+                return False
+            self._stat = current
+            self._cred = new_cred
+            self.last_error = None
+            return True
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.check()
+
+    def start(self):
+        """
+        Starts a daemon thread polling the keytab every :attr:`interval` seconds.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='KeytabWatcher({0})'.format(self.path))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the background polling thread started by :meth:`start`, if it is running.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
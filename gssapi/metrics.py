@@ -0,0 +1,171 @@
+"""
+Counters and gauges maintained by this package, for monitoring an application which uses it:
+
+* ``gssapi_handshakes_started``, ``gssapi_handshakes_completed`` and ``gssapi_handshakes_failed``
+  count the security contexts which have started, completed or failed establishment. Failures are
+  labelled with the name of the exception class raised, e.g. ``{error="CredentialsExpired"}``.
+* ``gssapi_handshake_steps`` is a summary of the number of calls to
+  :meth:`~gssapi.ctx.Context.step` each completed handshake took.
+* ``gssapi_contexts`` is a gauge of the number of security contexts which currently hold a C
+  GSSAPI context handle.
+* ``gssapi_credentials_acquired`` counts the credentials acquired, including by impersonation.
+* ``gssapi_message_bytes`` counts the bytes of application data passed through
+  :meth:`~gssapi.ctx.Context.wrap`, :meth:`~gssapi.ctx.Context.unwrap`,
+  :meth:`~gssapi.ctx.Context.get_mic` and :meth:`~gssapi.ctx.Context.verify_mic`, labelled by the
+  operation.
+
+The metrics are always collected. To avoid contention between threads, each thread updates its
+own counters without locking, and they are only added up by :func:`collect` and
+:func:`render`.
+
+>>> import gssapi.metrics
+>>> print(gssapi.metrics.render())
+# TYPE gssapi_handshakes_started counter
+# HELP gssapi_handshakes_started Security context establishments started.
+gssapi_handshakes_started_total 2
+...
+# EOF
+"""
+from __future__ import absolute_import
+
+import threading
+import weakref
+
+
+HANDSHAKES_STARTED = 'gssapi_handshakes_started'
+HANDSHAKES_COMPLETED = 'gssapi_handshakes_completed'
+HANDSHAKES_FAILED = 'gssapi_handshakes_failed'
+HANDSHAKE_STEPS = 'gssapi_handshake_steps'
+CONTEXTS = 'gssapi_contexts'
+CREDENTIALS_ACQUIRED = 'gssapi_credentials_acquired'
+MESSAGE_BYTES = 'gssapi_message_bytes'
+
+# name, type, label name, help
+_METRICS = (
+    (HANDSHAKES_STARTED, 'counter', None, "Security context establishments started."),
+    (HANDSHAKES_COMPLETED, 'counter', None, "Security context establishments completed."),
+    (HANDSHAKES_FAILED, 'counter', 'error', "Security context establishments failed, by exception."),
+    (HANDSHAKE_STEPS, 'summary', None, "Steps taken by completed security context establishments."),
+    (CONTEXTS, 'gauge', None, "Security contexts holding a GSSAPI context handle."),
+    (CREDENTIALS_ACQUIRED, 'counter', None, "Credentials acquired."),
+    (MESSAGE_BYTES, 'counter', 'operation', "Bytes of application data protected or verified."),
+)
+
+_local = threading.local()
+_shards = []  # (weak reference to thread, dict of counts) for each thread which has counted
+_retired = {}  # counts from threads which have exited
+_shards_lock = threading.Lock()
+
+
+def _merge(into, counts):
+    for key, value in list(counts.items()):
+        into[key] = into.get(key, 0) + value
+
+
+def _retire_dead_shards():
+    # Must be called with _shards_lock held. Threads which have exited can no longer update their
+    # counts, so they can be merged without a race. Shards are removed one by one rather than by
+    # rebuilding the list, so that shards appended without the lock meanwhile aren't lost.
+    for shard in list(_shards):
+        thread = shard[0]()
+        if thread is None or not thread.is_alive():
+            _merge(_retired, shard[1])
+            _shards.remove(shard)
+
+
+def _new_shard():
+    # inc() can be called from a finalizer run by the garbage collector at any point, including
+    # while this thread holds _shards_lock in collect(), so registering a shard mustn't wait for
+    # the lock. Appending to a list is atomic, and dead shards are only retired if the lock is free.
+    counts = _local.counts = {}
+    _shards.append((weakref.ref(threading.current_thread()), counts))
+    if _shards_lock.acquire(False):
+        try:
+            _retire_dead_shards()
+        finally:
+            _shards_lock.release()
+    return counts
+
+
+def inc(name, amount=1, label=None):
+    """
+    Adds `amount` to the metric called `name`, with the given label value if the metric has a
+    label.
+    """
+    try:
+        counts = _local.counts
+    except AttributeError:
+        counts = _new_shard()
+    key = (name, label)
+    counts[key] = counts.get(key, 0) + amount
+
+
+def collect():
+    """
+    Returns the current values of all metrics.
+
+    :returns: a dict mapping each metric name to its value, or for metrics with a label, to a dict
+        mapping label values to values. The value of the ``gssapi_handshake_steps`` summary is the
+        total number of steps.
+    :rtype: dict
+    """
+    totals = {}
+    with _shards_lock:
+        _retire_dead_shards()
+        _merge(totals, _retired)
+        for _, counts in list(_shards):
+            _merge(totals, counts)
+
+    metrics = {}
+    for name, _, label_name, _ in _METRICS:
+        metrics[name] = {} if label_name else 0
+    for (name, label), value in totals.items():
+        if label is None:
+            metrics[name] = value
+        else:
+            metrics[name][label] = value
+    return metrics
+
+
+def _escape(label):
+    return label.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render():
+    """
+    Returns the current values of all metrics in the OpenMetrics text format, for example to be
+    served on an HTTP endpoint for Prometheus.
+
+    :rtype: str
+    """
+    metrics = collect()
+    lines = []
+    for name, metric_type, label_name, help_text in _METRICS:
+        lines.append('# TYPE {0} {1}'.format(name, metric_type))
+        lines.append('# HELP {0} {1}'.format(name, help_text))
+        value = metrics[name]
+        if metric_type == 'summary':
+            lines.append('{0}_count {1}'.format(name, metrics[HANDSHAKES_COMPLETED]))
+            lines.append('{0}_sum {1}'.format(name, value))
+            continue
+        suffix = '_total' if metric_type == 'counter' else ''
+        if label_name is None:
+            lines.append('{0}{1} {2}'.format(name, suffix, value))
+        else:
+            for label in sorted(value):
+                lines.append('{0}{1}{{{2}="{3}"}} {4}'.format(
+                    name, suffix, label_name, _escape(label), value[label]
+                ))
+    lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    """
+    Sets all metrics to zero. Updates made by other threads at the same time may be lost, so this is
+    mainly useful in tests.
+    """
+    with _shards_lock:
+        _retired.clear()
+        for _, counts in list(_shards):
+            counts.clear()
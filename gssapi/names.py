@@ -1,10 +1,14 @@
 from __future__ import absolute_import
 
+from collections import OrderedDict
+import threading
+import warnings
+
 import six
 
 from .bindings import C, ffi, GSS_ERROR, _buf_to_str
-from .error import GSSException, _exception_for_status
-from .oids import OID
+from .error import GSSException, _ClosedHandle, _exception_for_status
+from .oids import OID, _desc_der
 
 
 def _release_gss_name_t(name):
@@ -12,6 +16,31 @@ def _release_gss_name_t(name):
         C.gss_release_name(ffi.new('OM_uint32[1]'), name)
 
 
+def _release_gss_name_array(count):
+    def release(names):
+        minor_status = ffi.new('OM_uint32[1]')
+        for i in range(count):
+            if names[i]:
+                C.gss_release_name(minor_status, names + i)
+    return release
+
+
+_CLOSED_NAME = _ClosedHandle("name")
+
+# Guards the reference counts of names which are shared between callers
+_refs_lock = threading.Lock()
+
+
+def _name_type_ptr(name_type):
+    if isinstance(name_type, OID):
+        return ffi.addressof(name_type._oid)
+    elif name_type == C.GSS_C_NO_OID:
+        return ffi.cast('gss_OID', name_type)
+    elif not isinstance(name_type, ffi.CData) or ffi.typeof(name_type) != ffi.typeof('gss_OID'):
+        raise TypeError("Expected an OID or GSS_C_NT_* constant, got {0}".format(type(name_type)))
+    return name_type
+
+
 class _NameMeta(type):
     # Creates a MechName if a GSS_C_NT_EXPORT_NAME is imported
     def __call__(cls, *args, **kwargs):
@@ -22,8 +51,10 @@ class _NameMeta(type):
         else:
             name_type = None
         if isinstance(name_type, OID):
-            name_type = name_type._oid
-        if name_type == C.GSS_C_NT_EXPORT_NAME:
+            is_export_name = name_type._der == _desc_der(C.GSS_C_NT_EXPORT_NAME[0])
+        else:
+            is_export_name = name_type == C.GSS_C_NT_EXPORT_NAME
+        if is_export_name:
             mech_name = MechName(None, C.GSS_C_NO_OID)
             mech_name._import_name(*args, **kwargs)
             return mech_name
@@ -41,8 +72,22 @@ class Name(object):
     :param name_type: A constant identifying the type of name represented by the `name` param, e.g.
         :const:`gssapi.C_NT_USER_NAME` or :const:`gssapi.C_NT_HOSTBASED_SERVICE`.
     :type name_type: `gssapi.C_NT_*` constant or :class:`~gssapi.oids.OID`
+
+    A :class:`Name` isn't hashable, since whether it is equal to another name (which may be of
+    another type, or a :class:`MechName`) can only be found out by the C GSSAPI. To use names in
+    sets or as dict keys, use mechanism names instead, e.g.
+    :attr:`~gssapi.ctx.AcceptContext.peer_name` or the result of :meth:`canonicalize`.
+
+    A name can be used as a context manager, which calls :meth:`close` on exit.
     """
 
+    _hash = None
+    _displayed = None
+    _display_type = None
+    _canonical = None
+    _refs = 1  # references held by callers, each of which may close the name once
+    _owned = False  # True while a NameCache or the name it was canonicalized from also holds it
+
     def __init__(self, name, name_type=C.GSS_C_NO_OID):
         super(Name, self).__init__()
 
@@ -74,12 +119,7 @@ class Name(object):
         else:
             raise TypeError("Expected a string or integer, got {0}".format(type(name)))
 
-        if isinstance(name_type, OID):
-            name_type = ffi.addressof(name_type._oid)
-        elif name_type == C.GSS_C_NO_OID:
-            name_type = ffi.cast('gss_OID', name_type)
-        elif not isinstance(name_type, ffi.CData) or ffi.typeof(name_type) != ffi.typeof('gss_OID'):
-            raise TypeError("Expected an OID or GSS_C_NT_* constant, got {0}".format(type(name_type)))
+        name_type = _name_type_ptr(name_type)
 
         retval = C.gss_import_name(
             minor_status, name_buffer, name_type, self._name
@@ -88,6 +128,72 @@ class Name(object):
         if GSS_ERROR(retval):
             raise _exception_for_status(retval, minor_status[0])
 
+    def close(self):
+        """
+        Releases the C name immediately, rather than when this object is garbage collected. After
+        this, any use of this name raises :exc:`~gssapi.error.GSSException`, though the hash of a
+        :class:`MechName` which has already been hashed stays the same. Calling this more than once
+        has no effect. Mechanism names returned by :meth:`canonicalize` are closed along with this
+        name, unless a caller still holds them.
+
+        Names returned by :meth:`canonicalize` or by a :class:`NameCache` are shared: every call
+        returns another reference to the same object, and closing it gives up one reference. The
+        C name is released once every reference has been closed and the name is no longer held by
+        the cache or the name it was canonicalized from. Closing a shared name more times than it
+        was returned issues a :exc:`RuntimeWarning` and has no effect.
+
+        Names in a :class:`NameList` belong to the list and can only be released by
+        :meth:`NameList.close`, so closing one of them issues a :exc:`RuntimeWarning` and has no
+        effect.
+        """
+        if self._name is _CLOSED_NAME:
+            return
+        if getattr(self, '_parent', None) is not None:
+            warnings.warn("Names in a NameList are released by NameList.close()", RuntimeWarning,
+                          stacklevel=2)
+            return
+        with _refs_lock:
+            over_closed = not self._refs
+            if not over_closed:
+                self._refs -= 1
+                if self._refs or self._owned:
+                    return
+        if over_closed:
+            warnings.warn("Shared name closed more times than it was returned; it is still held by "
+                          "its cache", RuntimeWarning, stacklevel=2)
+            return
+        self._release()
+
+    def _share(self):
+        # Hands another reference to this name to a caller
+        with _refs_lock:
+            self._refs += 1
+        return self
+
+    def _disown(self):
+        # Drops the reference held by a NameCache or the name this was canonicalized from
+        with _refs_lock:
+            self._owned = False
+            if self._refs:
+                return
+        self._release()
+
+    def _release(self):
+        _release_gss_name_t(self._name)
+        self._name = _CLOSED_NAME
+        canonical = self._canonical
+        self._displayed = self._display_type = self._canonical = None
+        self._exported = None
+        if canonical is not None:
+            for mech_name in canonical.values():
+                mech_name._disown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def __str__(self):
         return self._display().decode()
 
@@ -99,26 +205,26 @@ class Name(object):
         return self._display(with_type=True)[1]
 
     def _display(self, with_type=False):
-        minor_status = ffi.new('OM_uint32[1]')
-        out_buffer = ffi.new('gss_buffer_desc[1]')
-        if with_type:
+        # Names are immutable, so the display form and type are only looked up once
+        if self._displayed is None:
+            minor_status = ffi.new('OM_uint32[1]')
+            out_buffer = ffi.new('gss_buffer_desc[1]')
             output_name_type = ffi.new('gss_OID[1]')
+            try:
+                retval = C.gss_display_name(
+                    minor_status, self._name[0], out_buffer, output_name_type
+                )
+                if GSS_ERROR(retval):
+                    raise _exception_for_status(retval, minor_status[0])
+                self._displayed = _buf_to_str(out_buffer[0])
+                self._display_type = OID(output_name_type[0][0])
+            finally:
+                if out_buffer[0].length != 0:
+                    C.gss_release_buffer(minor_status, out_buffer)
+        if with_type:
+            return self._displayed, self._display_type
         else:
-            output_name_type = ffi.NULL
-
-        try:
-            retval = C.gss_display_name(
-                minor_status, self._name[0], out_buffer, output_name_type
-            )
-            if GSS_ERROR(retval):
-                raise _exception_for_status(retval, minor_status[0])
-            if with_type:
-                return _buf_to_str(out_buffer[0]), OID(output_name_type[0][0])
-            else:
-                return _buf_to_str(out_buffer[0])
-        finally:
-            if out_buffer[0].length != 0:
-                C.gss_release_buffer(minor_status, out_buffer)
+            return self._displayed
 
     def __ne__(self, other):
         return not self.__eq__(other)
@@ -139,6 +245,8 @@ class Name(object):
         else:
             return False
 
+    __hash__ = None
+
     def canonicalize(self, mech):
         """
         Create a canonical mechanism name (MechName) from an arbitrary internal name. The canonical
@@ -147,6 +255,11 @@ class Name(object):
         authentication to the acceptor using the given mechanism, using a
         :class:`~gssapi.creds.Credential` obtained using this :class:`Name`.
 
+        The canonical name for each mechanism is remembered by this :class:`Name`, so canonicalizing
+        the same name for the same mechanism again returns the same :class:`MechName` object
+        (which also caches its exported form), without calling into the C GSSAPI. The result is
+        shared, as described for :meth:`close`.
+
         :param mech: The mechanism to canonicalize this name for
         :type mech: :class:`~gssapi.oids.OID`
         :returns: a canonical mechanism name based on this internal name.
@@ -157,6 +270,12 @@ class Name(object):
         else:
             raise TypeError("Expected an OID, got " + str(type(mech)))
 
+        key = mech._der
+        if self._canonical is not None:
+            cached = self._canonical.get(key)
+            if cached is not None:
+                return cached._share()
+
         minor_status = ffi.new('OM_uint32[1]')
         out_name = ffi.new('gss_name_t[1]')
         try:
@@ -165,9 +284,104 @@ class Name(object):
             )
             if GSS_ERROR(retval):
                 raise _exception_for_status(retval, minor_status[0])
-            return MechName(out_name, mech)
+            mech_name = MechName(out_name, mech)
         except:
             C.gss_release_name(minor_status, out_name)
+            raise
+        # This name holds the canonical name until it is closed, and returns it to every caller
+        mech_name._refs, mech_name._owned = 0, True
+
+        if self._canonical is None:
+            self._canonical = {}
+        cached = self._canonical.setdefault(key, mech_name)
+        if cached is not mech_name:
+            mech_name._disown()
+        return cached._share()
+
+    @classmethod
+    def import_many(cls, names, name_type=C.GSS_C_NO_OID, mech=None, export=False):
+        """
+        Imports many names of the same type at once, for example when loading a large list of
+        principals at startup. This avoids most of the per-name overhead of constructing
+        :class:`Name` objects one at a time: the imported names are stored in a single array owned
+        by the returned :class:`NameList`, and the input buffer and status variables are reused
+        for every call to the C GSSAPI.
+
+        If `mech` is given, each name is also canonicalized for that mechanism in the same pass,
+        and the returned list contains :class:`MechName` objects. If `export` is also True, each
+        mechanism name is exported too, and the exported forms are available as
+        :attr:`NameList.exported`, ready to be indexed or compared against
+        :meth:`MechName.export` of a peer name.
+
+        :param names: The names to import.
+        :type names: iterable of str or bytes
+        :param name_type: A constant identifying the type of all the names, as for :class:`Name`.
+        :type name_type: `gssapi.C_NT_*` constant or :class:`~gssapi.oids.OID`
+        :param mech: Optional mechanism to canonicalize the names for.
+        :type mech: :class:`~gssapi.oids.OID`
+        :param export: Whether to also export the canonicalized names. Requires `mech`.
+        :type export: bool
+        :returns: the imported names, in the same order as `names`.
+        :rtype: :class:`NameList`
+        :raises: :exc:`~gssapi.error.GSSException` if any name can't be imported, canonicalized or
+            exported; none of the names are returned in that case.
+        """
+        if mech is not None and not isinstance(mech, OID):
+            raise TypeError("Expected an OID, got {0}".format(type(mech)))
+        if export and mech is None:
+            raise ValueError("Only canonicalized names can be exported")
+
+        encoded = []
+        for name in names:
+            if isinstance(name, six.text_type):
+                name = name.encode()
+            elif not isinstance(name, bytes):
+                raise TypeError("Expected a string, got {0}".format(type(name)))
+            encoded.append(name)
+
+        name_type = _name_type_ptr(name_type)
+        mech_oid = ffi.addressof(mech._oid) if mech is not None else None
+        count = len(encoded)
+        handles = ffi.gc(ffi.new('gss_name_t[]', count), _release_gss_name_array(count))
+        exported = [] if export else None
+
+        minor_status = ffi.new('OM_uint32[1]')
+        name_buffer = ffi.new('gss_buffer_desc[1]')
+        c_str_name = ffi.new('char[]', max([len(name) for name in encoded] + [0]) + 1)
+        name_buffer[0].value = c_str_name
+        imported = ffi.new('gss_name_t[1]')
+        output_buffer = ffi.new('gss_buffer_desc[1]')
+
+        for i, name in enumerate(encoded):
+            ffi.memmove(c_str_name, name, len(name))
+            name_buffer[0].length = len(name)
+            if mech_oid is None:
+                retval = C.gss_import_name(minor_status, name_buffer, name_type, handles + i)
+                if GSS_ERROR(retval):
+                    raise _exception_for_status(retval, minor_status[0])
+                continue
+
+            retval = C.gss_import_name(minor_status, name_buffer, name_type, imported)
+            if GSS_ERROR(retval):
+                raise _exception_for_status(retval, minor_status[0])
+            try:
+                retval = C.gss_canonicalize_name(minor_status, imported[0], mech_oid, handles + i)
+                if GSS_ERROR(retval):
+                    raise _exception_for_status(retval, minor_status[0])
+            finally:
+                C.gss_release_name(minor_status, imported)
+
+            if export:
+                retval = C.gss_export_name(minor_status, (handles + i)[0], output_buffer)
+                try:
+                    if GSS_ERROR(retval):
+                        raise _exception_for_status(retval, minor_status[0], mech)
+                    exported.append(_buf_to_str(output_buffer[0]))
+                finally:
+                    if output_buffer[0].length != 0:
+                        C.gss_release_buffer(minor_status, output_buffer)
+
+        return NameList(handles, count, mech, exported)
 
 # Add metaclass in Python 2/3 compatible way:
 Name = six.add_metaclass(_NameMeta)(Name)
@@ -181,8 +395,13 @@ class MechName(Name):
 
     Don't construct instances of this class directly; use
     :meth:`~gssapi.names.Name.canonicalize` on a :class:`Name` to create a :class:`MechName`.
+
+    Mechanism names are compared with each other and hashed by their exported form (see
+    :meth:`export`), which is computed once and cached.
     """
 
+    _exported = None
+
     def __init__(self, name, mech_type):
         """Don't construct instances of this class directly; This object will acquire
         ownership of `name`, and release the associated storage when it is deleted."""
@@ -195,6 +414,23 @@ class MechName(Name):
     def canonicalize(self, mech):
         raise GSSException("Can't canonicalize a mechanism name.")
 
+    def __eq__(self, other):
+        if isinstance(other, MechName):
+            try:
+                return self.export() == other.export()
+            except GSSException:
+                pass
+        return super(MechName, self).__eq__(other)
+
+    def __hash__(self):
+        if self._hash is None:
+            try:
+                self._hash = hash(self.export())
+            except GSSException:
+                # Then it is only compared with gss_compare_name(), as for a plain Name
+                raise TypeError("Mechanism names which can't be exported are unhashable")
+        return self._hash
+
     def export(self):
         """
         Returns a representation of the Mechanism Name which is suitable for direct string
@@ -205,6 +441,9 @@ class MechName(Name):
         :returns: an exported bytestring representation of this mechanism name
         :rtype: bytes
         """
+        if self._exported is not None:
+            return self._exported
+
         minor_status = ffi.new('OM_uint32[1]')
         output_buffer = ffi.new('gss_buffer_desc[1]')
         retval = C.gss_export_name(
@@ -219,7 +458,180 @@ class MechName(Name):
                 else:
                     raise _exception_for_status(retval, minor_status[0])
 
-            return _buf_to_str(output_buffer[0])
+            self._exported = _buf_to_str(output_buffer[0])
+            return self._exported
         finally:
             if output_buffer[0].length != 0:
                 C.gss_release_buffer(minor_status, output_buffer)
+
+
+class NameList(object):
+    """
+    A compact, read-only sequence of names, as returned by :meth:`Name.import_many`. The names are
+    stored in a single C array owned by this list, which is released when the list is garbage
+    collected. :class:`Name` (or :class:`MechName`) objects are only created when an item is
+    accessed, and they keep the whole list alive while they are in use.
+
+    If :meth:`Name.import_many` was called with `export` set to True, the :attr:`exported`
+    attribute is a list of the exported forms of the names (see :meth:`MechName.export`), in the
+    same order as the names; otherwise it is None.
+
+    Don't construct instances of this class directly; use :meth:`Name.import_many`.
+
+    A list can be used as a context manager, which calls :meth:`close` on exit.
+    """
+
+    def __init__(self, handles, count, mech=None, exported=None):
+        super(NameList, self).__init__()
+        self._handles = handles
+        self._count = count
+        self._mech = mech
+        self.exported = exported
+
+    def close(self):
+        """
+        Releases all the C names in this list immediately, rather than when it is garbage
+        collected. After this, the list is empty, and any use of a name taken from it raises
+        :exc:`~gssapi.error.GSSException`. Calling this more than once has no effect.
+        """
+        if self._count:
+            # The array wrapped by ffi.gc() has no length, so it can only be indexed as a pointer
+            _release_gss_name_array(self._count)(ffi.cast('gss_name_t *', self._handles))
+            self._count = 0
+            self.exported = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("NameList index out of range")
+        if self._mech is None:
+            name = Name.__new__(Name)
+        else:
+            name = MechName.__new__(MechName)
+            name._mech_type = self._mech
+            if self.exported is not None:
+                name._exported = self.exported[index]
+        name._name = self._handles + index
+        name._parent = self  # keeps the array of names alive
+        return name
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self[i]
+
+
+class NameCache(object):
+    """
+    An opt-in, bounded, least-recently-used cache of imported :class:`Name` objects. Importing a
+    name which is already in the cache returns the same :class:`Name` object as before, without
+    calling into the C GSSAPI. This is useful for names which are imported very often, like the
+    service names targeted by a client:
+
+    >>> name_cache = NameCache(max_size=256)
+    >>> ctx = InitContext(name_cache.get('HTTP@backend.example', C_NT_HOSTBASED_SERVICE))
+
+    The :class:`Name` objects returned by the cache are shared between all callers, so they must
+    not be modified. Each caller may close the names it gets once, and a name is released when it
+    has been closed by every caller and is no longer in the cache (see :meth:`Name.close`).
+
+    :param max_size: The maximum number of names to keep in the cache.
+    :type max_size: int
+    """
+
+    def __init__(self, max_size=1024):
+        super(NameCache, self).__init__()
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._names = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(name, name_type):
+        if isinstance(name, six.text_type):
+            name = name.encode()
+        elif isinstance(name, six.integer_types):
+            name = ('uid', name)
+        elif not isinstance(name, bytes):
+            raise TypeError("Expected a string or integer, got {0}".format(type(name)))
+
+        if isinstance(name_type, OID):
+            name_type = name_type._der
+        elif isinstance(name_type, ffi.CData) and ffi.typeof(name_type) == ffi.typeof('gss_OID'):
+            name_type = _desc_der(name_type[0])
+        elif name_type != C.GSS_C_NO_OID:
+            raise TypeError("Expected an OID or GSS_C_NT_* constant, got {0}".format(type(name_type)))
+        return name, name_type
+
+    def get(self, name, name_type=C.GSS_C_NO_OID):
+        """
+        Returns a :class:`Name` for the given name and name type, importing it only if it is not
+        already in the cache. The parameters are the same as for the :class:`Name` constructor.
+
+        :rtype: :class:`Name`
+        """
+        key = self._key(name, name_type)
+        with self._lock:
+            cached = self._names.pop(key, None)
+            if cached is not None:
+                self._names[key] = cached
+                self.hits += 1
+                return cached._share()
+            self.misses += 1
+
+        imported = Name(name, name_type)
+        imported._refs, imported._owned = 0, True
+
+        with self._lock:
+            # Another thread may have imported the same name in the meantime; keep the first one.
+            cached = self._names.pop(key, imported)
+            self._names[key] = cached._share()
+            while len(self._names) > self.max_size:
+                self._names.popitem(last=False)[1]._disown()
+                self.evictions += 1
+        if cached is not imported:
+            imported._disown()
+        return cached
+
+    def stats(self):
+        """
+        Returns statistics about the use of this cache.
+
+        :returns: a dict with the keys ``hits``, ``misses``, ``evictions``, ``size`` and
+            ``max_size``.
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._names),
+                'max_size': self.max_size,
+            }
+
+    def clear(self):
+        """
+        Removes all names from the cache.
+        """
+        with self._lock:
+            names = list(self._names.values())
+            self._names.clear()
+        for name in names:
+            name._disown()
+
+    def __len__(self):
+        return len(self._names)
@@ -1,12 +1,13 @@
 from __future__ import absolute_import
 
 import re
-import sys
-import struct
-from pyasn1.codec.ber import decoder
+import threading
+import weakref
+
+import six
 
 from .bindings import ffi, C, GSS_ERROR
-from .error import _exception_for_status, GSSException
+from .error import _ClosedHandle, _exception_for_status, GSSException
 
 
 def _release_OID_set(oid_set):
@@ -14,6 +15,9 @@ def _release_OID_set(oid_set):
         C.gss_release_oid_set(ffi.new('OM_uint32[1]'), oid_set)
 
 
+_CLOSED_OID_SET = _ClosedHandle("OID set")
+
+
 def get_all_mechs():
     """
     Return an :class:`OIDSet` of all the mechanisms supported by the underlying GSSAPI
@@ -31,6 +35,142 @@ def get_all_mechs():
     return OIDSet(oid_set=mech_set)
 
 
+def _desc_der(oid_desc):
+    # The DER encoding (without tag and length) of a gss_OID_desc, as bytes
+    if not oid_desc.length:
+        return b''
+    return ffi.buffer(oid_desc.elements, oid_desc.length)[:]
+
+
+# Well-known names which can be used to look up mechanisms with get_mech()
+_MECH_ALIASES = {
+    'krb5': '1.2.840.113554.1.2.2',
+    'kerberos': '1.2.840.113554.1.2.2',
+    'spnego': '1.3.6.1.5.5.2',
+    'iakerb': '1.3.6.1.5.2.5',
+}
+
+
+def _der_to_dotted(der):
+    # Decodes the contents of a DER-encoded OID to a dot-separated string
+    arcs = []
+    value = None
+    for byte in six.iterbytes(der):
+        if value is None:
+            # An arc can't be padded with leading zero groups
+            if byte == 0x80:
+                raise ValueError("Invalid DER-encoded OID: {0!r}".format(der))
+            value = 0
+        value = (value << 7) | (byte & 0x7f)
+        if not byte & 0x80:
+            arcs.append(value)
+            value = None
+    # The last arc must be terminated by a byte without the continuation bit
+    if value is not None or not arcs:
+        raise ValueError("Invalid DER-encoded OID: {0!r}".format(der))
+    first = min(arcs[0] // 40, 2)
+    return '.'.join(str(arc) for arc in [first, arcs[0] - 40 * first] + arcs[1:])
+
+
+def _dotted_to_der(dotted):
+    # Encodes a dot-separated OID string to the contents of its DER encoding
+    try:
+        arcs = [int(arc) for arc in dotted.split('.')]
+    except ValueError:
+        raise ValueError("Invalid OID string: {0}".format(dotted))
+    if len(arcs) < 2 or arcs[0] > 2 or (arcs[0] < 2 and arcs[1] >= 40) or min(arcs) < 0:
+        raise ValueError("Invalid OID string: {0}".format(dotted))
+    encoded = []
+    for arc in [40 * arcs[0] + arcs[1]] + arcs[2:]:
+        chunk = [arc & 0x7f]
+        arc >>= 7
+        while arc:
+            chunk.append(0x80 | (arc & 0x7f))
+            arc >>= 7
+        encoded.extend(reversed(chunk))
+    return b''.join(six.int2byte(byte) for byte in encoded)
+
+
+class _MechRegistry(object):
+    # Indexes the mechanisms supported by the GSSAPI implementation by dotted string, DER encoding
+    # and alias, so they can be looked up without calling gss_indicate_mechs or decoding OIDs.
+
+    def __init__(self):
+        super(_MechRegistry, self).__init__()
+        minor_status = ffi.new('OM_uint32[1]')
+        mech_set = ffi.new('gss_OID_set[1]')
+        try:
+            retval = C.gss_indicate_mechs(minor_status, mech_set)
+            if GSS_ERROR(retval):
+                raise _exception_for_status(retval, minor_status[0])
+            ders = [
+                ffi.buffer(mech_set[0].elements[i].elements, mech_set[0].elements[i].length)[:]
+                for i in range(mech_set[0].count)
+            ]
+        finally:
+            _release_OID_set(mech_set)
+
+        self.mechs = tuple(OID.from_der(der) for der in ders)
+        self.by_der = dict(zip(ders, self.mechs))
+        self.by_name = dict((str(mech), mech) for mech in self.mechs)
+        for alias, dotted in _MECH_ALIASES.items():
+            if dotted in self.by_name:
+                self.by_name[alias] = self.by_name[dotted]
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def _get_registry():
+    global _registry
+    registry = _registry
+    if registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = _MechRegistry()
+            registry = _registry
+    return registry
+
+
+def refresh_mechs():
+    """
+    Rebuilds the registry of supported mechanisms used by :func:`get_mech` and
+    :meth:`OID.mech_from_string`. The registry is built the first time it is used and then kept for
+    the life of the process, so this only needs to be called if the set of mechanisms supported by
+    the underlying GSSAPI implementation changes, e.g. after a GSSAPI mechanism plugin is
+    installed.
+    """
+    global _registry
+    new_registry = _MechRegistry()
+    with _registry_lock:
+        _registry = new_registry
+
+
+def get_mech(mech):
+    """
+    Looks up a mechanism supported by the underlying GSSAPI implementation. The supported
+    mechanisms are indexed once per process (see :func:`refresh_mechs`), so this does not call into
+    the C GSSAPI, and returns the same :class:`OID` object each time it is called with the same
+    mechanism.
+
+    :param mech: The mechanism to look up, as a dot-separated string like "1.2.840.113554.1.2.2",
+        as the DER encoding of the OID (without the DER tag and length), or as one of the aliases
+        ``krb5`` (or ``kerberos``), ``spnego`` or ``iakerb``.
+    :type mech: str or bytes
+    :returns: the mechanism OID.
+    :rtype: :class:`OID`
+    :raises: KeyError if the mechanism is not supported by the underlying GSSAPI implementation.
+    """
+    registry = _get_registry()
+    found = registry.by_name.get(mech)
+    if found is None and isinstance(mech, bytes):
+        found = registry.by_der.get(mech)
+    if found is None:
+        raise KeyError("Unknown mechanism: {0!r}".format(mech))
+    return found
+
+
 class OID(object):
     """
     Represents an `Object Identifier <http://en.wikipedia.org/wiki/Object_identifier>`_. These are
@@ -43,28 +183,80 @@ class OID(object):
     :class:`~gssapi.names.Name` objects.
     """
 
+    __slots__ = ('_oid', '_parent', '_der', '_hash', '_dotted', '__weakref__')
+
+    # All live OID objects, by DER encoding
+    _interned = weakref.WeakValueDictionary()
+    _intern_lock = threading.Lock()
+
+    def __new__(cls, oid, parent_set=None):
+        # oid is a gss_OID_desc, NOT a gss_OID. OIDs are interned and own a copy of their value, so
+        # parent_set doesn't need to be kept alive; it is only accepted for compatibility.
+        return cls._intern(_desc_der(oid))
+
     def __init__(self, oid, parent_set=None):
-        super(OID, self).__init__()
-        self._oid = oid  # _oid contains a gss_OID_desc, NOT a gss_OID
-        self._parent = parent_set
+        pass
+
+    @classmethod
+    def _intern(cls, der):
+        with cls._intern_lock:
+            interned = cls._interned.get(der)
+            if interned is None:
+                interned = super(OID, cls).__new__(cls)
+                elements = ffi.new('char[]', der)
+                oid_desc = ffi.new('gss_OID_desc *')
+                oid_desc.length = len(der)
+                oid_desc.elements = elements
+                interned._oid = oid_desc[0]  # _oid contains a gss_OID_desc, NOT a gss_OID
+                interned._parent = (elements, oid_desc)  # keeps the memory alive
+                interned._der = der
+                interned._hash = hash(der)
+                interned._dotted = None
+                cls._interned[der] = interned
+            return interned
+
+    @classmethod
+    def from_der(cls, der):
+        """
+        Returns the :class:`OID` with the given DER encoding, without calling into the C GSSAPI.
+
+        :param der: The contents of the DER encoding of the OID, without the DER tag and length
+            (as in the ``elements`` of a ``gss_OID_desc``), e.g.
+            ``b'\\x2a\\x86\\x48\\x86\\xf7\\x12\\x01\\x02\\x02'`` for Kerberos 5.
+        :type der: bytes
+        :rtype: :class:`OID`
+        """
+        if not isinstance(der, bytes):
+            raise TypeError("Expected bytes, got {0}".format(type(der)))
+        return cls._intern(der)
+
+    @classmethod
+    def from_dotted(cls, dotted):
+        """
+        Returns the :class:`OID` for a dot-separated string like "1.2.840.113554.1.2.2", or the
+        numeric ASN.1 notation "{1 2 840 113554 1 2 2}", without calling into the C GSSAPI. Unlike
+        :meth:`mech_from_string`, the OID doesn't have to identify a supported mechanism.
+
+        :param dotted: The string form of the OID.
+        :type dotted: str
+        :rtype: :class:`OID`
+        :raises: ValueError if the the string is ill-formatted.
+        """
+        if re.match(r'^\{\d+( \d+)*\}$', dotted):
+            dotted = ".".join(dotted[1:-1].split())
+        return cls._intern(_dotted_to_der(dotted))
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
     def __eq__(self, other):
         if isinstance(other, OID):
-            return str(other) == str(self)
+            return other is self or other._der == self._der
         else:
             return False
 
     def __hash__(self):
-        hsh = 31
-        for c in ffi.buffer(self._oid.elements, self._oid.length):
-            if sys.version_info >= (3,):
-                hsh = 101 * hsh + c[0]
-            else:
-                hsh = 101 * hsh + ord(c)
-        return hsh
+        return self._hash
 
     @staticmethod
     def mech_from_string(input_string):
@@ -73,6 +265,10 @@ class OID(object):
         ASN.1: "{1 2 840 113554 1 2 2}" notation, and returns an :class:`OID` object representing
         the mechanism, which can be passed to other GSSAPI methods.
 
+        The well-known aliases ``krb5``, ``kerberos``, ``spnego`` and ``iakerb`` are also accepted.
+        The supported mechanisms are looked up in a registry which is built once per process (see
+        :func:`get_mech`), and the same :class:`OID` object is returned for the same mechanism.
+
         :param input_string: a string representing the desired mechanism OID.
         :returns: the mechanism OID.
         :rtype: :class:`OID`
@@ -80,24 +276,22 @@ class OID(object):
         :raises: KeyError if the mechanism identified by the string is not supported by the
             underlying GSSAPI implementation.
         """
+        if input_string in _MECH_ALIASES:
+            return get_mech(input_string)
         if not re.match(r'^\d+(\.\d+)*$', input_string):
             if re.match(r'^\{\d+( \d+)*\}$', input_string):
                 input_string = ".".join(input_string[1:-1].split())
             else:
                 raise ValueError(input_string)
-        for mech in get_all_mechs():
-            if input_string == str(mech):
-                return mech
-        raise KeyError("Unknown mechanism: {0}".format(input_string))
+        return get_mech(input_string)
 
     def __repr__(self):
         return "OID({0})".format(self)
 
     def __str__(self):
-        tag = b'\x06'
-        length = struct.pack('B', self._oid.length)
-        value = ffi.buffer(self._oid.elements, self._oid.length)[:]
-        return str(decoder.decode(tag + length + value)[0])
+        if self._dotted is None:
+            self._dotted = _der_to_dotted(self._der)
+        return self._dotted
 
 
 class OIDSet(object):
@@ -105,8 +299,17 @@ class OIDSet(object):
     Represents a set of OIDs returned by the GSSAPI. This object supports array access to the OIDs
     contained within. This set is immutable; if you need to incrementally create an :class:`OIDSet`
     by adding :class:`OID` objects to it, use :class:`MutableOIDSet`.
+
+    The members of the set are copied into Python objects the first time they are needed, so
+    membership tests, iteration, equality and hashing don't call into the C GSSAPI.
+
+    A set can be used as a context manager, which calls :meth:`close` on exit.
     """
 
+    # (members, DER encodings of members), swapped in and out with a single assignment so that
+    # other threads always see both or neither
+    _mirrored = None
+
     def __init__(self, oid_set=None):
         """Wraps a gss_OID_set. This can be returned from methods like gss_inquire_cred
         where it shouldn't be modified by the caller, since it's immutable."""
@@ -128,24 +331,44 @@ class OIDSet(object):
         else:
             raise TypeError("Expected a gss_OID_set *, got " + str(type(oid_set)))
 
+    def close(self):
+        """
+        Releases the C OID set immediately, rather than when this object is garbage collected. The
+        :class:`OID` objects taken from the set remain valid. After this, any use of this set
+        raises :exc:`~gssapi.error.GSSException`. Calling this more than once has no effect.
+        """
+        if self._oid_set is not _CLOSED_OID_SET:
+            _release_OID_set(self._oid_set)
+            self._oid_set = _CLOSED_OID_SET
+            self._mirrored = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _mirror(self):
+        # Lazily builds the Python-side copy of this set's members: a tuple of OID objects, and a
+        # frozenset of their DER encodings for membership tests, iteration and equality.
+        mirrored = self._mirrored
+        if mirrored is None:
+            if self._oid_set[0]:
+                elements = self._oid_set[0].elements
+                members = tuple(OID(elements[i]) for i in range(len(self)))
+            else:
+                members = ()
+            mirrored = self._mirrored = (members, frozenset(member._der for member in members))
+        return mirrored
+
     def __contains__(self, other_oid):
-        if not self._oid_set[0]:
-            return False
-        if not (
-            isinstance(other_oid, OID)
-            or (
-                isinstance(other_oid, ffi.CData)
-                and ffi.typeof(other_oid) == ffi.typeof('gss_OID_desc')
-            )
-        ):
+        if isinstance(other_oid, OID):
+            der = other_oid._der
+        elif isinstance(other_oid, ffi.CData) and ffi.typeof(other_oid) == ffi.typeof('gss_OID_desc'):
+            der = _desc_der(other_oid)
+        else:
             return False
-
-        minor_status = ffi.new('OM_uint32[1]')
-        present = ffi.new('int[1]')
-        C.gss_test_oid_set_member(
-            minor_status, ffi.addressof(other_oid._oid), self._oid_set[0], present
-        )
-        return bool(present[0])
+        return der in self._mirror()[1]
 
     def __len__(self):
         if not self._oid_set[0]:
@@ -154,12 +377,15 @@ class OIDSet(object):
             return self._oid_set[0].count
 
     def __getitem__(self, index):
+        members = self._mirror()[0]
         if index < 0:
-            index = len(self) + index
-        if not self._oid_set[0] or index < 0 or index >= self._oid_set[0].count:
+            index = len(members) + index
+        if index < 0 or index >= len(members):
             raise IndexError("Index out of range.")
+        return members[index]
 
-        return OID(self._oid_set[0].elements[index], self)
+    def __iter__(self):
+        return iter(self._mirror()[0])
 
     @classmethod
     def singleton_set(cls, single_oid):
@@ -192,7 +418,12 @@ class OIDSet(object):
     def __ne__(self, other):
         return not self.__eq__(other)
 
+    def __hash__(self):
+        return hash(self._mirror()[1])
+
     def __eq__(self, other):
+        if isinstance(other, OIDSet):
+            return self._mirror()[1] == other._mirror()[1]
         try:
             if len(self) != len(other):
                 return False
@@ -221,6 +452,8 @@ class MutableOIDSet(OIDSet):
         :rtype: :class:`MutableOIDSet`
     """
 
+    __hash__ = None
+
     def add(self, new_oid):
         """
         Adds another :class:`OID` to this set.
@@ -244,5 +477,7 @@ class MutableOIDSet(OIDSet):
             retval = C.gss_add_oid_set_member(minor_status, oid_ptr, self._oid_set)
             if GSS_ERROR(retval):
                 raise _exception_for_status(retval, minor_status[0])
+            # gss_add_oid_set_member may have reallocated the elements, so rebuild the mirror
+            self._mirrored = None
         else:
             raise GSSException("Cannot add a member to this OIDSet, its gss_OID_set is NULL!")
@@ -0,0 +1,278 @@
+"""
+Opt-in tracing of calls into the C GSSAPI, to find out where time is spent in a running
+application: which ``gss_*`` functions are called, how long they take and which status codes they
+return.
+
+>>> import gssapi.trace
+>>> gssapi.trace.enable()
+>>> ...  # use gssapi as normal
+>>> stats = gssapi.trace.snapshot()
+>>> stats['gss_accept_sec_context'].percentile(99)
+184320
+
+Tracing works by replacing the reference to the C library held by each module of this package
+(:mod:`~gssapi.ctx`, :mod:`~gssapi.creds`, :mod:`~gssapi.names`, :mod:`~gssapi.oids` and
+:mod:`~gssapi.error`) with a proxy which times each call. When tracing is disabled the original
+reference is put back, so there is no overhead at all. Enabling or disabling tracing while other
+threads are calling into the library is safe, but calls which are in progress at the time may or
+may not be recorded.
+
+While tracing is enabled, the C handles for names, credentials, security contexts and OID sets
+which are allocated and released are also counted, to help find leaks. :func:`live_handles` returns
+the number of each type allocated and not yet released since tracing was first enabled.
+"""
+from __future__ import absolute_import, division
+
+import sys
+import threading
+import time
+
+from .bindings import C, ffi
+
+
+_TRACED_MODULES = ('gssapi.ctx', 'gssapi.creds', 'gssapi.names', 'gssapi.oids', 'gssapi.error')
+
+# Durations are recorded in nanoseconds into log-linear buckets, as in HDR histograms: values below
+# 2 * _SUB_BUCKETS have a bucket each, and above that each power of two is split into _SUB_BUCKETS
+# buckets, so the recorded value is accurate to within 1/_SUB_BUCKETS (12.5%). Durations longer
+# than 2**_MAX_BITS ns (about 68 seconds) are counted in the last bucket.
+_SUB_BUCKET_BITS = 3
+_SUB_BUCKETS = 1 << _SUB_BUCKET_BITS
+_MAX_BITS = 36
+_NUM_BUCKETS = (_MAX_BITS - _SUB_BUCKET_BITS) * _SUB_BUCKETS + _SUB_BUCKETS
+
+if hasattr(time, 'perf_counter_ns'):
+    _clock_ns = time.perf_counter_ns
+else:
+    _clock = getattr(time, 'perf_counter', getattr(time, 'monotonic', time.time))
+
+    def _clock_ns():
+        return int(_clock() * 1e9)
+
+
+def _bucket_index(ns):
+    if ns < 2 * _SUB_BUCKETS:
+        return max(ns, 0)
+    shift = ns.bit_length() - _SUB_BUCKET_BITS - 1
+    return min(shift * _SUB_BUCKETS + (ns >> shift), _NUM_BUCKETS - 1)
+
+
+def _bucket_bounds(index):
+    # Returns the range [lower, upper) of durations counted in a bucket
+    if index < 2 * _SUB_BUCKETS:
+        return index, index + 1
+    shift = index // _SUB_BUCKETS - 1
+    top = index - shift * _SUB_BUCKETS
+    return top << shift, (top + 1) << shift
+
+
+class CallStats(object):
+    """
+    Statistics for the calls to one C function, as returned by :func:`snapshot`. All durations are
+    in nanoseconds.
+
+    .. attribute:: calls
+
+        The number of calls.
+
+    .. attribute:: total
+
+        The total duration of all calls.
+
+    .. attribute:: min
+    .. attribute:: max
+
+        The shortest and longest call.
+
+    .. attribute:: statuses
+
+        A dict mapping ``(major status, minor status)`` tuples to the number of calls which
+        returned them. The major status is the return value of the function, which includes any
+        supplementary status bits.
+    """
+
+    def __init__(self, name):
+        super(CallStats, self).__init__()
+        self.name = name
+        self.calls = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.statuses = {}
+        self._buckets = [0] * _NUM_BUCKETS
+
+    def _record(self, ns, status):
+        self.calls += 1
+        self.total += ns
+        if self.min is None or ns < self.min:
+            self.min = ns
+        if self.max is None or ns > self.max:
+            self.max = ns
+        self._buckets[_bucket_index(ns)] += 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def _copy(self):
+        copy = CallStats(self.name)
+        copy.calls, copy.total, copy.min, copy.max = self.calls, self.total, self.min, self.max
+        copy.statuses = dict(self.statuses)
+        copy._buckets = list(self._buckets)
+        return copy
+
+    @property
+    def mean(self):
+        """The mean duration of a call, or None if there were no calls."""
+        return self.total / self.calls if self.calls else None
+
+    @property
+    def histogram(self):
+        """
+        The non-empty buckets of the latency histogram, as a list of ``(lower, upper, count)``
+        tuples counting the calls which took at least `lower` and less than `upper` nanoseconds.
+        """
+        return [_bucket_bounds(i) + (count,) for i, count in enumerate(self._buckets) if count]
+
+    def percentile(self, percent):
+        """
+        Returns an upper bound on the given percentile of call durations, accurate to within 12.5%,
+        or None if there were no calls.
+
+        :param percent: The percentile, between 0 and 100.
+        :type percent: float
+        """
+        if not self.calls:
+            return None
+        threshold = self.calls * percent / 100
+        seen = 0
+        for i, count in enumerate(self._buckets):
+            seen += count
+            if count and seen >= threshold:
+                return min(_bucket_bounds(i)[1], self.max)
+        return self.max
+
+
+_HANDLE_TYPES = ('gss_name_t', 'gss_cred_id_t', 'gss_ctx_id_t', 'gss_OID_set')
+
+_stats = {}
+_live_handles = dict.fromkeys(_HANDLE_TYPES, 0)
+_stats_lock = threading.Lock()
+
+
+def _handle_args(func):
+    # Finds the arguments of a C function which point to handles, and so may be set to a newly
+    # allocated handle, or to NULL when the handle is released
+    handle_types = dict((ffi.typeof(handle_type), handle_type) for handle_type in _HANDLE_TYPES)
+    return tuple(
+        (i, handle_types[arg.item]) for i, arg in enumerate(ffi.typeof(func).args)
+        if arg.kind == 'pointer' and arg.item in handle_types
+    )
+
+
+def _handles_set(args, handle_args):
+    return [bool(args[i]) and bool(args[i][0]) for i, _ in handle_args]
+
+
+def _traced(name, func):
+    with _stats_lock:
+        _stats.setdefault(name, CallStats(name))
+    handle_args = _handle_args(func)
+
+    def traced(*args):
+        if handle_args:
+            handles_before = _handles_set(args, handle_args)
+        start = _clock_ns()
+        retval = func(*args)
+        elapsed = _clock_ns() - start
+        # All gss_* functions take the minor status pointer as their first argument
+        minor = args[0][0] if args and isinstance(args[0], ffi.CData) else 0
+        with _stats_lock:
+            _stats[name]._record(elapsed, (retval, minor))
+            if handle_args:
+                for (_, handle_type), before, after in zip(
+                    handle_args, handles_before, _handles_set(args, handle_args)
+                ):
+                    if after != before:
+                        _live_handles[handle_type] += 1 if after else -1
+        return retval
+    traced.__name__ = name
+    return traced
+
+
+class _TracingLib(object):
+    # Stands in for the C library object in traced modules, and wraps its gss_* functions.
+    # Attributes are cached on the instance after the first lookup, so later lookups are as fast as
+    # on the library itself.
+
+    def __init__(self, lib):
+        super(_TracingLib, self).__init__()
+        self._lib = lib
+
+    def __getattr__(self, name):
+        value = getattr(self._lib, name)
+        if name.startswith('gss_') and callable(value):
+            value = _traced(name, value)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return dir(self._lib)
+
+
+_enable_lock = threading.Lock()
+_tracing_lib = None
+
+
+def enable():
+    """Starts recording calls into the C GSSAPI. This has no effect if tracing is already enabled."""
+    global _tracing_lib
+    with _enable_lock:
+        if _tracing_lib is None:
+            _tracing_lib = _TracingLib(C)
+        for module in _TRACED_MODULES:
+            sys.modules[module].C = _tracing_lib
+
+
+def disable():
+    """Stops recording calls into the C GSSAPI. The statistics recorded so far are kept."""
+    global _tracing_lib
+    with _enable_lock:
+        for module in _TRACED_MODULES:
+            sys.modules[module].C = C
+        _tracing_lib = None
+
+
+def is_enabled():
+    """Returns True if calls into the C GSSAPI are being recorded."""
+    return _tracing_lib is not None
+
+
+def snapshot():
+    """
+    Returns the statistics recorded since tracing was first enabled, or since the last call to
+    :func:`reset`.
+
+    :returns: a dict mapping the name of each C function which has been called to its statistics.
+    :rtype: dict of str to :class:`CallStats`
+    """
+    with _stats_lock:
+        return dict((name, stats._copy()) for name, stats in _stats.items() if stats.calls)
+
+
+def live_handles():
+    """
+    Returns the number of C handles of each type which have been allocated but not released while
+    tracing was enabled. This can be negative if handles allocated before tracing was enabled are
+    released.
+
+    :returns: a dict mapping ``'gss_name_t'``, ``'gss_cred_id_t'``, ``'gss_ctx_id_t'`` and
+        ``'gss_OID_set'`` to counts.
+    :rtype: dict
+    """
+    with _stats_lock:
+        return dict(_live_handles)
+
+
+def reset():
+    """Discards all recorded statistics. The counts of live handles are not reset."""
+    with _stats_lock:
+        for name in list(_stats):
+            _stats[name] = CallStats(name)
@@ -33,7 +33,6 @@ class CFFIInstall(install):
 REQUIRES = [
     'cffi>=0.8',
     'six>=1.5.0',
-    'pyasn1>=0.1.2',
 ]
 
 base_dir = os.path.dirname(__file__)
@@ -46,7 +45,7 @@ with open(os.path.join(base_dir, "gssapi", "__about__.py")) as f:
 setup(
     name=about["__title__"],
     version=about["__version__"],
-    packages=find_packages(exclude=["tests.*", "tests"]),
+    packages=find_packages(exclude=["tests.*", "tests", "benchmarks.*", "benchmarks"]),
     py_modules=["gssapi_ez_setup"],
 
     # package_data specifies what is included in a bdist
@@ -1,5 +1,13 @@
 from __future__ import absolute_import
+from .acl import *
+from .bench import *
 from .creds import *
 from .chanbind import *
+from .ctx import *
+from .error import *
+from .exportname import *
+from .keytab import *
+from .metrics import *
 from .names import *
 from .oids import *
+from .trace import *
@@ -0,0 +1,85 @@
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from gssapi import PrincipalACL
+from gssapi.acl import _KRB5_MECH_DER
+from gssapi.exportname import build_exported_name
+
+
+def _exported(principal):
+    return build_exported_name(_KRB5_MECH_DER, principal.encode())
+
+
+class PrincipalACLTest(unittest.TestCase):
+
+    rules = [
+        '# allowed principals',
+        'alice@EXAMPLE.COM',
+        '',
+        '*@TRUSTED.EXAMPLE.COM',
+        'HTTP/*.example.com@EXAMPLE.COM',
+        '*/admin@EXAMPLE.COM',
+    ] + ['user{0}@BIG.EXAMPLE.COM'.format(i) for i in range(1000)]
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _check(self, acl):
+        self.assertIn(_exported('alice@EXAMPLE.COM'), acl)
+        self.assertIn(_exported('user0@BIG.EXAMPLE.COM'), acl)
+        self.assertIn(_exported('user999@BIG.EXAMPLE.COM'), acl)
+        self.assertIn(_exported('anyone@TRUSTED.EXAMPLE.COM'), acl)
+        self.assertIn(_exported('HTTP/www.example.com@EXAMPLE.COM'), acl)
+        self.assertIn(_exported('bob/admin@EXAMPLE.COM'), acl)
+        self.assertNotIn(_exported('bob@EXAMPLE.COM'), acl)
+        self.assertNotIn(_exported('user1000@BIG.EXAMPLE.COM'), acl)
+        self.assertNotIn(_exported('alice@OTHER.EXAMPLE.COM'), acl)
+        self.assertNotIn(_exported('HTTP/www.example.org@EXAMPLE.COM'), acl)
+        self.assertNotIn(_exported('host/www.example.com@EXAMPLE.COM'), acl)
+        self.assertNotIn(b'not an exported name', acl)
+
+    def test_lookup(self):
+        acl = PrincipalACL(self.rules)
+        self._check(acl)
+        self.assertEqual(len(acl), 1004)
+
+    def test_save_load(self):
+        path = os.path.join(self.tmpdir, 'acl.bin')
+        PrincipalACL(self.rules).save(path)
+        self._check(PrincipalACL.load(path))
+
+    def test_from_file(self):
+        path = os.path.join(self.tmpdir, 'acl.txt')
+        with open(path, 'w') as rules:
+            rules.write('\n'.join(self.rules))
+        self._check(PrincipalACL.from_file(path))
+
+    def test_invalid_rules(self):
+        self.assertRaises(ValueError, PrincipalACL, ['HTTP/*'])
+        self.assertRaises(ValueError, PrincipalACL, ['*@*.EXAMPLE.COM'])
+        # Exact rules need a realm too, or they could never match an exported name
+        self.assertRaises(ValueError, PrincipalACL, ['alice'])
+        self.assertRaises(ValueError, PrincipalACL, ['alice@'])
+        self.assertRaises(ValueError, PrincipalACL, ['@EXAMPLE.COM'])
+
+    def test_stats(self):
+        acl = PrincipalACL(self.rules)
+        acl.allows(_exported('user500@BIG.EXAMPLE.COM'))
+        acl.allows(_exported('HTTP/www.example.com@EXAMPLE.COM'))
+        stats = acl.stats()
+        self.assertEqual(stats['exact'], 1001)
+        self.assertEqual(stats['realms'], 1)
+        self.assertEqual(stats['globs'], 2)
+        self.assertEqual(stats['lookups'], 2)
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['glob_tests'], 1)
+        self.assertLessEqual(stats['probes'], 2 * 11)
+        acl.reset_stats()
+        self.assertEqual(acl.stats()['lookups'], 0)
@@ -0,0 +1,94 @@
+from __future__ import absolute_import
+
+import socket
+import unittest
+
+from mock import Mock, patch
+
+from gssapi import GSSException
+from gssapi.bench import AcceptorProtocol, frame, percentile, recv_frame
+
+
+class FramingTest(unittest.TestCase):
+
+    def test_roundtrip(self):
+        left, right = socket.socketpair()
+        try:
+            left.sendall(frame(b'spam') + frame(b'') + frame(b'x' * 100000))
+            self.assertEqual(recv_frame(right), b'spam')
+            self.assertEqual(recv_frame(right), b'')
+            self.assertEqual(recv_frame(right), b'x' * 100000)
+            left.close()
+            self.assertRaises(EOFError, recv_frame, right)
+        finally:
+            left.close()
+            right.close()
+
+    def test_percentile(self):
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 50), 50)
+        self.assertEqual(percentile(samples, 99), 99)
+        self.assertEqual(percentile(samples, 100), 100)
+        self.assertEqual(percentile([7], 90), 7)
+        self.assertIsNone(percentile([], 50))
+
+
+@patch('gssapi.bench.AcceptContext')
+class AcceptorProtocolTest(unittest.TestCase):
+
+    def _connect(self, AcceptContext):
+        ctx = AcceptContext.return_value
+        ctx.__enter__.return_value = ctx
+        ctx.established = False
+
+        def step(token):
+            ctx.established = True
+            return b'reply:' + token
+        ctx.step.side_effect = step
+        ctx.unwrap.side_effect = lambda message: message[len('wrapped:'):]
+        ctx.wrap.side_effect = lambda message: b'wrapped:' + message
+        protocol = AcceptorProtocol()
+        protocol.connection_made(Mock())
+        return protocol, ctx
+
+    def _sent(self, protocol):
+        return [call[0][0] for call in protocol.transport.write.call_args_list]
+
+    def test_wraptest(self, AcceptContext):
+        protocol, ctx = self._connect(AcceptContext)
+        data = frame(b'token') + frame(b'!WRAPTEST') + frame(b'wrapped:spam') + frame(b'!WRAPTEST')
+        # frames may be split across reads
+        protocol.data_received(data[:3])
+        protocol.data_received(data[3:20])
+        protocol.data_received(data[20:] + frame(b'wrapped:eggs'))
+        self.assertEqual(self._sent(protocol), [
+            frame(b'reply:token'), frame(b'!OK'),
+            frame(b'!OK'), frame(b'wrapped:spam'),
+            frame(b'!OK'), frame(b'wrapped:eggs'),
+        ])
+        self.assertFalse(protocol.transport.close.called)
+        self.assertFalse(ctx.__exit__.called)
+        protocol.connection_lost(None)
+        self.assertEqual(ctx.__exit__.call_count, 1)
+
+    def test_mictest(self, AcceptContext):
+        protocol, ctx = self._connect(AcceptContext)
+        ctx.get_mic.return_value = b'mic'
+        protocol.data_received(frame(b'token') + frame(b'!MICTEST') + frame(b'spam') + frame(b'theirs'))
+        ctx.verify_mic.assert_called_once_with(b'spam', b'theirs')
+        self.assertEqual(self._sent(protocol)[2:], [frame(b'!OK'), frame(b'spam'), frame(b'mic')])
+
+    def test_errors(self, AcceptContext):
+        protocol, ctx = self._connect(AcceptContext)
+        ctx.unwrap.side_effect = GSSException("bad token")
+        protocol.data_received(
+            frame(b'token') + frame(b'!WRAPTEST') + frame(b'garbage') + frame(b'!MYNAME')
+        )
+        self.assertEqual(self._sent(protocol)[-1], frame(b'!ERROR'))
+        protocol.transport.close.assert_called_once_with()
+        self.assertEqual(ctx.wrap.call_count, 0)
+
+        protocol, ctx = self._connect(AcceptContext)
+        protocol.data_received(frame(b'token') + frame(b'!NOTACOMMAND'))
+        self.assertEqual(self._sent(protocol)[-1], frame(b'!ERROR'))
+        protocol.transport.close.assert_called_once_with()
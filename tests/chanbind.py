@@ -1,10 +1,30 @@
 from __future__ import absolute_import
 
+import hashlib
 import socket
+import struct
 import unittest
 
+from mock import Mock
+
 import gssapi
-from gssapi.bindings import _buf_to_str
+from gssapi.bindings import ffi, _buf_to_str
+from gssapi.oids import _dotted_to_der
+
+
+def _tlv(tag, value):
+    if len(value) < 0x80:
+        length = struct.pack('B', len(value))
+    else:
+        length = b'\x82' + struct.pack('>H', len(value))
+    return struct.pack('B', tag) + length + value
+
+
+def _certificate(signature_algorithm):
+    # A structurally valid (but otherwise meaningless) certificate with the given signature
+    # algorithm OID
+    algorithm = _tlv(0x30, _tlv(0x06, _dotted_to_der(signature_algorithm)) + b'\x05\x00')
+    return _tlv(0x30, _tlv(0x30, b'tbsCertificate' * 20) + algorithm + _tlv(0x03, b'\x00sig'))
 
 
 class ChannelBindingsTestCase(unittest.TestCase):
@@ -51,3 +71,104 @@ class ChannelBindingsTestCase(unittest.TestCase):
                 _buf_to_str(cb._cb.acceptor_address),
                 socket.inet_pton(socket.AF_INET6, '2a03:2880:2110:3f07:face:b00c:0:1')
             )
+
+
+class FrozenChannelBindingsTestCase(unittest.TestCase):
+
+    def test_fields(self):
+        cb = gssapi.FrozenChannelBindings(gssapi.C_AF_LOCAL, b'initiator', gssapi.C_AF_LOCAL,
+                                          b'acceptor', b'app data')
+        self.assertEqual(cb._cb.initiator_addrtype, gssapi.C_AF_LOCAL)
+        self.assertEqual(_buf_to_str(cb._cb.initiator_address), b'initiator')
+        self.assertEqual(cb._cb.acceptor_addrtype, gssapi.C_AF_LOCAL)
+        self.assertEqual(_buf_to_str(cb._cb.acceptor_address), b'acceptor')
+        self.assertEqual(_buf_to_str(cb._cb.application_data), b'app data')
+        self.assertEqual(cb.application_data, b'app data')
+
+    def test_empty_fields(self):
+        cb = gssapi.FrozenChannelBindings(application_data=b'app data')
+        self.assertEqual(cb._cb.initiator_addrtype, gssapi.C_AF_NULLADDR)
+        self.assertEqual(_buf_to_str(cb._cb.initiator_address), b'')
+        self.assertEqual(_buf_to_str(cb._cb.acceptor_address), b'')
+        self.assertEqual(_buf_to_str(cb._cb.application_data), b'app data')
+
+    def test_immutable(self):
+        cb = gssapi.FrozenChannelBindings(application_data=b'app data')
+        with self.assertRaises(AttributeError):
+            cb.application_data = b'other data'
+        self.assertEqual(cb.application_data, b'app data')
+
+    def test_hashable(self):
+        cb1 = gssapi.FrozenChannelBindings(application_data=b'app data')
+        cb2 = gssapi.ChannelBindings(application_data=b'app data').freeze()
+        self.assertEqual(cb1, cb2)
+        self.assertEqual(hash(cb1), hash(cb2))
+        self.assertNotEqual(cb1, gssapi.FrozenChannelBindings(application_data=b'other data'))
+        self.assertEqual(len(set([cb1, cb2])), 1)
+
+    def test_derive(self):
+        listener = gssapi.FrozenChannelBindings(acceptor_addrtype=gssapi.C_AF_LOCAL,
+                                                acceptor_address=b'acceptor', application_data=b'app')
+        cb = listener.derive(initiator_addrtype=gssapi.C_AF_LOCAL, initiator_address=b'initiator')
+        self.assertIsInstance(cb, gssapi.FrozenChannelBindings)
+        self.assertEqual(_buf_to_str(cb._cb.initiator_address), b'initiator')
+        self.assertEqual(_buf_to_str(cb._cb.acceptor_address), b'acceptor')
+        self.assertEqual(_buf_to_str(cb._cb.application_data), b'app')
+        self.assertEqual(listener.initiator_address, b'')
+        self.assertRaises(TypeError, listener.derive, spam=b'eggs')
+        self.assertEqual(cb, gssapi.FrozenChannelBindings(
+            gssapi.C_AF_LOCAL, b'initiator', gssapi.C_AF_LOCAL, b'acceptor', b'app'
+        ))
+
+    def test_derive_shares_fields(self):
+        listener = gssapi.FrozenChannelBindings(acceptor_addrtype=gssapi.C_AF_LOCAL,
+                                                acceptor_address=b'acceptor', application_data=b'app')
+        cb = listener.derive(application_data=b'tls-unique:spam')
+        self.assertEqual(cb.application_data, b'tls-unique:spam')
+        self.assertEqual(listener.application_data, b'app')
+        # The acceptor address isn't copied again
+        self.assertEqual(cb._cb.acceptor_address.value, listener._cb.acceptor_address.value)
+        self.assertNotEqual(cb._cb.application_data.value, listener._cb.application_data.value)
+        cb = cb.derive(application_data=None)
+        self.assertEqual(_buf_to_str(cb._cb.application_data), b'')
+        self.assertEqual(cb._cb.application_data.value, ffi.NULL)
+
+
+class TLSChannelBindingsTestCase(unittest.TestCase):
+
+    def test_server_end_point(self):
+        cert = _certificate('1.2.840.113549.1.1.12')  # sha384WithRSAEncryption
+        cb = gssapi.ChannelBindings.tls_server_end_point(cert)
+        self.assertEqual(cb.application_data, b'tls-server-end-point:' + hashlib.sha384(cert).digest())
+        self.assertEqual(cb.initiator_addrtype, gssapi.C_AF_NULLADDR)
+
+    def test_server_end_point_sha1_upgraded(self):
+        cert = _certificate('1.2.840.10045.4.1')  # ecdsa-with-SHA1
+        ssl_socket = Mock()
+        ssl_socket.getpeercert.return_value = cert
+        cb = gssapi.ChannelBindings.tls_server_end_point(ssl_socket)
+        ssl_socket.getpeercert.assert_called_once_with(binary_form=True)
+        self.assertEqual(cb.application_data, b'tls-server-end-point:' + hashlib.sha256(cert).digest())
+
+    def test_server_end_point_no_cert(self):
+        ssl_socket = Mock()
+        ssl_socket.getpeercert.return_value = None
+        self.assertRaises(ValueError, gssapi.ChannelBindings.tls_server_end_point, ssl_socket)
+        self.assertRaises(ValueError, gssapi.ChannelBindings.tls_server_end_point, b'\x30\x05')
+
+    def test_unique(self):
+        ssl_socket = Mock()
+        ssl_socket.get_channel_binding.return_value = b'finished message'
+        cb = gssapi.ChannelBindings.tls_unique(ssl_socket)
+        ssl_socket.get_channel_binding.assert_called_once_with('tls-unique')
+        self.assertEqual(cb.application_data, b'tls-unique:finished message')
+        ssl_socket.get_channel_binding.return_value = None
+        self.assertRaises(ValueError, gssapi.ChannelBindings.tls_unique, ssl_socket)
+
+    def test_exporter(self):
+        connection = Mock()
+        connection.export_keying_material.return_value = b'k' * 32
+        cb = gssapi.ChannelBindings.tls_exporter(connection)
+        connection.export_keying_material.assert_called_once_with(b'EXPORTER-Channel-Binding', 32, b'')
+        self.assertEqual(cb.application_data, b'tls-exporter:' + b'k' * 32)
+        self.assertRaises(NotImplementedError, gssapi.ChannelBindings.tls_exporter, object())
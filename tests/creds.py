@@ -1,13 +1,29 @@
 from __future__ import absolute_import
 
 import platform
+import threading
+import time
 import unittest
+import warnings
+
+from mock import Mock, patch
 
 from gssapi import (
     bindings,
-    Credential, NoCredential, CredentialsExpired, GSSException, GSSCException,
-    S_NO_CRED, C_INITIATE, C_ACCEPT
+    Credential, ImpersonationCache, MemoryCCachePool, Name, C_INDEFINITE, NoCredential,
+    CredentialsExpired, GSSException, GSSCException, S_NO_CRED, C_INITIATE, C_ACCEPT,
+    C_NT_HOSTBASED_SERVICE, C_NT_USER_NAME
 )
+from gssapi.creds import _CLOSED_CREDENTIAL, _request_key, _run_async
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+
+def _null_cred():
+    return Credential(bindings.ffi.new('gss_cred_id_t[1]'))
 
 
 class CredentialTest(unittest.TestCase):
@@ -18,6 +34,285 @@ class CredentialTest(unittest.TestCase):
         self.assertRaises(TypeError, Credential, lifetime='incorrect type')
         self.assertRaises(TypeError, Credential, usage='incorrect type')
 
+    def test_close(self):
+        with _null_cred() as cred:
+            pass
+        self.assertRaises(GSSException, getattr, cred, 'lifetime')
+        self.assertRaises(GSSException, getattr, cred, 'mechs')
+        cred.close()
+
+    def test_close_shared(self):
+        # Two callers share the credential, which is released when both have closed it
+        shared = _null_cred()._share()
+        shared.close()
+        self.assertIsNot(shared._cred, _CLOSED_CREDENTIAL)
+        shared.close()
+        self.assertIs(shared._cred, _CLOSED_CREDENTIAL)
+        # A credential still held by a cache isn't released by closing it too often
+        cached = _null_cred()
+        cached._owned = True
+        cached.close()
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            cached.close()
+        self.assertEqual([w.category for w in caught], [RuntimeWarning])
+        self.assertIsNot(cached._cred, _CLOSED_CREDENTIAL)
+        cached._disown()
+        self.assertIs(cached._cred, _CLOSED_CREDENTIAL)
+
+
+@unittest.skipIf(asyncio is None, "asyncio is not available")
+class AsyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.calls = []
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def _blocking_call(self, value):
+        self.calls.append(value)
+        self.release.wait(5)
+        return value
+
+    def test_shared_request(self):
+        first = _run_async(('key',), None, self._blocking_call, 1)
+        second = _run_async(('key',), None, self._blocking_call, 1)
+        other = _run_async(None, None, self._blocking_call, 2)
+        self.loop.call_later(0.05, self.release.set)
+        results = self.loop.run_until_complete(asyncio.gather(first, second, other))
+        self.assertEqual(results, [1, 1, 2])
+        self.assertEqual(sorted(self.calls), [1, 2])
+
+    def test_timeout(self):
+        timed_out = _run_async(('key',), None, self._blocking_call, 1, timeout=0.01)
+        waiting = _run_async(('key',), None, self._blocking_call, 1)
+        self.assertRaises(asyncio.TimeoutError, self.loop.run_until_complete, timed_out)
+        # The other caller still gets the result
+        self.release.set()
+        self.assertEqual(self.loop.run_until_complete(waiting), 1)
+
+    @patch.object(Credential, '__init__', return_value=None)
+    def test_acquire_async(self, mock_init):
+        mock_init.side_effect = lambda *args, **kwargs: self._blocking_call(None)
+        first = Credential.acquire_async(usage=C_INITIATE)
+        second = Credential.acquire_async(usage=C_INITIATE)
+        self.loop.call_later(0.05, self.release.set)
+        creds = self.loop.run_until_complete(asyncio.gather(first, second))
+        self.assertIs(creds[0], creds[1])
+        self.assertIsInstance(creds[0], Credential)
+        self.assertEqual(mock_init.call_count, 1)
+        # One caller closing the shared credential mustn't break it for the other
+        self.assertEqual(creds[0]._refs, 2)
+
+    @patch.object(Credential, '__init__', return_value=None)
+    def test_acquire_async_timeout(self, mock_init):
+        # Only callers which receive the credential hold a reference to it
+        mock_init.side_effect = lambda *args, **kwargs: self._blocking_call(None)
+        timed_out = Credential.acquire_async(usage=C_INITIATE, timeout=0.01)
+        waiting = Credential.acquire_async(usage=C_INITIATE)
+        self.assertRaises(asyncio.TimeoutError, self.loop.run_until_complete, timed_out)
+        self.release.set()
+        cred = self.loop.run_until_complete(waiting)
+        self.assertEqual(cred._refs, 1)
+
+    @patch.object(Credential, '__init__', return_value=None)
+    def test_unkeyable_request(self, mock_init):
+        # Keys of mixed types can't be sorted into a request key, so the requests aren't shared
+        cred_store = {b'ccache': 'MEMORY:spam', 'keytab': 'FILE:/etc/krb5.keytab'}
+        first = Credential.acquire_async(cred_store=cred_store)
+        second = Credential.acquire_async(cred_store=cred_store)
+        creds = self.loop.run_until_complete(asyncio.gather(first, second))
+        self.assertIsNot(creds[0], creds[1])
+        self.assertEqual(mock_init.call_count, 2)
+        self.assertEqual((creds[0]._refs, creds[1]._refs), (1, 1))
+
+    def test_name_request_key(self):
+        # Plain names aren't hashable, so requests for them are keyed by their display form
+        name = Name("host@example.com", C_NT_HOSTBASED_SERVICE)
+        same = Name("host@example.com", C_NT_HOSTBASED_SERVICE)
+        key = _request_key(name, C_INITIATE)
+        self.assertEqual(key, _request_key(same, C_INITIATE))
+        other = Name("host@example.org", C_NT_HOSTBASED_SERVICE)
+        self.assertNotEqual(key, _request_key(other, C_INITIATE))
+        name.close()
+        self.assertIsNone(_request_key(name, C_INITIATE))
+
+
+class ImpersonationCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.impersonator = Mock()
+        self.impersonator._impersonate.side_effect = lambda *args, **kwargs: (_null_cred(), 3600)
+
+    def test_hit(self):
+        cache = ImpersonationCache(self.impersonator)
+        cred = cache.get('alice')
+        self.assertIs(cache.get('alice'), cred)
+        self.assertIsNot(cache.get('bob'), cred)
+        self.assertEqual(self.impersonator._impersonate.call_count, 2)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertIsInstance(self.impersonator._impersonate.call_args[0][0], Name)
+        self.assertEqual(cred._refs, 2)
+
+    def test_close(self):
+        cache = ImpersonationCache(self.impersonator)
+        cred = cache.get('alice')
+        cred.close()
+        self.assertIs(cache.get('alice'), cred)
+        cred.close()
+        self.assertIsNot(cred._cred, _CLOSED_CREDENTIAL)
+        # Once the cache discards it, the credential is released
+        cache.clear()
+        self.assertIs(cred._cred, _CLOSED_CREDENTIAL)
+        # ...unless a caller still holds it
+        held = cache.get('bob')
+        cache.clear()
+        self.assertIsNot(held._cred, _CLOSED_CREDENTIAL)
+        held.close()
+        self.assertIs(held._cred, _CLOSED_CREDENTIAL)
+
+    def test_expiry(self):
+        cache = ImpersonationCache(self.impersonator, min_lifetime=60)
+        with patch('gssapi.creds._monotonic', return_value=1000.0):
+            cred = cache.get('alice')
+        with patch('gssapi.creds._monotonic', return_value=1000.0 + 3600 - 61):
+            self.assertIs(cache.get('alice'), cred)
+        with patch('gssapi.creds._monotonic', return_value=1000.0 + 3600 - 59):
+            self.assertIsNot(cache.get('alice'), cred)
+
+    def test_indefinite_lifetime(self):
+        self.impersonator._impersonate.side_effect = lambda *args, **kwargs: (
+            _null_cred(), C_INDEFINITE
+        )
+        cache = ImpersonationCache(self.impersonator)
+        cred = cache.get('alice')
+        self.assertIs(cache.get('alice'), cred)
+
+    def test_lru_eviction(self):
+        cache = ImpersonationCache(self.impersonator, max_size=2)
+        alice = cache.get('alice')
+        cache.get('bob')
+        cache.get('alice')
+        cache.get('carol')  # evicts bob, the least recently used
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+        self.assertIs(cache.get('alice'), alice)
+        cache.get('bob')
+        self.assertEqual(self.impersonator._impersonate.call_count, 4)
+
+    def test_bad_args(self):
+        cache = ImpersonationCache(self.impersonator)
+        self.assertRaises(TypeError, cache.get, 12345)
+
+    def test_name_type(self):
+        cache = ImpersonationCache(self.impersonator)
+        user = cache.get(Name('alice', C_NT_USER_NAME))
+        self.assertIs(cache.get(Name('alice', C_NT_USER_NAME)), user)
+        self.assertIsNot(cache.get(Name('alice', C_NT_HOSTBASED_SERVICE)), user)
+        self.assertIsNot(cache.get('alice'), user)
+        self.assertEqual(self.impersonator._impersonate.call_count, 3)
+
+    def test_concurrent_miss(self):
+        started = threading.Event()
+        proceed = threading.Event()
+
+        def impersonate(*args, **kwargs):
+            started.set()
+            proceed.wait(5)
+            return _null_cred(), 3600
+        self.impersonator._impersonate.side_effect = impersonate
+
+        cache = ImpersonationCache(self.impersonator)
+        results = []
+        first = threading.Thread(target=lambda: results.append(cache.get('alice')))
+        first.start()
+        started.wait(5)
+        second = threading.Thread(target=lambda: results.append(cache.get('alice')))
+        second.start()
+        proceed.set()
+        first.join(5)
+        second.join(5)
+        self.assertEqual(self.impersonator._impersonate.call_count, 1)
+        self.assertIs(results[0], results[1])
+
+    def test_failed_fill(self):
+        self.impersonator._impersonate.side_effect = GSSException("KDC unreachable")
+        cache = ImpersonationCache(self.impersonator)
+        self.assertRaises(GSSException, cache.get, 'alice')
+        self.impersonator._impersonate.side_effect = lambda *args, **kwargs: (_null_cred(), 3600)
+        cred = cache.get('alice')
+        self.assertIs(cache.get('alice'), cred)
+
+
+@patch('gssapi.creds._can_destroy_ccaches', return_value=True)
+@patch('gssapi.creds._destroy_ccache')
+class MemoryCCachePoolTest(unittest.TestCase):
+
+    def test_store(self, destroy, can_destroy):
+        pool = MemoryCCachePool()
+        cred = Mock()
+        with pool.store(cred) as ccache_name:
+            self.assertTrue(ccache_name.startswith('MEMORY:'))
+            self.assertEqual(cred.store.call_args[1]['cred_store'], {'ccache': ccache_name})
+            self.assertTrue(cred.store.call_args[1]['overwrite'])
+            self.assertEqual(destroy.call_count, 0)
+        destroy.assert_called_once_with(ccache_name)
+
+    def test_unique_names(self, destroy, can_destroy):
+        pool = MemoryCCachePool()
+        with pool.store(Mock()) as name1:
+            with pool.store(Mock()) as name2:
+                self.assertNotEqual(name1, name2)
+        # Released names are reused
+        with pool.store(Mock()) as name3:
+            self.assertIn(name3, (name1, name2))
+
+    def test_release_on_error(self, destroy, can_destroy):
+        pool = MemoryCCachePool(max_size=1)
+        cred = Mock()
+        cred.store.side_effect = GSSException("store failed")
+        for _ in range(2):
+            with self.assertRaises(GSSException):
+                with pool.store(cred):
+                    pass
+        self.assertEqual(destroy.call_count, 2)
+
+    def test_destroy_failure(self, destroy, can_destroy):
+        pool = MemoryCCachePool(max_size=1)
+        destroy.side_effect = GSSException("destroy failed")
+        with self.assertRaises(GSSException):
+            with pool.store(Mock()) as name1:
+                pass
+        destroy.side_effect = None
+        # The cache which couldn't be destroyed isn't handed out again, and the pool isn't exhausted
+        with pool.store(Mock()) as name2:
+            self.assertNotEqual(name1, name2)
+
+    def test_destroy_failure_after_error(self, destroy, can_destroy):
+        pool = MemoryCCachePool(max_size=1)
+        destroy.side_effect = GSSException("destroy failed")
+        # The exception from the with block isn't replaced by the failure to destroy the cache
+        with self.assertRaises(KeyError):
+            with pool.store(Mock()):
+                raise KeyError("spam")
+        cred = Mock()
+        cred.store.side_effect = GSSException("store failed")
+        with self.assertRaises(GSSException) as raised:
+            with pool.store(cred):
+                pass
+        self.assertEqual(str(raised.exception), "store failed")
+        self.assertEqual(destroy.call_count, 2)
+
+    def test_no_krb5(self, destroy, can_destroy):
+        can_destroy.return_value = False
+        self.assertRaises(NotImplementedError, MemoryCCachePool)
+
 
 class DefaultInitCredentialTest(unittest.TestCase):
 
@@ -0,0 +1,99 @@
+from __future__ import absolute_import
+
+import gc
+import unittest
+
+from mock import patch
+
+from gssapi import (
+    metrics, AcceptContext, InitContext, Name, C_NT_HOSTBASED_SERVICE, GSSException,
+    S_DEFECTIVE_TOKEN
+)
+from gssapi.bindings import C, ffi
+
+
+def _fake_handle(ctx):
+    ctx._ctx[0] = ffi.cast('gss_ctx_id_t', 1)
+
+
+def _fake_delete(minor_status, context, output_token):
+    context[0] = ffi.NULL
+    return C.GSS_S_COMPLETE
+
+
+@patch('gssapi.ctx.C.gss_delete_sec_context', side_effect=_fake_delete)
+class ContextReleaseTest(unittest.TestCase):
+
+    def setUp(self):
+        metrics.reset()
+        gc.collect()
+
+    def test_init_context(self, delete):
+        ctx = InitContext(Name('host@localhost', C_NT_HOSTBASED_SERVICE))
+        del ctx
+        gc.collect()
+        self.assertEqual(delete.call_count, 0)
+
+        ctx = InitContext(Name('host@localhost', C_NT_HOSTBASED_SERVICE))
+        _fake_handle(ctx)
+        del ctx
+        gc.collect()
+        self.assertEqual(delete.call_count, 1)
+
+    def test_accept_context(self, delete):
+        ctx = AcceptContext()
+        _fake_handle(ctx)
+        del ctx
+        gc.collect()
+        self.assertEqual(delete.call_count, 1)
+        self.assertEqual(metrics.collect()[metrics.CONTEXTS], -1)
+
+    def test_delete(self, delete):
+        ctx = AcceptContext()
+        _fake_handle(ctx)
+        ctx.delete()
+        self.assertEqual(delete.call_count, 1)
+        # the handle which replaces the deleted one is also released when collected
+        _fake_handle(ctx)
+        del ctx
+        gc.collect()
+        self.assertEqual(delete.call_count, 2)
+
+    def test_close(self, delete):
+        with AcceptContext() as ctx:
+            _fake_handle(ctx)
+            ctx.flags = 0xffff
+        self.assertEqual(delete.call_count, 1)
+        self.assertEqual(metrics.collect()[metrics.CONTEXTS], -1)
+        self.assertFalse(ctx.established)
+        self.assertRaises(GSSException, ctx.step, b'token')
+        self.assertRaises(GSSException, ctx.wrap, b'message')
+        self.assertRaises(GSSException, ctx.delete)
+        ctx.close()
+        del ctx
+        gc.collect()
+        self.assertEqual(delete.call_count, 1)
+        self.assertEqual(metrics.collect()[metrics.HANDSHAKES_STARTED], 0)
+
+    def test_failed_step_metrics(self, delete):
+        results = []
+
+        def accept(minor_status, context, *args):
+            context[0] = ffi.cast('gss_ctx_id_t', 1)
+            return results.pop(0)
+
+        with patch('gssapi.ctx.C.gss_accept_sec_context', side_effect=accept):
+            # The context allocated by a failed first step was never counted
+            results[:] = [S_DEFECTIVE_TOKEN]
+            self.assertRaises(GSSException, AcceptContext().step, b'token')
+            self.assertEqual(delete.call_count, 1)
+            self.assertEqual(metrics.collect()[metrics.CONTEXTS], 0)
+
+            ctx = AcceptContext()
+            results[:] = [C.GSS_S_CONTINUE_NEEDED, S_DEFECTIVE_TOKEN]
+            ctx.step(b'token')
+            self.assertEqual(metrics.collect()[metrics.CONTEXTS], 1)
+            self.assertRaises(GSSException, ctx.step, b'token')
+            self.assertEqual(delete.call_count, 2)
+            self.assertEqual(metrics.collect()[metrics.CONTEXTS], 0)
+        self.assertEqual(metrics.collect()[metrics.HANDSHAKES_FAILED], {'DefectiveToken': 2})
@@ -0,0 +1,79 @@
+from __future__ import absolute_import
+
+import unittest
+
+from mock import patch, sentinel
+
+from gssapi import (
+    GSSCException, GSSMechException, BadName, BadStructure, S_BAD_NAME, S_CALL_BAD_STRUCTURE,
+    S_FAILURE, OID
+)
+from gssapi.bindings import C, ffi
+from gssapi.error import _exception_for_status, _message_cache
+
+
+class ExceptionMessageTest(unittest.TestCase):
+
+    def setUp(self):
+        _message_cache.clear()
+
+    @patch('gssapi.error.C.gss_display_status', wraps=C.gss_display_status)
+    def test_lazy_message(self, display_status):
+        exc = _exception_for_status(S_BAD_NAME, 0)
+        self.assertEqual(exc.maj_status, S_BAD_NAME)
+        self.assertEqual(display_status.call_count, 0)
+        self.assertIn(str(S_BAD_NAME), str(exc))
+        self.assertGreater(display_status.call_count, 0)
+
+    @patch('gssapi.error.C.gss_display_status', wraps=C.gss_display_status)
+    def test_cached_message(self, display_status):
+        message = str(_exception_for_status(S_FAILURE, 0))
+        calls = display_status.call_count
+        self.assertEqual(str(_exception_for_status(S_FAILURE, 0)), message)
+        self.assertEqual(display_status.call_count, calls)
+        self.assertNotEqual(str(_exception_for_status(S_BAD_NAME, 0)), message)
+
+    @patch('gssapi.error.C.gss_display_status', wraps=C.gss_display_status)
+    def test_minor_message(self, display_status):
+        # Minor status text can depend on the failed call, so it is rendered straight away and
+        # not cached
+        exc = _exception_for_status(S_FAILURE, 1)
+        self.assertGreater(display_status.call_count, 0)
+        str(exc)
+        calls = display_status.call_count
+        _exception_for_status(S_FAILURE, 1)
+        self.assertGreater(display_status.call_count, calls)
+
+    def test_mech_type_copied(self):
+        der = b'\x2a\x86\x48\x86\xf7\x12\x01\x02\x02'
+        elements = ffi.new('char[]', der)
+        mech = ffi.new('gss_OID_desc *')
+        mech.length = len(der)
+        mech.elements = elements
+        exc = _exception_for_status(S_FAILURE, 0, ffi.cast('gss_OID', mech))
+        self.assertIs(exc.mech_type, OID.from_der(der))
+        self.assertIsNone(_exception_for_status(S_FAILURE, 0, ffi.NULL).mech_type)
+
+    def test_set_message(self):
+        exc = GSSCException(S_FAILURE, 0)
+        exc.message = "custom message"
+        self.assertEqual(str(exc), "custom message")
+
+
+class ExceptionClassTest(unittest.TestCase):
+
+    def test_simple(self):
+        self.assertIs(type(_exception_for_status(S_BAD_NAME, 0)), BadName)
+        self.assertIs(type(_exception_for_status(0, 0)), GSSCException)
+        self.assertIs(type(_exception_for_status(0, 0, sentinel.mech)), GSSMechException)
+
+    def test_composite_classes_cached(self):
+        status = S_BAD_NAME | S_CALL_BAD_STRUCTURE
+        exc = _exception_for_status(status, 0, sentinel.mech)
+        self.assertIsInstance(exc, BadName)
+        self.assertIsInstance(exc, BadStructure)
+        self.assertIsInstance(exc, GSSMechException)
+        self.assertIs(exc.mech_type, sentinel.mech)
+        self.assertEqual(type(exc).__name__, 'MechBadStructureBadName')
+        self.assertIs(type(_exception_for_status(status, 0, sentinel.mech)), type(exc))
+        self.assertIs(type(_exception_for_status(status, 0)), type(_exception_for_status(status, 0)))
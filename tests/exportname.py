@@ -0,0 +1,52 @@
+from __future__ import absolute_import
+
+import unittest
+
+from gssapi import Name, OID, C_NT_USER_NAME
+from gssapi.exportname import build_exported_name, parse_exported_name
+
+
+KRB5_DER = b'\x2a\x86\x48\x86\xf7\x12\x01\x02\x02'
+ALICE_TOKEN = (
+    b'\x04\x01\x00\x0b\x06\x09' + KRB5_DER + b'\x00\x00\x00\x11' + b'alice@EXAMPLE.COM'
+)
+
+
+class ExportedNameTest(unittest.TestCase):
+
+    def test_parse(self):
+        self.assertEqual(parse_exported_name(ALICE_TOKEN), (KRB5_DER, b'alice@EXAMPLE.COM'))
+
+    def test_parse_memoryview(self):
+        mech, name = parse_exported_name(memoryview(ALICE_TOKEN))
+        self.assertIsInstance(name, memoryview)
+        self.assertEqual(name.tobytes(), b'alice@EXAMPLE.COM')
+
+    def test_build(self):
+        self.assertEqual(build_exported_name(KRB5_DER, u'alice@EXAMPLE.COM'), ALICE_TOKEN)
+        self.assertRaises(TypeError, build_exported_name, '1.2.840.113554.1.2.2', b'alice')
+
+    def test_roundtrip_long_oid(self):
+        mech = b'\x2b' * 200  # needs a long-form DER length
+        token = build_exported_name(mech, b'spam')
+        self.assertEqual(parse_exported_name(token), (mech, b'spam'))
+
+    def test_malformed(self):
+        for token in (b'', ALICE_TOKEN[:-1], ALICE_TOKEN + b'x', b'\x04\x02' + ALICE_TOKEN[2:],
+                      ALICE_TOKEN[:4] + b'\x05' + ALICE_TOKEN[5:]):
+            self.assertRaises(ValueError, parse_exported_name, token)
+
+
+class KerberosExportedNameTest(unittest.TestCase):
+
+    def setUp(self):
+        try:
+            self.krb5mech = OID.mech_from_string('1.2.840.113554.1.2.2')
+        except KeyError:
+            self.skipTest("Kerberos 5 mech not available")
+
+    def test_matches_export(self):
+        exported = Name("spam", C_NT_USER_NAME).canonicalize(self.krb5mech).export()
+        mech, principal = parse_exported_name(exported)
+        self.assertEqual(mech, KRB5_DER)
+        self.assertEqual(build_exported_name(self.krb5mech, principal), exported)
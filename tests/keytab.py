@@ -0,0 +1,77 @@
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch, sentinel
+
+from gssapi import KeytabWatcher, GSSException
+from gssapi.keytab import _keytab_path
+
+
+class KeytabPathTest(unittest.TestCase):
+
+    def test_keytab_path(self):
+        self.assertEqual(_keytab_path({'keytab': '/etc/krb5.keytab'}), '/etc/krb5.keytab')
+        self.assertEqual(_keytab_path({'keytab': 'FILE:/etc/krb5.keytab'}), '/etc/krb5.keytab')
+        self.assertEqual(_keytab_path([(b'keytab', b'WRFILE:/tmp/kt')]), '/tmp/kt')
+        self.assertRaises(ValueError, _keytab_path, {'keytab': 'MEMORY:foo'})
+        self.assertRaises(ValueError, _keytab_path, {'ccache': 'FILE:/tmp/ccache'})
+
+
+@patch('gssapi.keytab.Credential')
+class KeytabWatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'test.keytab')
+        self._write(b'first')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, contents):
+        # Rotate the keytab by atomically replacing it, like most deployment tooling does
+        tmp_path = self.path + '.new'
+        with open(tmp_path, 'wb') as keytab:
+            keytab.write(contents)
+        os.rename(tmp_path, self.path)
+
+    def test_no_change(self, mock_cred):
+        watcher = KeytabWatcher({'keytab': self.path})
+        self.assertEqual(mock_cred.call_count, 1)
+        self.assertFalse(watcher.check())
+        self.assertEqual(mock_cred.call_count, 1)
+
+    def test_rotation(self, mock_cred):
+        mock_cred.return_value = sentinel.first
+        watcher = KeytabWatcher({'keytab': self.path})
+        self.assertIs(watcher.credential, sentinel.first)
+        mock_cred.return_value = sentinel.second
+        self._write(b'second keytab')
+        self.assertTrue(watcher.check())
+        self.assertIs(watcher.credential, sentinel.second)
+        self.assertFalse(watcher.check())
+
+    def test_failed_acquire_is_retried(self, mock_cred):
+        mock_cred.return_value = sentinel.first
+        watcher = KeytabWatcher({'keytab': self.path})
+        mock_cred.side_effect = GSSException("keytab is half-written")
+        self._write(b'second keytab')
+        self.assertFalse(watcher.check())
+        self.assertIs(watcher.credential, sentinel.first)
+        self.assertIsInstance(watcher.last_error, GSSException)
+        mock_cred.side_effect = None
+        mock_cred.return_value = sentinel.second
+        self.assertTrue(watcher.check())
+        self.assertIs(watcher.credential, sentinel.second)
+        self.assertIsNone(watcher.last_error)
+
+    @patch('gssapi.keytab.AcceptContext')
+    def test_accept_context(self, mock_ctx, mock_cred):
+        mock_cred.return_value = sentinel.first
+        watcher = KeytabWatcher({'keytab': self.path})
+        watcher.accept_context()
+        self.assertIs(mock_ctx.call_args[0][0], sentinel.first)
@@ -0,0 +1,109 @@
+from __future__ import absolute_import
+
+import threading
+import unittest
+
+from mock import patch
+
+from gssapi import metrics, InitContext, Name, C_NT_HOSTBASED_SERVICE, GSSException
+from gssapi.bindings import C
+
+
+class MetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        metrics.reset()
+
+    def test_collect(self):
+        metrics.inc(metrics.CREDENTIALS_ACQUIRED)
+        metrics.inc(metrics.MESSAGE_BYTES, 100, 'wrap')
+        metrics.inc(metrics.MESSAGE_BYTES, 20, 'wrap')
+        values = metrics.collect()
+        self.assertEqual(values[metrics.CREDENTIALS_ACQUIRED], 1)
+        self.assertEqual(values[metrics.MESSAGE_BYTES], {'wrap': 120})
+        self.assertEqual(values[metrics.HANDSHAKES_FAILED], {})
+        self.assertEqual(values[metrics.CONTEXTS], 0)
+
+    def test_threads(self):
+        def count():
+            for _ in range(1000):
+                metrics.inc(metrics.CONTEXTS)
+        threads = [threading.Thread(target=count) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(metrics.collect()[metrics.CONTEXTS], 8000)
+        # counts from exited threads are merged rather than kept per thread
+        self.assertEqual(len([t for t, _ in metrics._shards if t() in threads]), 0)
+        metrics.inc(metrics.CONTEXTS, -1)
+        self.assertEqual(metrics.collect()[metrics.CONTEXTS], 7999)
+
+    def test_inc_during_collect(self):
+        # A context released by the garbage collector while collect() holds the lock counts from a
+        # thread which may not have counted before
+        retire = metrics._retire_dead_shards
+        values = []
+
+        def retire_and_count():
+            retire()
+            if not values:
+                values.append(None)
+                metrics.inc(metrics.CONTEXTS, -1)
+
+        def collect():
+            values.append(metrics.collect())
+        with patch('gssapi.metrics._retire_dead_shards', side_effect=retire_and_count):
+            thread = threading.Thread(target=collect)
+            thread.daemon = True
+            thread.start()
+            thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(values), 2)
+        self.assertEqual(metrics.collect()[metrics.CONTEXTS], -1)
+
+    def test_render(self):
+        metrics.inc(metrics.HANDSHAKES_STARTED, 2)
+        metrics.inc(metrics.HANDSHAKES_COMPLETED)
+        metrics.inc(metrics.HANDSHAKE_STEPS, 3)
+        metrics.inc(metrics.HANDSHAKES_FAILED, label='BadName')
+        metrics.inc(metrics.MESSAGE_BYTES, 5, 'get_mic')
+        text = metrics.render()
+        self.assertTrue(text.endswith('# EOF\n'))
+        lines = text.splitlines()
+        self.assertIn('# TYPE gssapi_handshakes_started counter', lines)
+        self.assertIn('gssapi_handshakes_started_total 2', lines)
+        self.assertIn('gssapi_handshakes_failed_total{error="BadName"} 1', lines)
+        self.assertIn('gssapi_handshake_steps_count 1', lines)
+        self.assertIn('gssapi_handshake_steps_sum 3', lines)
+        self.assertIn('gssapi_contexts 0', lines)
+        self.assertIn('gssapi_message_bytes_total{operation="get_mic"} 5', lines)
+
+
+class ContextMetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        metrics.reset()
+        self.ctx = InitContext(Name('host@localhost', C_NT_HOSTBASED_SERVICE))
+
+    @patch('gssapi.ctx.C.gss_init_sec_context')
+    def test_handshake(self, init):
+        init.return_value = C.GSS_S_CONTINUE_NEEDED
+        self.ctx.step()
+        init.return_value = C.GSS_S_COMPLETE
+        self.ctx.step(b'token')
+        values = metrics.collect()
+        self.assertEqual(values[metrics.HANDSHAKES_STARTED], 1)
+        self.assertEqual(values[metrics.HANDSHAKES_COMPLETED], 1)
+        self.assertEqual(values[metrics.HANDSHAKE_STEPS], 2)
+        self.assertEqual(values[metrics.HANDSHAKES_FAILED], {})
+
+    @patch('gssapi.ctx.C.gss_init_sec_context', return_value=C.GSS_S_BAD_NAME)
+    def test_failure(self, init):
+        with self.assertRaises(GSSException) as cm:
+            self.ctx.step()
+        self.assertRaises(GSSException, self.ctx.step)
+        values = metrics.collect()
+        self.assertEqual(values[metrics.HANDSHAKES_STARTED], 2)
+        self.assertEqual(values[metrics.HANDSHAKES_COMPLETED], 0)
+        self.assertEqual(values[metrics.HANDSHAKES_FAILED], {type(cm.exception).__name__: 2})
@@ -7,15 +7,17 @@ import pwd
 import re
 import socket
 import unittest
+import warnings
 
 from mock import patch
 
 from gssapi import (
-    GSSException, Name, MechName, OID, C_NT_USER_NAME, C_NT_MACHINE_UID_NAME, C_NT_STRING_UID_NAME,
-    C_NT_HOSTBASED_SERVICE, C_NT_EXPORT_NAME
+    GSSException, Name, MechName, NameCache, OID, C_NT_USER_NAME, C_NT_MACHINE_UID_NAME,
+    C_NT_STRING_UID_NAME, C_NT_HOSTBASED_SERVICE, C_NT_EXPORT_NAME
 )
 from gssapi.names import _release_gss_name_t
 from gssapi.bindings import C
+from gssapi.oids import get_all_mechs
 
 
 class NameTest(unittest.TestCase):
@@ -47,6 +49,15 @@ class NameTest(unittest.TestCase):
         if not self.is_heimdal_mac:
             self.assertEqual(str(self.uid), str(Name(str(self.uid), C_NT_STRING_UID_NAME)))
 
+    @patch('gssapi.names.C.gss_display_name', wraps=C.gss_display_name)
+    def test_display_cached(self, display):
+        name = Name("host@example.com", C_NT_HOSTBASED_SERVICE)
+        self.assertEqual(str(name), "host@example.com")
+        self.assertEqual(str(name), "host@example.com")
+        self.assertEqual(name.type, C_NT_HOSTBASED_SERVICE)
+        self.assertIs(name.type, name.type)
+        self.assertEqual(display.call_count, 1)
+
     def test_bad_canonicalize(self):
         host_name = Name("host@example.com", C_NT_HOSTBASED_SERVICE)
         self.assertRaises(TypeError, host_name.canonicalize, ("not an OID"))
@@ -54,6 +65,129 @@ class NameTest(unittest.TestCase):
     def test_bad_input(self):
         self.assertRaises(TypeError, Name, (['list', 'of', 'things']))
 
+    def test_hash(self):
+        # Plain names may compare equal to mechanism names, so only the latter are hashable
+        name = Name("host@example.com", C_NT_HOSTBASED_SERVICE)
+        self.assertRaises(TypeError, hash, name)
+        self.assertRaises(TypeError, set, [name])
+
+    @patch('gssapi.names.C.gss_release_name', wraps=C.gss_release_name)
+    def test_close(self, release):
+        with Name("host@example.com", C_NT_HOSTBASED_SERVICE) as name:
+            self.assertEqual(str(name), "host@example.com")
+        self.assertEqual(release.call_count, 1)
+        self.assertRaises(GSSException, str, name)
+        name.close()
+        del name
+        gc.collect()
+        self.assertEqual(release.call_count, 1)
+
+    @patch('gssapi.names.C.gss_release_name', wraps=C.gss_release_name)
+    def test_close_shared(self, release):
+        mech = get_all_mechs()[0]
+        name = Name("host@example.com", C_NT_HOSTBASED_SERVICE)
+        with name.canonicalize(mech) as canonical:
+            pass
+        # The name still holds its canonical name, and another caller gets the same one
+        self.assertEqual(release.call_count, 0)
+        held = name.canonicalize(mech)
+        self.assertIs(held, canonical)
+        self.assertEqual(canonical.export(), name.canonicalize(mech).export())
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            for _ in range(3):
+                held.close()
+        self.assertEqual([w.category for w in caught], [RuntimeWarning])
+        self.assertEqual(release.call_count, 0)
+        # Closing the name releases the canonical name once no caller holds it
+        name.close()
+        self.assertEqual(release.call_count, 2)
+        self.assertRaises(GSSException, held.export)
+
+    @patch('gssapi.names.C.gss_release_name', wraps=C.gss_release_name)
+    def test_close_canonical_held(self, release):
+        mech = get_all_mechs()[0]
+        with Name("host@example.com", C_NT_HOSTBASED_SERVICE) as name:
+            canonical = name.canonicalize(mech)
+        self.assertEqual(release.call_count, 1)
+        self.assertTrue(canonical.export())
+        canonical.close()
+        self.assertEqual(release.call_count, 2)
+
+    @patch('gssapi.names.C.gss_release_name', wraps=C.gss_release_name)
+    def test_close_list(self, release):
+        names = Name.import_many(["spam", "eggs"], C_NT_USER_NAME)
+        first = names[0]
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            first.close()
+        # Only the list can release its names
+        self.assertEqual([w.category for w in caught], [RuntimeWarning])
+        self.assertEqual(release.call_count, 0)
+        self.assertEqual(str(names[0]), "spam")
+        second = names[1]
+        with names:
+            pass
+        self.assertEqual(release.call_count, 2)
+        self.assertEqual(len(names), 0)
+        self.assertRaises(GSSException, str, first)
+        self.assertRaises(GSSException, str, second)
+        del names, first, second
+        gc.collect()
+        self.assertEqual(release.call_count, 2)
+
+
+class NameCacheTest(unittest.TestCase):
+
+    @patch('gssapi.names.C.gss_import_name', wraps=C.gss_import_name)
+    def test_cache_hit(self, imprt):
+        cache = NameCache()
+        name = cache.get("host@example.com", C_NT_HOSTBASED_SERVICE)
+        self.assertIs(cache.get("host@example.com", C_NT_HOSTBASED_SERVICE), name)
+        self.assertIs(cache.get(b"host@example.com", C_NT_HOSTBASED_SERVICE), name)
+        self.assertEqual(imprt.call_count, 1)
+        self.assertEqual(str(name), "host@example.com")
+        self.assertEqual(cache.stats()['hits'], 2)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_name_type_in_key(self):
+        cache = NameCache()
+        self.assertIsNot(cache.get("spam"), cache.get("spam", C_NT_USER_NAME))
+        self.assertEqual(len(cache), 2)
+
+    def test_eviction(self):
+        cache = NameCache(max_size=2)
+        spam = cache.get("spam")
+        cache.get("eggs")
+        cache.get("spam")
+        cache.get("ham")
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertEqual(cache.stats()['size'], 2)
+        self.assertIs(cache.get("spam"), spam)
+
+    @patch('gssapi.names.C.gss_release_name', wraps=C.gss_release_name)
+    def test_close(self, release):
+        cache = NameCache(max_size=1)
+        spam = cache.get("spam")
+        spam.close()
+        self.assertIs(cache.get("spam"), spam)
+        self.assertEqual(release.call_count, 0)
+        # An evicted name is released once every caller has closed it
+        eggs = cache.get("eggs")
+        self.assertEqual(release.call_count, 0)
+        spam.close()
+        self.assertEqual(release.call_count, 1)
+        self.assertRaises(GSSException, str, spam)
+        cache.clear()
+        self.assertEqual(str(eggs), "eggs")
+        eggs.close()
+        self.assertEqual(release.call_count, 2)
+
+    def test_bad_input(self):
+        cache = NameCache()
+        self.assertRaises(TypeError, cache.get, ['list', 'of', 'things'])
+        self.assertRaises(TypeError, cache.get, "spam", "not an OID")
+
 
 class KerberosNameTest(NameTest):
 
@@ -111,6 +245,14 @@ class KerberosNameTest(NameTest):
         self.assertEqual(name2, canon2)
         self.assertNotEqual(canon1, canon2)
 
+    @patch('gssapi.names.C.gss_canonicalize_name', wraps=C.gss_canonicalize_name)
+    def test_canonicalize_cached(self, canonicalize):
+        name = Name(self.user, C_NT_USER_NAME)
+        canon = name.canonicalize(self.krb5mech)
+        self.assertIs(name.canonicalize(OID.mech_from_string('1.2.840.113554.1.2.2')), canon)
+        self.assertEqual(canonicalize.call_count, 1)
+        self.assertIs(canon.export(), name.canonicalize(self.krb5mech).export())
+
     def test_export(self):
         name1exp = Name("spam").canonicalize(self.krb5mech).export()
         self.assertIsInstance(name1exp, bytes)
@@ -136,6 +278,41 @@ class KerberosNameTest(NameTest):
             self.assertIsInstance(machine_uid_name_exp, bytes)
             self.assertGreater(len(machine_uid_name_exp), 0)
 
+    def test_hash(self):
+        super(KerberosNameTest, self).test_hash()
+        name1 = Name(self.user, C_NT_USER_NAME)
+        name2 = Name(self.user, C_NT_USER_NAME)
+        canon1 = name1.canonicalize(self.krb5mech)
+        host = Name("host@example.com", C_NT_HOSTBASED_SERVICE)
+        allowed = set([canon1, host.canonicalize(self.krb5mech)])
+        self.assertIn(name2.canonicalize(self.krb5mech), allowed)
+        notreal = Name("notarealusername", C_NT_USER_NAME).canonicalize(self.krb5mech)
+        self.assertNotIn(notreal, allowed)
+
+    def test_hash_cross_type(self):
+        name = Name(self.user, C_NT_USER_NAME)
+        canon = name.canonicalize(self.krb5mech)
+        # A plain name equal to a mechanism name can't be used to look it up by hash
+        self.assertEqual(name, canon)
+        self.assertRaises(TypeError, hash, name)
+        self.assertRaises(TypeError, lambda: name in set([canon]))
+        # The hash of a mechanism name survives closing it
+        imported = Name(canon.export(), C_NT_EXPORT_NAME)
+        self.assertEqual(hash(imported), hash(canon))
+        imported.close()
+        self.assertEqual(hash(imported), hash(canon))
+
+    @patch('gssapi.names.C.gss_export_name', wraps=C.gss_export_name)
+    @patch('gssapi.names.C.gss_compare_name', wraps=C.gss_compare_name)
+    def test_mech_name_eq_uses_export(self, compare, export):
+        canon1 = Name(self.user, C_NT_USER_NAME).canonicalize(self.krb5mech)
+        canon2 = Name(self.user, C_NT_USER_NAME).canonicalize(self.krb5mech)
+        self.assertEqual(canon1, canon2)
+        self.assertEqual(canon1, canon2)
+        self.assertEqual(hash(canon1), hash(canon2))
+        self.assertEqual(compare.call_count, 0)
+        self.assertEqual(export.call_count, 2)
+
     def test_export_import(self):
         for name in (
             Name("spam"),
@@ -161,6 +338,35 @@ class KerberosNameTest(NameTest):
         gc.collect()
         self.assertEqual(release.call_count, (imprt.call_count + canonicalize.call_count))
 
+    def test_import_many(self):
+        names = Name.import_many(["spam", self.user, u"eggs"], C_NT_USER_NAME)
+        self.assertEqual(len(names), 3)
+        self.assertIsNone(names.exported)
+        self.assertEqual([str(name) for name in names], ["spam", self.user, "eggs"])
+        self.assertEqual(names[-1], Name("eggs", C_NT_USER_NAME))
+        self.assertRaises(IndexError, names.__getitem__, 3)
+
+    def test_import_many_export(self):
+        names = Name.import_many(["spam", self.user], C_NT_USER_NAME, mech=self.krb5mech, export=True)
+        self.assertIsInstance(names[0], MechName)
+        self.assertEqual(names.exported[1],
+                         Name(self.user, C_NT_USER_NAME).canonicalize(self.krb5mech).export())
+        self.assertEqual(names[1].export(), names.exported[1])
+        self.assertRaises(ValueError, Name.import_many, ["spam"], C_NT_USER_NAME, export=True)
+
+    @patch('gssapi.names.C.gss_import_name', wraps=C.gss_import_name)
+    @patch('gssapi.names.C.gss_canonicalize_name', wraps=C.gss_canonicalize_name)
+    @patch('gssapi.names.C.gss_release_name', wraps=C.gss_release_name)
+    def test_import_many_release(self, release, canonicalize, imprt):
+        names = Name.import_many(["spam", self.user], C_NT_USER_NAME, mech=self.krb5mech)
+        first = names[0]
+        del names
+        gc.collect()
+        self.assertEqual(release.call_count, 2)  # the non-canonical names
+        del first
+        gc.collect()
+        self.assertEqual(release.call_count, imprt.call_count + canonicalize.call_count)
+
     @patch('gssapi.names.C.gss_release_name', wraps=C.gss_release_name)
     def test_doublefree(self, mocked):
         name = Name("spam", C_NT_USER_NAME)
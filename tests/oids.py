@@ -5,8 +5,8 @@ import unittest
 
 from mock import patch
 
-from gssapi import get_all_mechs, OID, OIDSet, MutableOIDSet
-from gssapi.oids import _release_OID_set
+from gssapi import get_all_mechs, get_mech, refresh_mechs, GSSException, OID, OIDSet, MutableOIDSet
+from gssapi.oids import _der_to_dotted, _release_OID_set
 from gssapi.bindings import ffi, C
 
 
@@ -58,6 +58,70 @@ class KerberosOIDTest(unittest.TestCase):
     def test_str(self):
         self.assertEqual(self.OID_AS_STRING, str(self.krb5mech))
 
+    def test_get_mech(self):
+        self.assertIs(get_mech(self.OID_AS_STRING), self.krb5mech)
+        self.assertIs(get_mech('krb5'), self.krb5mech)
+        self.assertIs(OID.mech_from_string('krb5'), self.krb5mech)
+        self.assertIs(get_mech(b'\x2a\x86\x48\x86\xf7\x12\x01\x02\x02'), self.krb5mech)
+        self.assertRaises(KeyError, get_mech, '1.1.1.1.1.1.1.1.1.1')
+
+
+class OIDInternTest(unittest.TestCase):
+
+    KRB5_DER = b'\x2a\x86\x48\x86\xf7\x12\x01\x02\x02'
+
+    def test_from_dotted(self):
+        oid = OID.from_dotted('1.2.840.113554.1.2.2')
+        self.assertEqual(oid._der, self.KRB5_DER)
+        self.assertEqual(str(oid), '1.2.840.113554.1.2.2')
+        self.assertIs(OID.from_dotted('{1 2 840 113554 1 2 2}'), oid)
+        self.assertRaises(ValueError, OID.from_dotted, 'not an OID')
+        self.assertRaises(ValueError, OID.from_dotted, '3.1')
+
+    def test_from_der(self):
+        oid = OID.from_der(self.KRB5_DER)
+        self.assertIs(OID.from_dotted('1.2.840.113554.1.2.2'), oid)
+        self.assertEqual(hash(oid), hash(OID.from_der(self.KRB5_DER)))
+        self.assertRaises(TypeError, OID.from_der, '1.2.840.113554.1.2.2')
+
+    def test_der_to_dotted(self):
+        self.assertEqual(_der_to_dotted(self.KRB5_DER), '1.2.840.113554.1.2.2')
+        self.assertEqual(_der_to_dotted(b'\x2a\x81\x00'), '1.2.128')
+        self.assertRaises(ValueError, _der_to_dotted, b'')
+        # The last arc is missing its final byte
+        self.assertRaises(ValueError, _der_to_dotted, b'\x2a\x80')
+        self.assertRaises(ValueError, _der_to_dotted, b'\x2a\x86')
+        # Arcs mustn't start with a padding byte
+        self.assertRaises(ValueError, _der_to_dotted, b'\x2a\x80\x01')
+        self.assertRaises(ValueError, _der_to_dotted, b'\x2a\x02\x80\x80\x01')
+
+    def test_interned(self):
+        for mech in get_all_mechs():
+            self.assertIs(OID.from_der(mech._der), mech)
+            self.assertIs(OID.from_dotted(str(mech)), mech)
+        self.assertFalse(hasattr(OID.from_der(self.KRB5_DER), '__dict__'))
+
+
+class MechRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        refresh_mechs()
+
+    @patch('gssapi.oids.C.gss_indicate_mechs', wraps=C.gss_indicate_mechs)
+    @patch('gssapi.oids.C.gss_release_oid_set', wraps=C.gss_release_oid_set)
+    def test_refresh(self, release, indicate):
+        allmechs = get_all_mechs()
+        mech = allmechs[0]
+        self.assertEqual(indicate.call_count, 1)
+        for _ in range(10):
+            self.assertIs(OID.mech_from_string(str(mech)), get_mech(str(mech)))
+        self.assertEqual(indicate.call_count, 1)
+        before = get_mech(str(mech))
+        refresh_mechs()
+        self.assertEqual(indicate.call_count, 2)
+        self.assertEqual(release.call_count, 1)
+        self.assertIs(get_mech(str(mech)), before)  # OIDs are interned
+
 
 class OIDSetTest(unittest.TestCase):
 
@@ -145,6 +209,25 @@ class OIDSetTest(unittest.TestCase):
             singleton_set2 = OIDSet.singleton_set(allmechs[-1])
             self.assertNotEqual(singleton_set1, singleton_set2)
 
+    @patch('gssapi.oids.C.gss_test_oid_set_member', wraps=C.gss_test_oid_set_member)
+    def test_mirror(self, test_member):
+        allmechs = get_all_mechs()
+        self.assertEqual(list(allmechs), [allmechs[i] for i in range(len(allmechs))])
+        for mech in allmechs:
+            self.assertIn(mech, allmechs)
+        self.assertEqual(test_member.call_count, 0)
+        self.assertEqual(hash(allmechs), hash(get_all_mechs()))
+        self.assertEqual(len(set([allmechs, get_all_mechs()])), 1)
+        self.assertRaises(TypeError, hash, MutableOIDSet())
+
+    def test_add_after_mirror(self):
+        new_set = MutableOIDSet()
+        self.assertEqual(list(new_set), [])
+        mech = get_all_mechs()[0]
+        new_set.add(mech)
+        self.assertIn(mech, new_set)
+        self.assertEqual(list(new_set), [mech])
+
     def test_bad_types(self):
         allmechs = get_all_mechs()
         self.assertNotEqual(allmechs, 'a string')
@@ -174,12 +257,12 @@ class OIDSetTest(unittest.TestCase):
     def test_release_all_mechs(self, mocked):
         allmechs = get_all_mechs()
         onemech = allmechs[0]
+        mech_str = str(onemech)
         del allmechs
         gc.collect()
-        self.assertEqual(mocked.call_count, 0)
-        del onemech
-        gc.collect()
+        # OIDs own a copy of their value, so they don't keep the set alive
         self.assertEqual(mocked.call_count, 1)
+        self.assertEqual(str(onemech), mech_str)
 
     @patch('gssapi.oids.C.gss_release_oid_set', wraps=C.gss_release_oid_set)
     def test_destructor(self, mocked):
@@ -188,6 +271,21 @@ class OIDSetTest(unittest.TestCase):
         gc.collect()
         self.assertEqual(mocked.call_count, 1)
 
+    @patch('gssapi.oids.C.gss_release_oid_set', wraps=C.gss_release_oid_set)
+    def test_close(self, mocked):
+        with get_all_mechs() as allmechs:
+            mech = allmechs[0]
+            self.assertIn(mech, allmechs)
+        self.assertEqual(mocked.call_count, 1)
+        self.assertRaises(GSSException, len, allmechs)
+        self.assertRaises(GSSException, allmechs.__contains__, mech)
+        self.assertRaises(GSSException, list, allmechs)
+        self.assertEqual(OID.mech_from_string(str(mech)), mech)
+        allmechs.close()
+        del allmechs
+        gc.collect()
+        self.assertEqual(mocked.call_count, 1)
+
     @patch('gssapi.oids.C.gss_release_oid_set', wraps=C.gss_release_oid_set)
     def test_doublefree(self, mocked):
         new_set = OIDSet()
@@ -0,0 +1,106 @@
+from __future__ import absolute_import
+
+import gc
+import unittest
+
+import gssapi.ctx
+import gssapi.names
+import gssapi.oids
+from gssapi import trace, Name, MutableOIDSet, C_NT_HOSTBASED_SERVICE
+from gssapi.bindings import C
+from gssapi.error import GSSException
+from gssapi.oids import OID
+from gssapi.trace import _bucket_bounds, _bucket_index, _NUM_BUCKETS
+
+
+class HistogramTest(unittest.TestCase):
+
+    def test_buckets(self):
+        for ns in (0, 1, 15, 16, 17, 100, 12345, 10 ** 9, 2 ** 35):
+            lower, upper = _bucket_bounds(_bucket_index(ns))
+            self.assertTrue(lower <= ns < upper, (ns, lower, upper))
+            self.assertLessEqual(upper - lower, max(1, lower // 8))
+        self.assertEqual(_bucket_index(10 ** 12), _NUM_BUCKETS - 1)
+        for i in range(_NUM_BUCKETS - 1):
+            self.assertEqual(_bucket_bounds(i)[1], _bucket_bounds(i + 1)[0])
+
+    def test_percentile(self):
+        stats = trace.CallStats('gss_test')
+        self.assertIsNone(stats.percentile(50))
+        self.assertIsNone(stats.mean)
+        for ns in range(1000, 101000, 1000):
+            stats._record(ns, (0, 0))
+        self.assertEqual(stats.calls, 100)
+        self.assertEqual(stats.mean, 50500)
+        self.assertEqual((stats.min, stats.max), (1000, 100000))
+        self.assertTrue(50000 <= stats.percentile(50) <= 50000 * 1.125)
+        self.assertEqual(stats.percentile(100), 100000)
+        self.assertEqual(sum(count for _, _, count in stats.histogram), 100)
+        self.assertEqual(stats.statuses, {(0, 0): 100})
+
+
+class TraceTest(unittest.TestCase):
+
+    def setUp(self):
+        trace.reset()
+
+    def tearDown(self):
+        trace.disable()
+        trace.reset()
+
+    def test_disabled(self):
+        self.assertFalse(trace.is_enabled())
+        for module in (gssapi.ctx, gssapi.names, gssapi.oids):
+            self.assertIs(module.C, C)
+        Name('spam', C_NT_HOSTBASED_SERVICE)
+        self.assertEqual(trace.snapshot(), {})
+
+    def test_enable(self):
+        trace.enable()
+        trace.enable()
+        self.assertTrue(trace.is_enabled())
+        self.assertIsNot(gssapi.names.C, C)
+        self.assertIs(gssapi.names.C, gssapi.ctx.C)
+        Name('spam', C_NT_HOSTBASED_SERVICE)
+        Name('eggs', C_NT_HOSTBASED_SERVICE)
+        stats = trace.snapshot()
+        self.assertEqual(stats['gss_import_name'].calls, 2)
+        self.assertEqual(stats['gss_import_name'].statuses, {(0, 0): 2})
+        self.assertGreater(stats['gss_import_name'].total, 0)
+        trace.disable()
+        self.assertIs(gssapi.names.C, C)
+        Name('spam', C_NT_HOSTBASED_SERVICE)
+        self.assertEqual(trace.snapshot()['gss_import_name'].calls, 2)
+
+    def test_status(self):
+        trace.enable()
+        Name('spam', C_NT_HOSTBASED_SERVICE)
+        self.assertRaises(GSSException, Name, 'spam', OID.from_dotted('1.3.1.2.3'))
+        statuses = trace.snapshot()['gss_import_name'].statuses
+        self.assertEqual(sum(statuses.values()), 2)
+        self.assertEqual(statuses[(0, 0)], 1)
+
+    def test_reset(self):
+        trace.enable()
+        MutableOIDSet()
+        snapshot = trace.snapshot()
+        self.assertEqual(snapshot['gss_create_empty_oid_set'].calls, 1)
+        trace.reset()
+        self.assertEqual(trace.snapshot(), {})
+        self.assertEqual(snapshot['gss_create_empty_oid_set'].calls, 1)
+
+    def test_hasattr(self):
+        trace.enable()
+        self.assertFalse(hasattr(gssapi.names.C, 'gss_no_such_function'))
+        self.assertEqual(gssapi.names.C.GSS_S_COMPLETE, C.GSS_S_COMPLETE)
+
+    def test_live_handles(self):
+        trace.enable()
+        before = trace.live_handles()
+        name = Name('spam', C_NT_HOSTBASED_SERVICE)
+        oid_set = MutableOIDSet()
+        self.assertEqual(trace.live_handles()['gss_name_t'], before['gss_name_t'] + 1)
+        self.assertEqual(trace.live_handles()['gss_OID_set'], before['gss_OID_set'] + 1)
+        del name, oid_set
+        gc.collect()
+        self.assertEqual(trace.live_handles(), before)